@@ -0,0 +1,194 @@
+from othello.bitboard import FULL_MASK, PASS, get_moves, get_flips, squares
+
+# Moves are ordered by the opponent's mobility after the move (fastest first) above this many empties,
+# below it the cheaper parity ordering alone is used
+FASTEST_FIRST_EMPTIES = 7
+
+# The four 4x4 quadrants of the board, used for parity ordering
+QUADRANTS = (
+    0x00000000_0F0F0F0F,
+    0x00000000_F0F0F0F0,
+    0x0F0F0F0F_00000000,
+    0xF0F0F0F0_00000000,
+)
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+
+class EndgameSolver:
+    """
+    Solves positions exactly by searching to the end of the game.
+    No evaluation function or stability is involved, the score of a finished game
+    is simply the disc difference (player to move minus opponent).
+
+    The search is a negamax alpha-beta on plain bitboards with:
+    - Parity ordering: moves in quadrants with an odd number of empties first,
+      as the last move in a region tends to be an advantage.
+    - Fastest-first ordering: with many empties left, moves that leave the opponent
+      with the fewest replies first.
+    - Specialized routines for the last two and the last empty square, which avoid
+      move generation entirely.
+
+    solve(position) gives the exact score, solve(position, exact=False) only whether the game
+    is won, lost or drawn, which is a lot cheaper as the window is just (-1, 1).
+    """
+
+    def __init__(self):
+        self.nodes = 0
+
+    def solve(self, position, exact=True):
+        """
+        :param position: The Position to solve.
+        :param exact: True for the exact disc difference, False for WIN/DRAW/LOSS only.
+
+        :return: (score, best_move) from the perspective of the player to move.
+                 The score is the final disc difference, or WIN (1), DRAW (0) or LOSS (-1) if exact is False.
+        """
+        self.nodes = 0
+        alpha, beta = (-64, 64) if exact else (-1, 1)
+        player, opponent = position.player, position.opponent
+        moves = get_moves(player, opponent)
+        if moves == 0:
+            if get_moves(opponent, player) == 0:
+                score = _final_score(player, opponent)
+            else:
+                score = -self._solve(opponent, player, -beta, -alpha, True)
+            return (score if exact else _sign(score)), PASS
+
+        best_score = -65
+        best_move = None
+        for move in self._order_moves(player, opponent, moves):
+            move_bitboard = 1 << move
+            flips = get_flips(move_bitboard, player, opponent)
+            score = -self._solve(opponent ^ flips, player | move_bitboard | flips, -beta, -alpha, False)
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+        return (best_score if exact else _sign(best_score)), best_move
+
+    def win_loss_draw(self, position):
+        """
+        :return: (WIN, DRAW or LOSS, best_move) for the player to move.
+        """
+        return self.solve(position, exact=False)
+
+    def _solve(self, player, opponent, alpha, beta, passed):
+        self.nodes += 1
+        empties = ~(player | opponent) & FULL_MASK
+        number_of_empties = empties.bit_count()
+
+        if number_of_empties == 2:
+            first = empties & -empties
+            return self._last_two(player, opponent, first, empties ^ first, alpha, beta)
+        if number_of_empties == 1:
+            return _last_one(player, opponent, empties)
+        if number_of_empties == 0:
+            return _final_score(player, opponent)
+
+        moves = get_moves(player, opponent)
+        if moves == 0:
+            if passed:
+                return _final_score(player, opponent)
+            return -self._solve(opponent, player, -beta, -alpha, True)
+
+        best_score = -65
+        for move in self._order_moves(player, opponent, moves, empties, number_of_empties):
+            move_bitboard = 1 << move
+            flips = get_flips(move_bitboard, player, opponent)
+            score = -self._solve(opponent ^ flips, player | move_bitboard | flips, -beta, -alpha, False)
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def _last_two(self, player, opponent, first, second, alpha, beta):
+        """
+        Two empty squares left: try both for the player, otherwise both for the opponent.
+        """
+        self.nodes += 1
+        best_score = -65
+        flips = get_flips(first, player, opponent)
+        if flips:
+            best_score = -_last_one(opponent ^ flips, player | first | flips, second)
+            if best_score >= beta:
+                return best_score
+        flips = get_flips(second, player, opponent)
+        if flips:
+            score = -_last_one(opponent ^ flips, player | second | flips, first)
+            if score > best_score:
+                best_score = score
+        if best_score != -65:
+            return best_score
+
+        # The player has to pass
+        best_score = 65
+        flips = get_flips(first, opponent, player)
+        if flips:
+            best_score = _last_one(player ^ flips, opponent | first | flips, second)
+            if best_score <= alpha:
+                return best_score
+        flips = get_flips(second, opponent, player)
+        if flips:
+            score = _last_one(player ^ flips, opponent | second | flips, first)
+            if score < best_score:
+                best_score = score
+        if best_score != 65:
+            return best_score
+        return _final_score(player, opponent)
+
+    def _order_moves(self, player, opponent, moves, empties=None, number_of_empties=None):
+        """
+        Parity first, then (with enough empties left) by the opponent's mobility after the move.
+        """
+        if empties is None:
+            empties = ~(player | opponent) & FULL_MASK
+            number_of_empties = empties.bit_count()
+
+        odd_regions = 0
+        for quadrant in QUADRANTS:
+            if (empties & quadrant).bit_count() & 1:
+                odd_regions |= quadrant
+
+        if number_of_empties < FASTEST_FIRST_EMPTIES:
+            return squares(moves & odd_regions) + squares(moves & ~odd_regions)
+
+        scored_moves = []
+        for move in squares(moves):
+            move_bitboard = 1 << move
+            flips = get_flips(move_bitboard, player, opponent)
+            mobility = get_moves(opponent ^ flips, player | move_bitboard | flips).bit_count()
+            # Even regions are sorted after odd regions with the same mobility
+            scored_moves.append((mobility * 2 + (0 if move_bitboard & odd_regions else 1), move))
+        scored_moves.sort()
+        return [move for _, move in scored_moves]
+
+
+def _final_score(player, opponent):
+    return player.bit_count() - opponent.bit_count()
+
+
+def _last_one(player, opponent, empty):
+    """
+    One empty square left, given as a bitboard. The board is full after the move,
+    so the score follows from the count of the player who moves.
+    """
+    flips = get_flips(empty, player, opponent)
+    if flips:
+        return 2 * (player | empty | flips).bit_count() - 64
+    flips = get_flips(empty, opponent, player)
+    if flips:
+        return 64 - 2 * (opponent | empty | flips).bit_count()
+    return _final_score(player, opponent)
+
+
+def _sign(score):
+    return WIN if score > 0 else LOSS if score < 0 else DRAW
@@ -1,57 +1,166 @@
 import random
+import time
+from othello.bitboard import PASS, squares
+from othello.zobrist import CONTEXT_KEYS
+from .TranspositionTable import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from .EndgameSolver import EndgameSolver
+
+# Move ordering regions, from highest to lowest priority
+CORNER_SQUARES = 0b10000001_00000000_00000000_00000000_00000000_00000000_00000000_10000001
+EDGE_SQUARES = 0b00111100_00000000_10000001_10000001_10000001_10000001_00000000_01111110
+CENTER_SQUARES = 0b00000000_00000000_00111100_00111100_00111100_00111100_00000000_00000000
+SEMI_EDGE_SQUARES = 0b00000000_00111100_01000010_01000010_01000010_01000010_00111100_00000000
+ORANGE_ZONE_SQUARES = 0b01000010_10000001_00000000_00000000_00000000_00000000_10000001_01000010
+RED_ZONE_SQUARES = 0b00000000_01000010_00000000_00000000_00000000_00000000_01000010_00000000
+
+# How often (in nodes) the clock is checked during a timed search
+TIME_CHECK_INTERVAL = 1024
+
+# Positions with at most this many empty squares are solved exactly instead of searched.
+# 12 empties takes well under a second, every extra empty roughly multiplies that by 2.5
+DEFAULT_ENDGAME_THRESHOLD = 12
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time or node budget of iterative_deepening runs out.
+    """
+    pass
 
 class MinMaxAgent:
-    def __init__(self, cache):
-        self.cache = cache
+    def __init__(self, cache=None, endgame_threshold=DEFAULT_ENDGAME_THRESHOLD):
+        """
+        :param cache: The TranspositionTable to use, a new one with the default size if None.
+                      It is kept between searches, so results carry over to the next move.
+        :param endgame_threshold: The number of empty squares from which the endgame solver
+                                  takes over at the root, 0 to never use it.
+        """
+        self.cache = cache if cache is not None else TranspositionTable()
+        self.endgame_threshold = endgame_threshold
+        self.endgame_solver = EndgameSolver()
+        self.nodes = 0
+        self.root_key = None
+        # Budgets for the current search, only set by iterative_deepening
+        self.deadline = float('inf')
+        self.node_limit = float('inf')
+    
+    def iterative_deepening(self, position, evaluation_function, time_budget=None, node_budget=None, max_depth=60, beta_features=False, on_iteration=None):
+        """
+        Searches depth 1, 2, 3, ... until the time or node budget runs out.
+        Each iteration leaves its results in the transposition table, so the next one
+        tries the previous best moves first. An iteration that runs out of budget is
+        thrown away, and the result of the deepest completed iteration is returned.
+        Depth 1 is always completed so there is always a move to play.
+        
+        :param position: The Position to search.
+        :param evaluation_function: The evaluation function used at the leaves.
+        :param time_budget: The wall-clock budget in seconds, None for no limit.
+        :param node_budget: The maximum number of nodes to visit, None for no limit.
+        :param max_depth: The deepest iteration to run.
+        :param beta_features: Passed on to the evaluation function.
+        :param on_iteration: Called as on_iteration(value, best_move, depth) after every completed iteration
+                             (and once with the result of the endgame solver), to report progress during the search.
+        
+        :return: (value, best_move, depth) of the deepest completed iteration.
+                 If the endgame solver took over, the value is the exact final disc difference
+                 and depth is the number of empty squares.
+        """
+        start = time.perf_counter()
+        self.nodes = 0
+        result = None
+        
+        solved = self.solve_endgame(position)
+        if solved is not None:
+            value, best_move = solved
+            result = value, best_move, 64 - (position.player | position.opponent).bit_count()
+            if on_iteration is not None:
+                on_iteration(*result)
+            return result
+        
+        try:
+            for depth in range(1, max_depth + 1):
+                if result is not None:
+                    # Only now enforce the budget, as there is a move to fall back on
+                    self.deadline = start + time_budget if time_budget is not None else float('inf')
+                    self.node_limit = node_budget if node_budget is not None else float('inf')
+                
+                value, best_move = self.get_best_move(position, evaluation_function, depth, beta_features=beta_features)
+                result = value, best_move, depth
+                if on_iteration is not None:
+                    on_iteration(*result)
+                
+                # A won or lost game will not change with more depth
+                if value in (float('inf'), float('-inf')):
+                    break
+                # The next iteration takes several times as long as this one, do not start what can't finish
+                if time_budget is not None and time.perf_counter() - start > time_budget / 2:
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = float('inf')
+            self.node_limit = float('inf')
+        
+        return result
+        
+    def get_best_move(self, position, evaluation_function, depth = 5, alpha=-float('inf'), beta=float('inf'), is_maximizing=True, player=None, beta_features=False):            
+        """
+        Alpha-beta search on an immutable Position.
+        Every child is created with Position.apply/pass_turn, so nothing has to be undone
+        and the caller's position is never modified.
+        A GameState can be searched by passing gamestate.to_position().
+        
+        All values are from the perspective of player, the player to move at the root.
+        If the root has few enough empty squares, the endgame solver takes over and
+        the value is the exact final disc difference instead.
+        """
+        if player is None:
+            solved = self.solve_endgame(position)
+            if solved is not None:
+                return solved
+            player = position.side
+            self._start_search(position, player, beta_features)
+        
+        self._count_node()
         
-    def get_best_move(self, gamestate, evaluation_function, depth = 5, alpha=-float('inf'), beta=float('inf'), is_maximizing=True, player=None, beta_features=False):            
         # Base case
-        if depth == 0 or gamestate.game_over:
+        if depth == 0 or position.is_terminal():
             opponent = 'black' if player == 'white' else 'white'
-            value = evaluation_function(gamestate, player, opponent, beta_features = beta_features)
+            value = evaluation_function(position, player, opponent, beta_features = beta_features)
             return value, None
-        
-        player = gamestate.current_player
 
-        # Represent the gamestate as a string of the pieces' names
+        # The Zobrist hash covers the pieces and the player to move,
+        # the context key the root player and features the values are for
         # Used for caching
-        board = (player, gamestate.board.get_board('black'), gamestate.board.get_board('white'))
-        if board in self.cache:
-            depth_searched, value, best_move = self.cache[board]
+        key = position.hash ^ CONTEXT_KEYS[player, beta_features]
+        cached_move = None
+        entry = self.cache.probe(key)
+        if entry is not None:
+            depth_searched, value, flag, cached_move = entry
             if depth_searched >= depth:
-                if best_move is None:
-                    print("Error: best_move is None in cache. Exiting...")
-                    exit(1)
-                return value, best_move
+                # Cut off nodes only give a bound, which can still narrow the window
+                if flag == EXACT:
+                    return value, cached_move
+                if flag == LOWER_BOUND:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value, cached_move
+        alpha_searched, beta_searched = alpha, beta
         
         max_value = float('-inf')
         min_value = float('inf')
 
-        valid_moves = gamestate.get_valid_moves(player)
-        #valid_moves = gamestate._bitboard_to_rowcol(valid_moves)
-        valid_moves = self.order_moves(valid_moves)
-        
-        if len(valid_moves) == 0:
-            valid_moves = ["skip"]
-            
+        valid_moves = self._ordered_moves(position, cached_move)
         best_move = random.choice(valid_moves)
 
         for move in valid_moves:
-            if move == "skip":
-                gamestate.skip_turn()
+            if move == PASS:
+                child = position.pass_turn()
             else:
-                valid = gamestate.make_move(move[0], move[1])
-                if not valid:
-                    print(f"An error occurred. Valid moves for player {player}:")
-                    print(valid_moves)
-                    print("Gamestate: ")
-                    print(gamestate.board)
-                    print("Exiting...")
-                    exit(1)
-            
-            value, _ = self.get_best_move(gamestate, evaluation_function, depth - 1, alpha, beta, not is_maximizing, player, beta_features = beta_features)
+                child = position.apply(move)
             
-            gamestate.undo_move()
+            value, _ = self.get_best_move(child, evaluation_function, depth - 1, alpha, beta, not is_maximizing, player, beta_features = beta_features)
 
             if is_maximizing:
                 if value > max_value:
@@ -67,47 +176,83 @@ class MinMaxAgent:
             if beta <= alpha:
                 break
 
-        if is_maximizing:
-            self.cache[board] = depth, max_value, best_move
-            return max_value, best_move
+        value = max_value if is_maximizing else min_value
+        if value <= alpha_searched:
+            flag = UPPER_BOUND
+        elif value >= beta_searched:
+            flag = LOWER_BOUND
         else:
-            self.cache[board] = depth, min_value, best_move
-            return min_value, best_move
+            flag = EXACT
+        self.cache.store(key, depth, value, flag, best_move)
+        return value, best_move
         
     def clear_cache(self):
+        """
+        Empties the transposition table. Not needed between moves,
+        only to start over, e.g. after changing the evaluation function.
+        """
         self.cache.clear()
+        self.root_key = None
 
     
+    def solve_endgame(self, position):
+        """
+        Solves the position exactly if it has at most endgame_threshold empty squares.
+        
+        :return: (disc difference, best_move) for the player to move, None if the position is not an endgame yet.
+        """
+        empties = 64 - (position.player | position.opponent).bit_count()
+        if empties > self.endgame_threshold or position.is_terminal():
+            return None
+        value, best_move = self.endgame_solver.solve(position)
+        self.nodes += self.endgame_solver.nodes
+        return value, best_move
+    
+    def _start_search(self, position, player, beta_features) -> None:
+        """
+        Starts a new generation in the transposition table when the root changes,
+        so entries of earlier moves age out. Repeated searches of the same root
+        (the iterations of iterative_deepening) stay in one generation.
+        """
+        root_key = position.hash ^ CONTEXT_KEYS[player, beta_features]
+        if root_key != self.root_key:
+            self.root_key = root_key
+            self.cache.new_search()
+    
+    def _count_node(self) -> None:
+        """
+        Counts a visited node and raises SearchTimeout when the budget of the current search is used up.
+        """
+        self.nodes += 1
+        if self.nodes >= self.node_limit or (self.nodes % TIME_CHECK_INTERVAL == 0 and time.perf_counter() >= self.deadline):
+            raise SearchTimeout()
+    
+    def _ordered_moves(self, position, cached_move=None) -> list:
+        """
+        The moves to search in order, [PASS] if the player to move has none.
+        The best move of an earlier search (from the transposition table) goes first,
+        as it is the most likely to cause a cut off.
+        """
+        valid_moves = self.order_moves(position.legal_moves())
+        if len(valid_moves) == 0:
+            return [PASS]
+        if cached_move is not None and cached_move != valid_moves[0] and cached_move in valid_moves:
+            valid_moves.remove(cached_move)
+            valid_moves.insert(0, cached_move)
+        return valid_moves
+    
     def order_moves(self, moves_bitboard):
         """
         Move ordering is difficult to implement in Othello
         I opted for a static board representing the general value of each square
         This isnt ideal, however should be sufficent for ordering moves at least a little bit
         Some tests showed that this ordering improved time performance by up to 40%
-        """
-        def _bitboard_to_rowcol(bitboard) -> list:
-            rowcol = [(i // 8, chr((i % 8) + 65)) for i in range(64) if bitboard & (1 << i)]
-            return rowcol
-        
-        # highest priority moves
-        corner_bitboard = 0b10000001_00000000_00000000_00000000_00000000_00000000_00000000_10000001 & moves_bitboard
-        corner_moves = _bitboard_to_rowcol(corner_bitboard)
         
-        edge_bitboard = 0b00111100_00000000_10000001_10000001_10000001_10000001_00000000_01111110 & moves_bitboard
-        edge_moves = _bitboard_to_rowcol(edge_bitboard)
-        
-        center_bitboard = 0b00000000_00000000_00111100_00111100_00111100_00111100_00000000_00000000 & moves_bitboard
-        center_moves = _bitboard_to_rowcol(center_bitboard)
-        
-        semi_edge_bitboard = 0b00000000_00111100_01000010_01000010_01000010_01000010_00111100_00000000 & moves_bitboard
-        semi_edge_moves = _bitboard_to_rowcol(semi_edge_bitboard)
-        
-        orange_zone_bitboard = 0b01000010_10000001_00000000_00000000_00000000_00000000_10000001_01000010 & moves_bitboard
-        orange_zone_moves = _bitboard_to_rowcol(orange_zone_bitboard)
-        
-        red_zone_bitboard = 0b00000000_01000010_00000000_00000000_00000000_00000000_01000010_00000000 & moves_bitboard
-        red_zone_moves = _bitboard_to_rowcol(red_zone_bitboard)
-        
-        moves_ordered = corner_moves + edge_moves + center_moves + semi_edge_moves + orange_zone_moves + red_zone_moves
-        return moves_ordered
-        
\ No newline at end of file
+        Returns the moves as square indices (row * 8 + col).
+        """
+        return (squares(CORNER_SQUARES & moves_bitboard) + 
+                squares(EDGE_SQUARES & moves_bitboard) + 
+                squares(CENTER_SQUARES & moves_bitboard) + 
+                squares(SEMI_EDGE_SQUARES & moves_bitboard) + 
+                squares(ORANGE_ZONE_SQUARES & moves_bitboard) + 
+                squares(RED_ZONE_SQUARES & moves_bitboard))
@@ -0,0 +1,108 @@
+from othello.bitboard import PASS
+from othello.zobrist import CONTEXT_KEYS
+from .MinMaxAgent import MinMaxAgent
+from .TranspositionTable import EXACT, LOWER_BOUND, UPPER_BOUND
+
+# Width of the null window used to test moves after the first one.
+# The evaluation is a float, so "one point" of integer engines becomes a very small step.
+NULL_WINDOW = 1e-9
+# Half width of the aspiration window around the value of the previous search
+ASPIRATION_WINDOW = 5.0
+
+
+class NegamaxAgent(MinMaxAgent):
+    """
+    Alpha-beta search in negamax form with principal variation search.
+    Can be used anywhere a MinMaxAgent is used, including iterative_deepening.
+
+    Instead of separate maximizing and minimizing branches, every node maximizes the value
+    for the player to move, and the value of a child is negated.
+    The first (best ordered) move of a node is searched with the full window, the others
+    only with a null window to prove they are not better. If one turns out better it is searched again.
+    At the root, the search starts with an aspiration window around the previous value
+    found for the position, and falls back to the full window if the value is outside it.
+
+    get_best_move returns values from the perspective of the player to move at the root,
+    the same as MinMaxAgent, so both give the same values at equal depth.
+    Endgames are handed to the endgame solver the same way as well.
+    """
+
+    def get_best_move(self, position, evaluation_function, depth = 5, alpha=-float('inf'), beta=float('inf'), is_maximizing=True, player=None, beta_features=False):
+        """
+        Searches position to the given depth.
+        is_maximizing and player are only accepted for compatibility with MinMaxAgent,
+        the root player is always the player to move in position.
+
+        :return: (value, best_move)
+        """
+        solved = self.solve_endgame(position)
+        if solved is not None:
+            return solved
+        
+        root_player = position.side
+        self._start_search(position, root_player, beta_features)
+        entry = self.cache.probe(position.hash ^ CONTEXT_KEYS[root_player, beta_features])
+        if entry is not None and entry[2] == EXACT and abs(entry[1]) != float('inf'):
+            # Aspiration window around the value of the previous iteration or move
+            low, high = entry[1] - ASPIRATION_WINDOW, entry[1] + ASPIRATION_WINDOW
+            value, best_move = self._pvs(position, evaluation_function, depth, max(alpha, low), min(beta, high), root_player, beta_features)
+            if low < value < high:
+                return value, best_move
+        return self._pvs(position, evaluation_function, depth, alpha, beta, root_player, beta_features)
+
+    def _pvs(self, position, evaluation_function, depth, alpha, beta, root_player, beta_features):
+        """
+        :return: (value, best_move), the value is from the perspective of the player to move in position.
+        """
+        self._count_node()
+
+        if depth == 0 or position.is_terminal():
+            opponent = 'black' if root_player == 'white' else 'white'
+            value = evaluation_function(position, root_player, opponent, beta_features = beta_features)
+            return (value if position.side == root_player else -value), None
+
+        key = position.hash ^ CONTEXT_KEYS[root_player, beta_features]
+        cached_move = None
+        entry = self.cache.probe(key)
+        if entry is not None:
+            depth_searched, value, flag, cached_move = entry
+            if depth_searched >= depth:
+                if flag == EXACT:
+                    return value, cached_move
+                if flag == LOWER_BOUND:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value, cached_move
+        alpha_searched = alpha
+
+        best_value = float('-inf')
+        best_move = None
+        for move in self._ordered_moves(position, cached_move):
+            child = position.pass_turn() if move == PASS else position.apply(move)
+
+            # Without a finite alpha there is no null window to test against
+            if best_move is None or alpha == float('-inf'):
+                value = -self._pvs(child, evaluation_function, depth - 1, -beta, -alpha, root_player, beta_features)[0]
+            else:
+                value = -self._pvs(child, evaluation_function, depth - 1, -alpha - NULL_WINDOW, -alpha, root_player, beta_features)[0]
+                if alpha < value < beta:
+                    value = -self._pvs(child, evaluation_function, depth - 1, -beta, -alpha, root_player, beta_features)[0]
+
+            if value > best_value or best_move is None:
+                best_value = value
+                best_move = move
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+
+        if best_value <= alpha_searched:
+            flag = UPPER_BOUND
+        elif best_value >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.cache.store(key, depth, best_value, flag, best_move)
+        return best_value, best_move
@@ -0,0 +1,183 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from othello.Position import Position
+from othello.bitboard import PASS
+from othello.zobrist import CONTEXT_KEYS
+from .MinMaxAgent import MinMaxAgent, SearchTimeout, DEFAULT_ENDGAME_THRESHOLD
+from .TranspositionTable import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+# Memory of the transposition table of every worker process, in megabytes
+WORKER_TABLE_MB = 8
+# The shared alpha is lowered by this much before a worker searches with it, see get_best_move
+ALPHA_MARGIN = 1e-9
+
+# Set in every worker process by _init_worker
+_shared_alpha = None
+_search_generation = None
+_worker_agent = None
+
+
+def _init_worker(shared_alpha, search_generation) -> None:
+    global _shared_alpha, _search_generation, _worker_agent
+    _shared_alpha = shared_alpha
+    _search_generation = search_generation
+    _worker_agent = MinMaxAgent(cache=TranspositionTable(WORKER_TABLE_MB))
+
+
+def _search_move(generation, player_board, opponent_board, side, hash, evaluation_function, depth, alpha, root_player, beta_features, time_left, nodes_left):
+    """
+    Searches one root move (the position after it) in a worker process.
+    Every move starts with an empty table, so the result does not depend on
+    which moves the worker happened to search before.
+
+    :param generation: The root search the move belongs to. The shared alpha is only used while it is
+                       still the current one, a task left over from a search that timed out must not raise
+                       (or be cut off by) the alpha of the next search.
+
+    :return: (value, nodes) with the value from the perspective of root_player.
+    """
+    agent = _worker_agent
+    agent.clear_cache()
+    agent.nodes = 0
+    agent.deadline = time.perf_counter() + time_left
+    agent.node_limit = nodes_left
+
+    # Another worker may have found a better move since this one was submitted
+    with _shared_alpha.get_lock():
+        if _search_generation.value == generation:
+            alpha = max(alpha, _shared_alpha.value)
+    alpha -= ALPHA_MARGIN
+    position = Position(player_board, opponent_board, side, hash)
+    value, _ = agent.get_best_move(position, evaluation_function, depth, alpha, float('inf'), False, root_player, beta_features)
+
+    # Only a value above alpha is exact, anything else only says the move is not better
+    if value > alpha:
+        with _shared_alpha.get_lock():
+            if _search_generation.value == generation and value > _shared_alpha.value:
+                _shared_alpha.value = value
+    return value, agent.nodes
+
+
+class ParallelAgent(MinMaxAgent):
+    """
+    A MinMaxAgent that splits the search at the root over several processes.
+
+    The first (best ordered) root move is searched in this process, to get a good alpha
+    before anything else starts (young brothers wait). The other root moves are then
+    searched by a ProcessPoolExecutor, one move per task. Whenever a worker finds a better
+    move, it raises the alpha shared by all workers, so moves that start later can be cut
+    off sooner.
+
+    Which worker gets which move, and how far alpha has been raised when a move starts,
+    depends on timing. The result does not: every worker searches with alpha lowered
+    by ALPHA_MARGIN, so a move that is at least as good as the best gets its exact value
+    whatever alpha it started with. Everything else only gets a bound below the best.
+    Moves are then merged by value, then by their place in the move ordering.
+    So the chosen move and value are the same for every number of workers.
+    Tasks still running after a search timed out keep their own generation, and leave
+    the shared alpha of later searches alone.
+
+    The evaluation function is sent to the workers with every task, so it should be
+    a plain function such as fused_eval rather than an EvaluationCache.
+    A node budget from iterative_deepening is given to every worker in full,
+    so a parallel search can go over it by up to the number of workers times.
+    Call close() (or use the agent in a with block) to shut the workers down.
+    """
+
+    def __init__(self, workers=None, cache=None, endgame_threshold=DEFAULT_ENDGAME_THRESHOLD):
+        """
+        :param workers: The number of worker processes, all cores if None. With 1 the search is not split.
+        :param cache: The TranspositionTable of this process, a new one if None.
+        :param endgame_threshold: As in MinMaxAgent.
+        """
+        super().__init__(cache, endgame_threshold)
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.pool = None
+        self.shared_alpha = None
+        self.search_generation = None
+
+    def _get_pool(self):
+        if self.pool is None:
+            self.shared_alpha = multiprocessing.Value('d', float('-inf'))
+            # Counts the root searches, it shares the lock of the alpha so both are always read and written together
+            self.search_generation = multiprocessing.Value('q', 0, lock=self.shared_alpha.get_lock())
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(self.shared_alpha, self.search_generation))
+        return self.pool
+
+    def close(self) -> None:
+        """
+        Shuts the worker processes down. They are started again by the next search.
+        """
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+            self.shared_alpha = None
+            self.search_generation = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_best_move(self, position, evaluation_function, depth = 5, alpha=-float('inf'), beta=float('inf'), is_maximizing=True, player=None, beta_features=False):
+        """
+        Like MinMaxAgent.get_best_move, but the moves at the root are searched in parallel.
+        Everything below the root is searched as in MinMaxAgent.
+        """
+        if player is not None or self.workers <= 1 or depth <= 1 or position.is_terminal():
+            return super().get_best_move(position, evaluation_function, depth, alpha, beta, is_maximizing, player, beta_features)
+
+        solved = self.solve_endgame(position)
+        if solved is not None:
+            return solved
+        player = position.side
+        self._start_search(position, player, beta_features)
+        self._count_node()
+
+        key = position.hash ^ CONTEXT_KEYS[player, beta_features]
+        entry = self.cache.probe(key)
+        moves = self._ordered_moves(position, entry[3] if entry is not None else None)
+        children = [position.pass_turn() if move == PASS else position.apply(move) for move in moves]
+        alpha_searched = alpha
+
+        # Young brothers wait: the eldest move sets alpha for the others
+        values = [super().get_best_move(children[0], evaluation_function, depth - 1, alpha, beta, False, player, beta_features)[0]]
+        alpha = max(alpha, values[0])
+
+        if len(children) > 1 and alpha < beta:
+            pool = self._get_pool()
+            with self.shared_alpha.get_lock():
+                self.search_generation.value += 1
+                generation = self.search_generation.value
+                self.shared_alpha.value = alpha
+            time_left = self.deadline - time.perf_counter()
+            nodes_left = self.node_limit - self.nodes
+            futures = [pool.submit(_search_move, generation, child.player, child.opponent, child.side, child.hash, evaluation_function,
+                                   depth - 1, alpha, player, beta_features, time_left, nodes_left)
+                       for child in children[1:]]
+            try:
+                for future in futures:
+                    value, nodes = future.result()
+                    values.append(value)
+                    self.nodes += nodes
+            except SearchTimeout:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        # The best value, the earliest move in the ordering on ties
+        best_index = max(range(len(values)), key=lambda index: (values[index], -index))
+        value, best_move = values[best_index], moves[best_index]
+
+        if value <= alpha_searched:
+            flag = UPPER_BOUND
+        elif value >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.cache.store(key, depth, value, flag, best_move)
+        return value, best_move
@@ -0,0 +1,315 @@
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from evaluation_function.fused_eval import fused_eval
+from othello.Position import Position
+from .MinMaxAgent import MinMaxAgent, SearchTimeout, TIME_CHECK_INTERVAL
+
+# Searches waiting or running at once, more are refused
+DEFAULT_MAX_PENDING = 16
+DEFAULT_TIME_BUDGET = 2.0
+MAX_TIME_BUDGET = 10.0
+# Finished searches are kept this long so clients can still fetch the result, in seconds
+FINISHED_TTL = 300
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+FINISHED = (DONE, CANCELLED, FAILED)
+
+# Set in every worker process by _init_worker
+_progress = None
+_cancel_flags = None
+_worker_agent = None
+
+
+class _CancellableAgent(MinMaxAgent):
+    """
+    A MinMaxAgent that also stops when the cancel flag of its search is set.
+    The flag is checked as often as the clock, and stops the search like a timeout.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.slot = None
+
+    def _count_node(self) -> None:
+        super()._count_node()
+        if self.nodes % TIME_CHECK_INTERVAL == 0 and _cancel_flags[self.slot]:
+            raise SearchTimeout()
+
+
+def _init_worker(progress, cancel_flags) -> None:
+    global _progress, _cancel_flags, _worker_agent
+    _progress = progress
+    _cancel_flags = cancel_flags
+    _worker_agent = _CancellableAgent()
+
+
+def _search(job_id, slot, player_board, opponent_board, side, time_budget, beta_features):
+    """
+    Runs in a worker process. Every completed iteration is sent to the SearchService right away.
+
+    :return: (value, best_move, depth, nodes) of the deepest completed iteration, None if it was cancelled before depth 1 finished.
+    """
+    agent = _worker_agent
+    agent.slot = slot
+    start = time.perf_counter()
+    if _cancel_flags[slot]:
+        return None
+    _progress.put((job_id, 'running', None))
+
+    def on_iteration(value, best_move, depth):
+        _progress.put((job_id, 'iteration', (value, best_move, depth, agent.nodes, time.perf_counter() - start)))
+
+    position = Position(player_board, opponent_board, side)
+    result = agent.iterative_deepening(position, fused_eval, time_budget=time_budget,
+                                       beta_features=beta_features, on_iteration=on_iteration)
+    if result is None:
+        return None
+    return (*result, agent.nodes)
+
+
+class SearchJob:
+    """
+    One search requested through the API. iterations holds a dict per completed iteration of iterative deepening,
+    the last one is the best move found so far.
+    """
+
+    def __init__(self, job_id, game_id, position_key, time_budget):
+        self.job_id = job_id
+        self.game_id = game_id
+        self.position_key = position_key
+        self.time_budget = time_budget
+        self.status = QUEUED
+        self.iterations = []
+        self.error = None
+        self.slot = None
+        self.future = None
+        self.finished_at = None
+
+    def to_dict(self) -> dict:
+        return {
+            'job_id': self.job_id,
+            'game_id': self.game_id,
+            'status': self.status,
+            'time_budget': self.time_budget,
+            'iterations': list(self.iterations),
+            'best': self.iterations[-1] if self.iterations else None,
+            'error': self.error,
+        }
+
+
+class SearchService:
+    """
+    Runs AI searches in a pool of worker processes, so a request never waits for one.
+
+    submit() queues a search of a position and returns its job at once. The worker runs iterative
+    deepening within the time budget and reports every completed iteration, so get() (or wait(), for streaming)
+    shows the best move so far while the search goes on. At most max_pending searches are waiting or running,
+    submit() returns None when that many are. A game has at most one search, asking again for the same position
+    gives the same job, and cancel_game() stops it when the game moves on.
+    Call close() to shut the workers down.
+    """
+
+    def __init__(self, workers=None, max_pending=DEFAULT_MAX_PENDING, beta_features=True):
+        """
+        :param workers: The number of worker processes, all cores if None.
+        :param max_pending: The maximum number of searches waiting or running.
+        :param beta_features: Passed on to the evaluation function.
+        """
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.max_pending = max_pending
+        self.beta_features = beta_features
+        self.jobs = OrderedDict()
+        self.active_by_game = {}
+        self.free_slots = list(range(max_pending))
+        self.job_ids = itertools.count(1)
+        self.condition = threading.Condition()
+        self.pool = None
+        self.progress = None
+        self.cancel_flags = None
+        self.listener = None
+
+    def submit(self, game_id, position, position_key, time_budget=DEFAULT_TIME_BUDGET):
+        """
+        :param position: The Position to search, for the player to move.
+        :param position_key: Identifies the state of the game (e.g. its hash), a search of a
+                             different state of the same game cancels this one.
+        :param time_budget: Seconds the search may take, at most MAX_TIME_BUDGET.
+
+        :return: The job as a dict (see SearchJob.to_dict), None if max_pending searches are waiting or running.
+        :raises ValueError: If time_budget is not a finite number, the search would never time out.
+        """
+        time_budget = float(time_budget)
+        if not math.isfinite(time_budget):
+            raise ValueError(f"time_budget must be a finite number of seconds, not {time_budget}")
+        time_budget = min(max(time_budget, 0.0), MAX_TIME_BUDGET)
+        with self.condition:
+            active = self.active_by_game.get(game_id)
+            if active is not None:
+                if active.position_key == position_key:
+                    return active.to_dict()
+                self._cancel(active)
+            if not self.free_slots:
+                return None
+
+            pool = self._get_pool()
+            job = SearchJob(next(self.job_ids), game_id, position_key, time_budget)
+            job.slot = self.free_slots.pop()
+            self.cancel_flags[job.slot] = 0
+            self.jobs[job.job_id] = job
+            self.active_by_game[game_id] = job
+            job.future = pool.submit(_search, job.job_id, job.slot, position.player, position.opponent, position.side,
+                                     time_budget, self.beta_features)
+            job.future.add_done_callback(lambda future, job=job: self._finish(job, future))
+            self._expire()
+            return job.to_dict()
+
+    def get(self, job_id):
+        """
+        :return: The job as a dict (see SearchJob.to_dict), None if there is no such job (or it expired).
+        """
+        with self.condition:
+            job = self.jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+    def wait(self, job_id, seen, timeout):
+        """
+        Waits until the job has more than seen iterations or is finished.
+
+        :return: The job as a dict, which may be unchanged if the timeout passed first. None if there is no such job.
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                job = self.jobs.get(job_id)
+                if job is None or job.status in FINISHED or len(job.iterations) > seen:
+                    return job.to_dict() if job is not None else None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return job.to_dict()
+                self.condition.wait(remaining)
+
+    def cancel(self, job_id) -> bool:
+        """
+        :return: True if the job was waiting or running and is now cancelled.
+        """
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return False
+            self._cancel(job)
+            return True
+
+    def cancel_game(self, game_id) -> None:
+        """
+        Cancels the search of the game, if there is one. Called whenever the game changes.
+        """
+        with self.condition:
+            job = self.active_by_game.get(game_id)
+            if job is not None:
+                self._cancel(job)
+
+    def stats(self) -> dict:
+        with self.condition:
+            statuses = [job.status for job in self.jobs.values()]
+            return {status: statuses.count(status) for status in (QUEUED, RUNNING, DONE, CANCELLED, FAILED)} | {
+                'max_pending': self.max_pending,
+                'workers': self.workers,
+            }
+
+    def close(self) -> None:
+        if self.pool is not None:
+            with self.condition:
+                for job in list(self.active_by_game.values()):
+                    self._cancel(job)
+            self.pool.shutdown(cancel_futures=True)
+            self.progress.put(None)
+            self.listener.join()
+            self.pool = None
+
+    def _get_pool(self):
+        if self.pool is None:
+            # The pool is started from a request thread, with other threads running and self.condition held.
+            # A forked worker would copy those locks in whatever state they are, spawned workers start clean.
+            context = multiprocessing.get_context('spawn')
+            self.progress = context.Queue()
+            self.cancel_flags = context.Array('b', self.max_pending, lock=False)
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_init_worker,
+                                            initargs=(self.progress, self.cancel_flags))
+            self.listener = threading.Thread(target=self._listen, name='search-progress', daemon=True)
+            self.listener.start()
+        return self.pool
+
+    def _listen(self) -> None:
+        """
+        Moves the progress reported by the workers onto the jobs.
+        """
+        while (message := self.progress.get()) is not None:
+            job_id, kind, payload = message
+            with self.condition:
+                job = self.jobs.get(job_id)
+                if job is None or job.status in FINISHED:
+                    continue
+                if kind == 'running':
+                    job.status = RUNNING
+                else:
+                    self._add_iteration(job, *payload)
+                self.condition.notify_all()
+
+    def _finish(self, job, future) -> None:
+        with self.condition:
+            if future.cancelled():
+                job.status = CANCELLED
+            elif future.exception() is not None:
+                job.status = FAILED
+                job.error = repr(future.exception())
+            else:
+                result = future.result()
+                # The last iterations can still be on their way from the worker
+                if result is not None:
+                    value, best_move, depth, nodes = result
+                    self._add_iteration(job, value, best_move, depth, nodes, None)
+                if job.status != CANCELLED:
+                    job.status = DONE
+            job.finished_at = time.monotonic()
+            self.free_slots.append(job.slot)
+            if self.active_by_game.get(job.game_id) is job:
+                del self.active_by_game[job.game_id]
+            self.condition.notify_all()
+
+    def _cancel(self, job) -> None:
+        job.status = CANCELLED
+        self.cancel_flags[job.slot] = 1
+        job.future.cancel()
+        if self.active_by_game.get(job.game_id) is job:
+            del self.active_by_game[job.game_id]
+        self.condition.notify_all()
+
+    @staticmethod
+    def _add_iteration(job, value, best_move, depth, nodes, seconds) -> None:
+        if job.iterations and job.iterations[-1]['depth'] >= depth:
+            return
+        job.iterations.append({
+            'depth': depth,
+            'move': best_move,
+            # JSON has no infinity, a won or lost game has no value and says so in outcome instead
+            'value': value if math.isfinite(value) else None,
+            'outcome': 'win' if value == float('inf') else 'loss' if value == float('-inf') else None,
+            'nodes': nodes,
+            'seconds': seconds,
+        })
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job.finished_at is not None and now - job.finished_at > FINISHED_TTL]:
+            del self.jobs[job_id]
@@ -0,0 +1,151 @@
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Rough size of one stored entry: six list slots plus the key and value objects they point to
+ESTIMATED_ENTRY_BYTES = 170
+
+
+class TranspositionTable:
+    """
+    A fixed size transposition table for alpha-beta search.
+
+    Every entry stores the depth it was searched to, the value, whether that value is exact
+    or only a lower/upper bound (a node that was cut off is not exact), and the best move.
+
+    The table is split into buckets of two slots:
+    - Slot 0 is depth-preferred, it is only replaced by an entry searched at least as deep.
+    - Slot 1 is always-replace, it takes every entry that was not deep enough for slot 0.
+    This keeps the expensive deep results around while recent shallow results still get cached.
+
+    The table is meant to be kept between the moves of a game. Every search (move) starts a new
+    generation with new_search(), and every entry remembers the generation it was last used in.
+    Entries from earlier generations can still be found, but a depth-preferred slot holding one
+    is given up to any new entry, however shallow. So old results age out as the game
+    moves on, without throwing away the subtrees the next search will visit again.
+
+    The entries are kept in preallocated parallel lists, so the memory used is fixed
+    by the size given at construction and does not grow during long runs.
+    """
+
+    def __init__(self, memory_mb=32):
+        """
+        :param memory_mb: The approximate memory budget of the table in megabytes.
+        """
+        number_of_slots = 2
+        while number_of_slots * 2 * ESTIMATED_ENTRY_BYTES <= memory_mb * 1024 * 1024:
+            number_of_slots *= 2
+        self.number_of_slots = number_of_slots
+        self.bucket_mask = number_of_slots // 2 - 1
+
+        self.keys = [None] * number_of_slots
+        self.depths = [-1] * number_of_slots
+        self.values = [0] * number_of_slots
+        self.flags = [EXACT] * number_of_slots
+        self.best_moves = [None] * number_of_slots
+        self.generations = [0] * number_of_slots
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def new_search(self) -> None:
+        """
+        Starts a new generation, making every entry stored so far replaceable.
+        """
+        self.generation += 1
+
+    def _bucket(self, key) -> int:
+        return (hash(key) & self.bucket_mask) << 1
+
+    def probe(self, key):
+        """
+        Looks up a position.
+
+        :param key: The hashable key of the position.
+
+        :return: (depth, value, flag, best_move) if the position is stored, None otherwise.
+        """
+        slot = self._bucket(key)
+        for index in (slot, slot + 1):
+            if self.keys[index] == key:
+                self.hits += 1
+                # Still useful, so it should not age out
+                self.generations[index] = self.generation
+                return self.depths[index], self.values[index], self.flags[index], self.best_moves[index]
+        self.misses += 1
+        # The bucket holds other positions that map to the same index
+        if self.keys[slot] is not None or self.keys[slot + 1] is not None:
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, value, flag, best_move) -> None:
+        """
+        Stores a search result, following the depth-preferred/always-replace scheme.
+        An entry from an earlier generation in the depth-preferred slot is replaced regardless of depth.
+
+        :param key: The hashable key of the position.
+        :param depth: The remaining depth the position was searched with.
+        :param value: The value found by the search.
+        :param flag: EXACT, LOWER_BOUND or UPPER_BOUND.
+        :param best_move: The best move found (a square index or PASS).
+        """
+        self.stores += 1
+        slot = self._bucket(key)
+        keys = self.keys
+        if keys[slot] == key or depth >= self.depths[slot] or self.generations[slot] != self.generation:
+            # Demote the old deep entry to the always-replace slot instead of throwing it away
+            if keys[slot] is not None and keys[slot] != key:
+                self._write(slot + 1, keys[slot], self.depths[slot], self.values[slot],
+                            self.flags[slot], self.best_moves[slot], self.generations[slot])
+            elif keys[slot + 1] == key:
+                keys[slot + 1] = None
+                self.depths[slot + 1] = -1
+        else:
+            slot += 1
+        self._write(slot, key, depth, value, flag, best_move, self.generation)
+
+    def _write(self, index, key, depth, value, flag, best_move, generation) -> None:
+        self.keys[index] = key
+        self.depths[index] = depth
+        self.values[index] = value
+        self.flags[index] = flag
+        self.best_moves[index] = best_move
+        self.generations[index] = generation
+
+    def clear(self) -> None:
+        """
+        Empties the table and resets the counters. The table keeps its size.
+        """
+        self.keys = [None] * self.number_of_slots
+        self.depths = [-1] * self.number_of_slots
+        self.best_moves = [None] * self.number_of_slots
+        self.generations = [0] * self.number_of_slots
+        self.generation = 0
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def stats(self) -> dict:
+        """
+        :return: The counters and the hit rate, to measure how effective the table is.
+        """
+        probes = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'hit_rate': self.hits / probes if probes else 0.0,
+            'slots': self.number_of_slots,
+            'generation': self.generation,
+        }
+
+    def __len__(self) -> int:
+        return sum(1 for key in self.keys if key is not None)
@@ -1,81 +1,38 @@
-from flask import Flask, request, jsonify
-import sqlite3
+import json
+import math
+import os
+from flask import Flask, Response, request, jsonify, stream_with_context
+from AI_opponent.SearchService import SearchService, DEFAULT_TIME_BUDGET, DEFAULT_MAX_PENDING, FINISHED
 from othello.GameState import GameState
+from othello.bitboard import PASS
+from persistence.Database import Database
+from persistence.GameStore import GameStore, DEFAULT_MAX_GAMES, DEFAULT_MAX_BYTES
+from persistence.WriteBehind import WriteBehind
 
-app = Flask(__name__)
-DATABASE = 'src/othello.db'
-gamestate_store = {}
-
-@app.before_first_request
-def init_db():
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('''
-              CREATE TABLE IF NOT EXISTS games (
-                  id INTEGER PRIMARY KEY, 
-                  black_board INTEGER,
-                  white_board INTEGER,
-                  current_player TEXT,
-                  current_turn INTEGER,
-                  game_over BOOLEAN
-            )'''
-        )
-    c.execute('''
-              CREATE TABLE IF NOT EXISTS game_history (
-                  game_id INTEGER,
-                  turn INTEGER,
-                  black_board INTEGER,
-                  white_board INTEGER,
-                  current_player TEXT,
-                  PRIMARY KEY (game_id, turn)
-              )'''
-        )
-    conn.commit()
-    conn.close()
-
-def save_gamestate(game_id, game_state):
-    conn = sqlite3.connect('othello.db')
-    c = conn.cursor()
-    c.execute('REPLACE INTO games (id, black_board, white_board, current_player, current_turn, game_over) VALUES (?, ?, ?, ?, ?, ?)', 
-              (game_id, game_state.black_board, game_state.white_board, game_state.current_player, game_state.current_turn, game_state.game_over))
-    conn.commit()
-    conn.close()
-
-def save_game_history(game_id, game_state):
-    conn = sqlite3.connect('othello.db')
-    c = conn.cursor()
-    c.execute('INSERT INTO game_history (game_id, turn, black_board, white_board, current_player) VALUES (?, ?, ?, ?, ?)', 
-              (game_id, game_state.current_turn, game_state.black_board, game_state.white_board, game_state.current_player))
-    conn.commit()
-    conn.close()
-
-def load_gamestate(game_id):
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('SELECT black_board, white_board, current_player, current_turn, game_over FROM games WHERE id = ?', (game_id,))
-    gamestate_information = c.fetchone()
-    conn.close()
-    
-    if gamestate_information:
-        return GameState(gamestate_information)
-    return None
+# Seconds a move may wait before it is saved, see persistence/WriteBehind.py for what a crash can lose then.
+# With 0 every move is saved before /make_move answers
+WRITE_BEHIND_DELAY = float(os.environ.get('OTHELLO_WRITE_BEHIND', 0))
+# Games kept in memory, the least recently used ones are dropped (and loaded again when needed) past these
+MAX_GAMES = int(os.environ.get('OTHELLO_MAX_GAMES', DEFAULT_MAX_GAMES))
+MAX_GAMES_BYTES = int(os.environ.get('OTHELLO_MAX_GAMES_MB', DEFAULT_MAX_BYTES // (1024 * 1024))) * 1024 * 1024
+# Processes searching AI moves (all cores if not set) and the searches that may be waiting or running at once
+SEARCH_WORKERS = int(os.environ['OTHELLO_SEARCH_WORKERS']) if 'OTHELLO_SEARCH_WORKERS' in os.environ else None
+MAX_PENDING_SEARCHES = int(os.environ.get('OTHELLO_MAX_PENDING_SEARCHES', DEFAULT_MAX_PENDING))
+# Seconds between keep-alive comments on an idle /ai_move stream
+STREAM_KEEPALIVE = 15
 
-def load_game_history(game_id):
-    conn = sqlite3.connect('othello.db')
-    c = conn.cursor()
-    c.execute('SELECT turn, black_board, white_board, current_player FROM game_history WHERE game_id = ? ORDER BY turn', (game_id,))
-    rows = c.fetchall()
-    conn.close()
-    history = [{'turn': row[0], 'black_board': row[1], 'white_board': row[2], 'current_player': row[3]} for row in rows]
-    return history
+app = Flask(__name__)
+database = WriteBehind(Database(), WRITE_BEHIND_DELAY) if WRITE_BEHIND_DELAY > 0 else Database()
+gamestate_store = GameStore(database, MAX_GAMES, MAX_GAMES_BYTES)
+search_service = SearchService(SEARCH_WORKERS, MAX_PENDING_SEARCHES)
 
 @app.route('/init', methods=['POST'])
 def init():
     game_id = request.json.get('game_id', 1)
     gamestate = GameState()
-    gamestate_store[game_id] = gamestate
-    save_gamestate(gamestate)
-    save_game_history(game_id, gamestate)
+    gamestate_store.put(game_id, gamestate)
+    database.start_game(game_id, gamestate)
+    search_service.cancel_game(game_id)
     return jsonify({
         'black_board': gamestate.board.get_board('black'),
         'white_board': gamestate.board.get_board('white'),
@@ -86,15 +43,10 @@ def init():
     
 @app.route('/get_gamestate', methods=['GET'])
 def get_gamestate():
-    game_id = request.args.get('game_id', 1)
-    if game_id in gamestate_store:
-        gamestate = gamestate_store[game_id]
-    else:
-        gamestate = load_gamestate(game_id)
-        if gamestate:
-            gamestate_store[game_id] = gamestate
-        else:
-            return jsonify({'error': 'Game not found'})
+    game_id = request.args.get('game_id', 1, type=int)
+    gamestate = gamestate_store.get(game_id)
+    if gamestate is None:
+        return jsonify({'error': 'Game not found'})
         
     return jsonify({
         'black_board': gamestate.board.get_board('black'),
@@ -106,9 +58,25 @@ def get_gamestate():
     
 @app.route('/get_game_history', methods=['GET'])
 def get_game_history():
-    game_id = request.args.get('game_id', 1)
-    history = load_game_history(game_id)
-    return jsonify(history)
+    game_id = request.args.get('game_id', 1, type=int)
+    ply = request.args.get('ply', type=int)
+    if ply is None:
+        # A game in memory has its history on its undo stack, otherwise it is replayed from the move log of its row
+        gamestate = gamestate_store.peek(game_id)
+        if gamestate is not None and gamestate.move_log is not None:
+            return jsonify([{'turn': turn, 'black_board': black_board, 'white_board': white_board, 'current_player': current_player}
+                            for black_board, white_board, current_player, turn in gamestate.history()])
+        return jsonify(database.load_game_history(game_id))
+
+    # A single position of the game, replayed from the closest checkpoint of its move log
+    gamestate = gamestate_store.get(game_id)
+    if gamestate is None:
+        return jsonify({'error': 'Game not found'})
+    try:
+        black_board, white_board, current_player, turn = gamestate.position_at(ply)
+    except (IndexError, ValueError) as error:
+        return jsonify({'error': str(error)})
+    return jsonify({'turn': turn, 'black_board': black_board, 'white_board': white_board, 'current_player': current_player})
 
 @app.route('/make_move', methods=['POST'])
 def make_move():
@@ -116,21 +84,22 @@ def make_move():
     row = request.json.get('row')
     col = request.json.get('col')
     
-    if game_id in gamestate_store:
-        gamestate = gamestate_store[game_id]
-    else:
-        gamestate = load_gamestate(game_id)
-        if gamestate:
-            gamestate_store[game_id] = gamestate
-        else:
-            return jsonify({'error': 'Game not found'})
+    gamestate = gamestate_store.get(game_id)
+    if gamestate is None:
+        return jsonify({'error': 'Game not found'})
         
-    valid_move = gamestate.make_move(row, col)
+    # Anything but a row 0-7 and a column letter A-H is not a square of the board
+    if (not isinstance(row, int) or isinstance(row, bool) or not 0 <= row < 8 or
+            not isinstance(col, str) or len(col) != 1 or not 'A' <= col.upper() <= 'H'):
+        return jsonify({'error': 'Invalid move'})
+    # The API speaks row number + column letter, the game works with square indices
+    valid_move = gamestate.make_move(row * 8 + ord(col.upper()) - 65)
     if not valid_move:
         return jsonify({'error': 'Invalid move'})
     
-    save_gamestate(game_id, gamestate)
-    save_game_history(game_id, gamestate)
+    database.save_move(game_id, gamestate)
+    # A search of the position before the move is of no use anymore
+    search_service.cancel_game(game_id)
     
     return jsonify({
         'black_board': gamestate.board.get_board('black'),
@@ -140,10 +109,92 @@ def make_move():
         'current_turn': gamestate.current_turn
     })
 
+def ai_job_json(job):
+    """
+    The job of the search service with its moves written the way the API takes them, row number + column letter.
+    """
+    def move_json(iteration):
+        square = iteration['move']
+        move = {'pass': True} if square == PASS else {'pass': False, 'row': square // 8, 'col': chr(65 + square % 8)}
+        return {**iteration, 'move': move}
+
+    job = dict(job)
+    job['iterations'] = [move_json(iteration) for iteration in job['iterations']]
+    job['best'] = job['iterations'][-1] if job['iterations'] else None
+    return job
+
+@app.route('/ai_move', methods=['POST'])
+def ai_move():
+    """
+    Starts a search for the player to move and answers at once with the job, whose job_id can be
+    polled on /ai_move/<job_id> or streamed from /ai_move/<job_id>/stream.
+    """
+    game_id = request.json.get('game_id', 1)
+    time_budget = request.json.get('time_budget', DEFAULT_TIME_BUDGET)
+    if not isinstance(game_id, int) or isinstance(game_id, bool):
+        return jsonify({'error': 'Invalid game_id'}), 400
+    # NaN or infinity would give a search that never times out
+    if (not isinstance(time_budget, (int, float)) or isinstance(time_budget, bool) or
+            not math.isfinite(time_budget)):
+        return jsonify({'error': 'Invalid time_budget'}), 400
+    
+    gamestate = gamestate_store.get(game_id)
+    if gamestate is None:
+        return jsonify({'error': 'Game not found'})
+    if gamestate.game_over:
+        return jsonify({'error': 'Game is over'})
+    
+    job = search_service.submit(game_id, gamestate.to_position(), gamestate.hash, time_budget)
+    if job is None:
+        return jsonify({'error': 'Too many searches, try again later'}), 429
+    return jsonify(ai_job_json(job)), 202
+
+@app.route('/ai_move/<int:job_id>', methods=['GET'])
+def get_ai_move(job_id):
+    job = search_service.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(ai_job_json(job))
+
+@app.route('/ai_move/<int:job_id>', methods=['DELETE'])
+def cancel_ai_move(job_id):
+    return jsonify({'cancelled': search_service.cancel(job_id)})
+
+@app.route('/ai_move/<int:job_id>/stream', methods=['GET'])
+def stream_ai_move(job_id):
+    """
+    Server-sent events: an event with the job every time an iteration of the search finishes, the last one when it is done.
+    """
+    if search_service.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def events():
+        seen = -1
+        while True:
+            job = search_service.wait(job_id, seen, STREAM_KEEPALIVE)
+            if job is None:
+                return
+            if len(job['iterations']) == seen and job['status'] not in FINISHED:
+                yield ': keep-alive\n\n'
+                continue
+            seen = len(job['iterations'])
+            yield f"data: {json.dumps(ai_job_json(job))}\n\n"
+            if job['status'] in FINISHED:
+                return
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/store_stats', methods=['GET'])
+def store_stats():
+    return jsonify(gamestate_store.stats())
+
+@app.route('/search_stats', methods=['GET'])
+def search_stats():
+    return jsonify(search_service.stats())
+
 @app.route('/')
 def home():
     return 'Othello API'
 
 if __name__ == '__main__':
-    init_db()
     app.run(debug=True, port=5001)
\ No newline at end of file
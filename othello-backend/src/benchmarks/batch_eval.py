@@ -0,0 +1,38 @@
+"""
+Compares the throughput of batch_eval on a whole array of positions with fused_eval
+called once per position, and checks that both give exactly the same scores.
+
+Run from the src folder: python -m benchmarks.batch_eval [positions]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from evaluation_function.batch_eval import batch_eval
+from evaluation_function.fused_eval import fused_eval
+from gamestates.generate_gamestates import generate_gamestates
+from othello.Position import Position
+
+
+if __name__ == "__main__":
+    number_of_positions = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    random.seed(0)
+    gamestates = generate_gamestates(number_of_positions)
+    black = np.array([gamestate[0] for gamestate in gamestates], dtype=np.uint64)
+    white = np.array([gamestate[1] for gamestate in gamestates], dtype=np.uint64)
+
+    for beta_features in (False, True):
+        start = time.perf_counter()
+        scores = [fused_eval(Position.from_boards(*gamestate), 'black', 'white', beta_features=beta_features) for gamestate in gamestates]
+        fused_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch_scores = batch_eval(black, white, beta_features=beta_features)
+        batch_seconds = time.perf_counter() - start
+        assert batch_scores.tolist() == scores, "batch_eval does not match fused_eval"
+
+        print(f"beta_features={beta_features}:")
+        print(f"  fused_eval: {number_of_positions / fused_seconds:,.0f} positions/s")
+        print(f"  batch_eval: {number_of_positions / batch_seconds:,.0f} positions/s ({fused_seconds / batch_seconds:.1f}x)")
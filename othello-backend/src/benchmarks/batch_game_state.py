@@ -0,0 +1,82 @@
+"""
+Checks BatchGameState against GameState on random playouts, and compares the speed
+of stepping many games as one batch with stepping them one GameState at a time.
+
+Run from the src folder: python -m benchmarks.batch_game_state [games]
+"""
+import sys
+import time
+
+import numpy as np
+
+from othello.BatchGameState import BatchGameState, WHITE
+from othello.GameState import GameState
+from othello.bitboard import PASS
+
+
+def check(number_of_games, generator):
+    """
+    Plays random games in a batch and in separate GameStates, asserting that the
+    legal moves, boards, player to move, end of game and winner agree after every move.
+
+    :return: The number of moves played (passes included).
+    """
+    batch = BatchGameState(number_of_games)
+    games = [GameState() for _ in range(number_of_games)]
+    played = 0
+    while not batch.game_over.all():
+        moves = batch.random_moves(generator)
+        for index, game in enumerate(games):
+            assert batch.game_over[index] == game.game_over
+            if game.game_over:
+                continue
+            assert int(batch.moves[index]) == game.get_valid_moves(game.current_player)
+            assert (batch.side[index] == WHITE) == (game.current_player == 'white')
+            assert int(batch.black[index]) == game.board.get_board('black')
+            assert int(batch.white[index]) == game.board.get_board('white')
+            if moves[index] == PASS:
+                game.skip_turn()
+            else:
+                game.make_move(int(moves[index]))
+            played += 1
+        batch.step(moves)
+
+    for score, game in zip(batch.scores(), games):
+        assert game.game_over
+        assert (score > 0) == (game.winner == 'black') and (score < 0) == (game.winner == 'white')
+    return played
+
+
+def time_batch(number_of_games, generator):
+    batch = BatchGameState(number_of_games)
+    start = time.perf_counter()
+    while not batch.game_over.all():
+        batch.step(batch.random_moves(generator))
+    return time.perf_counter() - start
+
+
+def time_sequential(number_of_games, generator):
+    start = time.perf_counter()
+    for _ in range(number_of_games):
+        game = GameState()
+        while not game.game_over:
+            moves = game.get_valid_moves(game.current_player)
+            if moves == 0:
+                game.skip_turn()
+                continue
+            squares = [square for square in range(64) if moves >> square & 1]
+            game.make_move(squares[generator.integers(len(squares))])
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    number_of_games = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    generator = np.random.default_rng(0)
+
+    played = check(min(number_of_games, 500), generator)
+    print(f"BatchGameState matches GameState on {min(number_of_games, 500)} random games ({played} moves)")
+
+    batch_seconds = time_batch(number_of_games, generator)
+    sequential_seconds = time_sequential(number_of_games, generator)
+    print(f"{number_of_games} random games, one GameState at a time: {sequential_seconds:.2f}s")
+    print(f"{number_of_games} random games as one batch:             {batch_seconds:.2f}s ({sequential_seconds / batch_seconds:.1f}x)")
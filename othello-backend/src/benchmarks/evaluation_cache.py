@@ -0,0 +1,53 @@
+"""
+Measures how often leaf evaluations are repeated during play, and how much time
+the EvaluationCache saves by remembering them.
+The same games are played twice with iterative deepening and a node budget per move,
+once calling fused_eval directly and once through an EvaluationCache.
+Most of the hits come from the next move: its shallow iterations evaluate the same leaves
+as the deep iterations of the move before.
+
+Run from the src folder: python -m benchmarks.evaluation_cache [games] [node_budget] [max_entries]
+"""
+import random
+import sys
+import time
+
+from AI_opponent.MinMaxAgent import MinMaxAgent
+from evaluation_function.EvaluationCache import EvaluationCache
+from evaluation_function.fused_eval import fused_eval
+from gamestates.generate_gamestates import generate_gamestates
+from othello.Position import Position
+from othello.bitboard import PASS
+
+
+def play(gamestates, evaluation, node_budget):
+    agent = MinMaxAgent()
+    moves = []
+    start = time.perf_counter()
+    for black, white, side in gamestates:
+        position = Position.from_boards(black, white, side)
+        while not position.is_terminal():
+            _, move, _ = agent.iterative_deepening(position, evaluation, node_budget=node_budget, beta_features=True)
+            agent.clear_cache()
+            moves.append(move)
+            position = position.pass_turn() if move == PASS else position.apply(move)
+    return moves, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    number_of_games = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    node_budget = int(sys.argv[2]) if len(sys.argv) > 2 else 3000
+    max_entries = int(sys.argv[3]) if len(sys.argv) > 3 else 200_000
+    random.seed(0)
+    gamestates = generate_gamestates(number_of_games)
+
+    random.seed(1)
+    uncached_moves, uncached_seconds = play(gamestates, fused_eval, node_budget)
+    cache = EvaluationCache(fused_eval, max_entries)
+    random.seed(1)
+    cached_moves, cached_seconds = play(gamestates, cache, node_budget)
+    assert uncached_moves == cached_moves, "the cache changed the moves played"
+
+    print(f"Without cache: {uncached_seconds:.2f}s")
+    print(f"With cache:    {cached_seconds:.2f}s ({uncached_seconds / cached_seconds:.2f}x)")
+    print(f"Cache: {cache.stats()}")
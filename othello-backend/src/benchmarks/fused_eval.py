@@ -0,0 +1,41 @@
+"""
+Compares the throughput (evaluations per second) of combined_eval and fused_eval,
+and checks that both give exactly the same score for every position.
+Every evaluation gets a fresh Position, so the moves and stability memoized by
+one evaluator are not reused by the other.
+
+Run from the src folder: python -m benchmarks.fused_eval [positions]
+"""
+import random
+import sys
+import time
+
+from evaluation_function.combined_eval import combined_eval
+from evaluation_function.fused_eval import fused_eval
+from gamestates.generate_gamestates import generate_gamestates
+from othello.Position import Position
+
+
+def run(evaluation_function, gamestates, beta_features):
+    scores = []
+    start = time.perf_counter()
+    for black, white, side in gamestates:
+        scores.append(evaluation_function(Position.from_boards(black, white, side), 'black', 'white', beta_features=beta_features))
+        scores.append(evaluation_function(Position.from_boards(black, white, side), 'white', 'black', beta_features=beta_features))
+    return scores, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    number_of_positions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    random.seed(0)
+    gamestates = generate_gamestates(number_of_positions)
+
+    for beta_features in (False, True):
+        combined_scores, combined_seconds = run(combined_eval, gamestates, beta_features)
+        fused_scores, fused_seconds = run(fused_eval, gamestates, beta_features)
+        assert combined_scores == fused_scores, "fused_eval does not match combined_eval"
+
+        evaluations = len(combined_scores)
+        print(f"beta_features={beta_features}:")
+        print(f"  combined_eval: {evaluations / combined_seconds:,.0f} evaluations/s")
+        print(f"  fused_eval:    {evaluations / fused_seconds:,.0f} evaluations/s ({combined_seconds / fused_seconds:.2f}x)")
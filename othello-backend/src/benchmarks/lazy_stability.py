@@ -0,0 +1,49 @@
+"""
+Compares search speed (nodes per second) with lazily computed stability against
+computing it eagerly for every position, as GameState.next_turn used to do after every move.
+
+Run from the src folder: python -m benchmarks.lazy_stability [positions] [depth]
+"""
+import random
+import sys
+import time
+
+from AI_opponent.MinMaxAgent import MinMaxAgent
+from evaluation_function.combined_eval import combined_eval
+from gamestates.generate_gamestates import generate_gamestates
+from othello.Position import Position
+
+
+class EagerPosition(Position):
+    """
+    A Position that computes the safe and unstable pieces of both colours as soon as it is created.
+    """
+    __slots__ = ()
+
+    def __init__(self, player, opponent, side, hash=None):
+        super().__init__(player, opponent, side, hash)
+        for colour in ('black', 'white'):
+            self.safe_board(colour)
+            self.unstable_board(colour)
+
+
+def run(position_class, gamestates, depth):
+    nodes = 0
+    start = time.perf_counter()
+    for index, (black, white, side) in enumerate(gamestates):
+        agent = MinMaxAgent()
+        agent.get_best_move(position_class.from_boards(black, white, side), combined_eval, depth, beta_features=index % 2 == 0)
+        nodes += agent.nodes
+    return nodes, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    number_of_positions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    random.seed(0)
+    gamestates = generate_gamestates(number_of_positions)
+
+    for name, position_class in (("Eager stability", EagerPosition), ("Lazy stability", Position)):
+        random.seed(1)
+        nodes, seconds = run(position_class, gamestates, depth)
+        print(f"{name}: {nodes} nodes in {seconds:.2f}s ({nodes / seconds:,.0f} nodes/s)")
@@ -0,0 +1,116 @@
+"""
+Microbenchmark for the move generator.
+Compares the Kogge-Stone generator in othello.bitboard with the direction-walking
+generator GameState used originally, and checks that both give identical results.
+
+Run from the src folder: python -m benchmarks.move_generation
+"""
+import random
+import time
+
+from othello.bitboard import get_moves_and_capturable
+
+DIRECTIONS = {
+    "north": -8,
+    "south": 8,
+    "west": -1,
+    "east": 1,
+    "north_west": -9,
+    "north_east": -7,
+    "south_west": 7,
+    "south_east": 9
+}
+
+WRAPAROUND_MASKS = {
+    'north': 0b00000000_11111111_11111111_11111111_11111111_11111111_11111111_11111111,
+    'south': 0b11111111_11111111_11111111_11111111_11111111_11111111_11111111_00000000,
+    'east': 0b11111110_11111110_11111110_11111110_11111110_11111110_11111110_11111110,
+    'west': 0b01111111_01111111_01111111_01111111_01111111_01111111_01111111_01111111,
+    'north_east': 0b00000000_11111110_11111110_11111110_11111110_11111110_11111110_11111110,
+    'north_west': 0b00000000_01111111_01111111_01111111_01111111_01111111_01111111_01111111,
+    'south_east': 0b11111110_11111110_11111110_11111110_11111110_11111110_11111110_00000000,
+    'south_west': 0b01111111_01111111_01111111_01111111_01111111_01111111_01111111_00000000
+}
+
+
+def _shift_bitboard_direction(bitboard, shift):
+    return (bitboard << shift) if shift > 0 else (bitboard >> abs(shift))
+
+
+def legacy_moves_and_capturable(player_board, target_board):
+    """The original GameState.get_valid_moves loop, kept as the reference implementation."""
+    empty_board = ~(player_board | target_board)
+    valid_moves = 0
+    capturable_pieces = 0
+    for direction, shift in DIRECTIONS.items():
+        potentially_capturable = 0
+        mask = WRAPAROUND_MASKS[direction]
+        can_place_in_direction = False
+        candidate_moves = _shift_bitboard_direction(player_board, shift) & target_board & mask
+        while candidate_moves > 0:
+            valid_placements = _shift_bitboard_direction(candidate_moves, shift) & empty_board & mask
+            if valid_placements > 0:
+                can_place_in_direction = True
+            valid_moves |= valid_placements
+            potentially_capturable |= candidate_moves
+            candidate_moves = _shift_bitboard_direction(candidate_moves, shift) & target_board & mask
+        if can_place_in_direction:
+            capturable_pieces |= potentially_capturable
+    return valid_moves, capturable_pieces
+
+
+def random_positions(n, seed=0):
+    """
+    Random (player, opponent) bitboard pairs.
+    Half of them are fully random boards, the other half come from random playouts,
+    so both unusual and realistic positions are covered.
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < n // 2:
+        occupied = rng.getrandbits(64)
+        player = occupied & rng.getrandbits(64)
+        positions.append((player, occupied & ~player))
+    while len(positions) < n:
+        player, opponent = 0x00000008_10000000, 0x00000010_08000000
+        for _ in range(rng.randint(0, 60)):
+            moves, _ = get_moves_and_capturable(player, opponent)
+            if moves == 0:
+                player, opponent = opponent, player
+                continue
+            squares = [i for i in range(64) if moves >> i & 1]
+            move = 1 << rng.choice(squares)
+            # Flip by brute force, this is only used to produce positions
+            flips = 0
+            for shift, mask in ((s, WRAPAROUND_MASKS[d]) for d, s in DIRECTIONS.items()):
+                run = 0
+                square = _shift_bitboard_direction(move, shift) & mask
+                while square & opponent:
+                    run |= square
+                    square = _shift_bitboard_direction(square, shift) & mask
+                if square & player:
+                    flips |= run
+            player, opponent = opponent ^ flips, player | move | flips
+        positions.append((player, opponent))
+    return positions
+
+
+def time_generator(generator, positions, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for player, opponent in positions:
+            generator(player, opponent)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    positions = random_positions(20_000)
+    mismatches = [p for p in positions if legacy_moves_and_capturable(*p) != get_moves_and_capturable(*p)]
+    print(f"Checked {len(positions)} positions, mismatches: {len(mismatches)}")
+
+    calls = len(positions) * 5
+    legacy_time = time_generator(legacy_moves_and_capturable, positions, 5)
+    kogge_stone_time = time_generator(get_moves_and_capturable, positions, 5)
+    print(f"Legacy generator:      {legacy_time:.3f}s ({calls / legacy_time:,.0f} calls/s)")
+    print(f"Kogge-Stone generator: {kogge_stone_time:.3f}s ({calls / kogge_stone_time:,.0f} calls/s)")
+    print(f"Speedup: {legacy_time / kogge_stone_time:.2f}x")
@@ -0,0 +1,44 @@
+"""
+Measures how the root-split ParallelAgent scales with the number of worker processes,
+on fixed positions from generate_gamestates, and checks that every worker count
+finds the same moves and values.
+
+Run from the src folder: python -m benchmarks.parallel_search [positions] [depth] [max_workers]
+"""
+import os
+import random
+import sys
+import time
+
+from AI_opponent.ParallelAgent import ParallelAgent
+from evaluation_function.fused_eval import fused_eval
+from gamestates.generate_gamestates import generate_gamestates
+from othello.Position import Position
+
+
+def run(workers, gamestates, depth):
+    results = []
+    with ParallelAgent(workers) as agent:
+        # Start the worker processes before the clock starts
+        agent.get_best_move(Position.from_boards(*gamestates[0]), fused_eval, 2)
+        start = time.perf_counter()
+        for index, (black, white, side) in enumerate(gamestates):
+            agent.clear_cache()
+            results.append(agent.get_best_move(Position.from_boards(black, white, side), fused_eval, depth, beta_features=index % 2 == 0))
+        return results, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    number_of_positions = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count()
+    random.seed(0)
+    gamestates = generate_gamestates(number_of_positions)
+
+    baseline_results, baseline_seconds = None, None
+    for workers in range(1, max_workers + 1):
+        results, seconds = run(workers, gamestates, depth)
+        if baseline_results is None:
+            baseline_results, baseline_seconds = results, seconds
+        assert results == baseline_results, f"{workers} workers found different moves"
+        print(f"{workers} workers: {seconds:.2f}s ({baseline_seconds / seconds:.2f}x)")
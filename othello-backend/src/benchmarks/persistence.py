@@ -0,0 +1,101 @@
+"""
+Load test of the move persistence: several threads (the request threads of the API) play random
+games and save every move, as /make_move does. Once the way app.py used to do it, a new connection
+and a commit for the game row and again for the history row, then through Database,
+one pooled connection per thread in WAL mode and one transaction per move, and last through
+WriteBehind, which only queues the move and saves the queue in the background.
+Only the time spent saving is measured (for WriteBehind including the last flush),
+the games are the same for all three.
+
+Run from the src folder: python -m benchmarks.persistence [threads] [games per thread]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from othello.GameState import GameState
+from othello.bitboard import squares
+from persistence.Database import Database, CREATE_GAMES, CREATE_GAME_HISTORY, SAVE_HISTORY, to_signed
+from persistence.WriteBehind import WriteBehind
+
+
+class ConnectPerCall:
+    """
+    The old app.py functions: every save opens the database, commits one row and closes it again.
+    """
+    SAVE_GAME = 'REPLACE INTO games (id, black_board, white_board, current_player, current_turn, game_over) VALUES (?, ?, ?, ?, ?, ?)'
+
+    def __init__(self, path):
+        self.path = path
+        connection = sqlite3.connect(path)
+        connection.execute(CREATE_GAMES)
+        connection.execute(CREATE_GAME_HISTORY)
+        connection.commit()
+        connection.close()
+
+    def save_move(self, game_id, gamestate):
+        black_board = to_signed(gamestate.board.get_board('black'))
+        white_board = to_signed(gamestate.board.get_board('white'))
+        for statement, row in ((self.SAVE_GAME, (game_id, black_board, white_board, gamestate.current_player, gamestate.current_turn, gamestate.game_over)),
+                               (SAVE_HISTORY, (game_id, gamestate.current_turn, black_board, white_board, gamestate.current_player))):
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute(statement, row)
+            connection.commit()
+            connection.close()
+
+
+def play(database, thread_index, games, latencies):
+    generator = random.Random(thread_index)
+    for game in range(games):
+        game_id = thread_index * games + game
+        gamestate = GameState()
+        while not gamestate.game_over:
+            moves = gamestate.get_valid_moves(gamestate.current_player)
+            if moves == 0:
+                gamestate.skip_turn()
+                continue
+            gamestate.make_move(generator.choice(squares(moves)))
+            start = time.perf_counter()
+            database.save_move(game_id, gamestate)
+            latencies.append(time.perf_counter() - start)
+
+
+def load_test(database, threads, games):
+    latencies = []
+    workers = [threading.Thread(target=play, args=(database, index, games, latencies)) for index in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if isinstance(database, WriteBehind):
+        database.flush()
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / seconds, latencies[len(latencies) // 2] * 1000, latencies[len(latencies) * 99 // 100] * 1000
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    games = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = {}
+        results['connect per call'] = load_test(ConnectPerCall(os.path.join(directory, 'old.db')), threads, games)
+        database = Database(os.path.join(directory, 'new.db'))
+        results['Database'] = load_test(database, threads, games)
+        database.close()
+        write_behind = WriteBehind(Database(os.path.join(directory, 'write_behind.db')))
+        results['WriteBehind'] = load_test(write_behind, threads, games)
+        write_behind.close()
+        write_behind.database.close()
+        batches = write_behind.stats()['batches']
+
+    print(f"{threads} threads, {games} games each")
+    for name, (moves_per_second, median, p99) in results.items():
+        print(f"  {name:16}: {moves_per_second:8,.0f} moves/s, median {median:.2f}ms, p99 {p99:.2f}ms")
+    print(f"WriteBehind saved the moves in {batches} transactions")
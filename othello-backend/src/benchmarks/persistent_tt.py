@@ -0,0 +1,60 @@
+"""
+Compares the nodes searched per move over whole games when the transposition table
+is cleared after every move (as main.py used to do) against keeping it between moves.
+Games are played like compare_ai: one agent plays both sides, alternating the feature sets.
+
+Run from the src folder: python -m benchmarks.persistent_tt [games] [depth] [agent]
+agent is minmax or negamax.
+"""
+import random
+import sys
+import time
+
+from AI_opponent.MinMaxAgent import MinMaxAgent
+from AI_opponent.NegamaxAgent import NegamaxAgent
+from evaluation_function.fused_eval import fused_eval
+from gamestates.generate_gamestates import generate_gamestates
+from othello.Position import Position
+from othello.bitboard import PASS
+
+
+def play(agent_class, gamestates, depth, clear_between_moves):
+    agent = agent_class()
+    nodes = 0
+    moves = 0
+    hits = 0
+    probes = 0
+    start = time.perf_counter()
+    for black, white, side in gamestates:
+        position = Position.from_boards(black, white, side)
+        beta_features = True
+        while not position.is_terminal():
+            agent.nodes = 0
+            agent.cache.reset_stats()
+            _, move = agent.get_best_move(position, fused_eval, depth, beta_features=beta_features)
+            hits += agent.cache.hits
+            probes += agent.cache.hits + agent.cache.misses
+            if clear_between_moves:
+                agent.clear_cache()
+            nodes += agent.nodes
+            moves += 1
+            position = position.pass_turn() if move == PASS else position.apply(move)
+            beta_features = not beta_features
+    return nodes, moves, time.perf_counter() - start, hits / probes
+
+
+if __name__ == "__main__":
+    number_of_games = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    agent_class = NegamaxAgent if len(sys.argv) > 3 and sys.argv[3] == 'negamax' else MinMaxAgent
+    random.seed(0)
+    gamestates = generate_gamestates(number_of_games)
+
+    results = {}
+    for name, clear_between_moves in (("Cleared every move", True), ("Kept between moves", False)):
+        random.seed(1)
+        nodes, moves, seconds, hit_rate = play(agent_class, gamestates, depth, clear_between_moves)
+        results[name] = nodes / moves
+        print(f"{name}: {nodes / moves:,.0f} nodes/move over {moves} moves in {seconds:.2f}s, hit rate {hit_rate:.1%}")
+    reduction = 1 - results["Kept between moves"] / results["Cleared every move"]
+    print(f"Reduction in nodes per move: {reduction:.1%}")
@@ -0,0 +1,65 @@
+"""
+Node count comparison of MinMaxAgent and NegamaxAgent at equal depth,
+on balanced positions from generate_gamestates.
+Also checks that the negamax move is the same as the minmax move, or has the same value.
+
+Run from the src folder: python -m benchmarks.search_nodes [positions] [depth]
+"""
+import random
+import sys
+import time
+
+from AI_opponent.MinMaxAgent import MinMaxAgent
+from AI_opponent.NegamaxAgent import NegamaxAgent
+from evaluation_function.combined_eval import combined_eval
+from gamestates.generate_gamestates import generate_gamestates
+from othello.Position import Position
+from othello.bitboard import PASS
+
+
+def search(agent_class, position, depth, beta_features):
+    agent = agent_class()
+    start = time.perf_counter()
+    value, move = agent.get_best_move(position, combined_eval, depth, beta_features=beta_features)
+    return value, move, agent.nodes, time.perf_counter() - start
+
+
+def move_value(position, move, depth, beta_features):
+    """The minmax value of playing move in position, from the perspective of the player to move."""
+    child = position.pass_turn() if move == PASS else position.apply(move)
+    value, _ = MinMaxAgent().get_best_move(child, combined_eval, depth - 1, is_maximizing=False,
+                                           player=position.side, beta_features=beta_features)
+    return value
+
+
+if __name__ == "__main__":
+    number_of_positions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    random.seed(0)
+    positions = [Position.from_boards(*gamestate) for gamestate in generate_gamestates(number_of_positions)]
+
+    totals = {MinMaxAgent: [0, 0.0], NegamaxAgent: [0, 0.0]}
+    same_move = equal_value = different = 0
+    for index, position in enumerate(positions):
+        beta_features = index % 2 == 0
+        minmax_value, minmax_move, minmax_nodes, minmax_time = search(MinMaxAgent, position, depth, beta_features)
+        negamax_value, negamax_move, negamax_nodes, negamax_time = search(NegamaxAgent, position, depth, beta_features)
+        totals[MinMaxAgent][0] += minmax_nodes
+        totals[MinMaxAgent][1] += minmax_time
+        totals[NegamaxAgent][0] += negamax_nodes
+        totals[NegamaxAgent][1] += negamax_time
+
+        if minmax_move == negamax_move:
+            same_move += 1
+        elif move_value(position, negamax_move, depth, beta_features) == minmax_value:
+            equal_value += 1
+        else:
+            different += 1
+        print(f"Position {index + 1}: minmax {minmax_nodes} nodes, negamax {negamax_nodes} nodes, "
+              f"values {minmax_value:.3f} / {negamax_value:.3f}")
+
+    print(f"\nDepth {depth}, {len(positions)} positions")
+    for agent_class, (nodes, seconds) in totals.items():
+        print(f"{agent_class.__name__}: {nodes} nodes in {seconds:.2f}s")
+    print(f"Node reduction: {1 - totals[NegamaxAgent][0] / totals[MinMaxAgent][0]:.1%}")
+    print(f"Same move: {same_move}, different move with equal value: {equal_value}, worse move: {different}")
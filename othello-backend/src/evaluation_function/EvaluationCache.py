@@ -0,0 +1,79 @@
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 200_000
+
+
+class EvaluationCache:
+    """
+    Remembers the scores of an evaluation function, so positions that are reached again
+    (in sibling subtrees, on the next move or by another agent) are not evaluated twice.
+
+    The cache is used in place of the evaluation function it wraps:
+        evaluation = EvaluationCache(fused_eval)
+        agent.get_best_move(position, evaluation, 5, beta_features=True)
+    One instance can be shared by any number of agents in the same process.
+
+    A score depends on the pieces, the player to move, whose perspective it is from and the
+    feature flags, so all of them are part of the key. The pieces are stored as they are
+    instead of as a hash, so two positions can never share a score.
+    When the cache is full the least recently used score is dropped.
+    """
+
+    def __init__(self, evaluation_function, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        :param evaluation_function: The function to cache, called as
+                                    evaluation_function(position, player, opponent, dynamic_weight=..., beta_features=...).
+        :param max_entries: The maximum number of scores kept.
+        """
+        self.evaluation_function = evaluation_function
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __call__(self, position, player, opponent, dynamic_weight = True, beta_features = False):
+        key = (position.player, position.opponent, position.side, player, dynamic_weight, beta_features)
+        entries = self.entries
+        score = entries.get(key)
+        if score is not None:
+            self.hits += 1
+            entries.move_to_end(key)
+            return score
+
+        self.misses += 1
+        score = self.evaluation_function(position, player, opponent, dynamic_weight = dynamic_weight, beta_features = beta_features)
+        entries[key] = score
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+        return score
+
+    def clear(self) -> None:
+        """
+        Drops all scores and resets the counters.
+        """
+        self.entries.clear()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        :return: The counters and the hit rate, to measure how effective the cache is.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.entries),
+            'max_entries': self.max_entries,
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,214 @@
+import numpy as np
+from othello.BatchGameState import get_moves_and_capturable, get_safe, edge_indices, popcount
+from othello.edge_patterns import EDGE_PLAYER_DISCS, EDGE_OPPONENT_DISCS, WEDGES
+from othello.bitboard import CORNERS, get_flips, squares
+from .fused_eval import MOBILITY_WEIGHTS, STABILITY_WEIGHTS, COIN_WEIGHTS, CORNERS_WEIGHTS, EDGES_WEIGHT, ORANGE_ZONE, RED_ZONE
+
+_MOBILITY_WEIGHTS = np.array(MOBILITY_WEIGHTS)
+_STABILITY_WEIGHTS = np.array(STABILITY_WEIGHTS)
+_COIN_WEIGHTS = np.array(COIN_WEIGHTS)
+_CORNERS_WEIGHTS = np.array(CORNERS_WEIGHTS)
+
+_CORNERS = np.uint64(CORNERS)
+_ORANGE_ZONE = np.uint64(ORANGE_ZONE)
+_RED_ZONE = np.uint64(RED_ZONE)
+_EDGE_PLAYER_DISCS = np.array(EDGE_PLAYER_DISCS, dtype=np.int64)
+_EDGE_OPPONENT_DISCS = np.array(EDGE_OPPONENT_DISCS, dtype=np.int64)
+_WEDGES = np.array(WEDGES, dtype=np.int64)
+
+
+def _ratio(numerator, denominator):
+    """
+    numerator / denominator, 0 where the denominator is 0 (like the "prevent division by zero" checks).
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, numerator / denominator, 0.0)
+
+
+def batch_mobility(player_boards, opponent_boards, dynamic_weight = True):
+    """
+    mobility_eval for many positions at once.
+
+    :param player_boards: uint64 array (or list of ints) with the boards of the player to evaluate for.
+    :param opponent_boards: The boards of the opponent.
+
+    :return: float64 array of scores.
+    """
+    player_boards, opponent_boards = _arrays(player_boards, opponent_boards)
+    player_moves, _ = get_moves_and_capturable(player_boards, opponent_boards)
+    opponent_moves, _ = get_moves_and_capturable(opponent_boards, player_boards)
+    return _mobility(player_moves, opponent_moves, popcount(player_boards | opponent_boards), dynamic_weight)
+
+
+def batch_stability(player_boards, opponent_boards, dynamic_weight = True):
+    """
+    stability_eval for many positions at once, see batch_mobility.
+    """
+    player_boards, opponent_boards = _arrays(player_boards, opponent_boards)
+    _, opponent_unstable = get_moves_and_capturable(player_boards, opponent_boards)
+    _, player_unstable = get_moves_and_capturable(opponent_boards, player_boards)
+    return _stability(player_boards, opponent_boards, player_unstable, opponent_unstable,
+                      popcount(player_boards), popcount(opponent_boards), popcount(player_boards | opponent_boards), dynamic_weight)
+
+
+def batch_coin(player_boards, opponent_boards, dynamic_weight = True):
+    """
+    coin_eval for many positions at once, see batch_mobility.
+    """
+    player_boards, opponent_boards = _arrays(player_boards, opponent_boards)
+    return _coin(popcount(player_boards), popcount(opponent_boards), popcount(player_boards | opponent_boards), dynamic_weight)
+
+
+def batch_corners(player_boards, opponent_boards, dynamic_weight = True):
+    """
+    corners_eval for many positions at once, see batch_mobility.
+    """
+    player_boards, opponent_boards = _arrays(player_boards, opponent_boards)
+    player_moves, _ = get_moves_and_capturable(player_boards, opponent_boards)
+    opponent_moves, _ = get_moves_and_capturable(opponent_boards, player_boards)
+    return _corners(player_boards, opponent_boards, player_moves, opponent_moves,
+                    popcount(player_boards | opponent_boards), dynamic_weight)
+
+
+def batch_danger_zones(player_boards, opponent_boards):
+    """
+    danger_zones_eval for many positions at once, see batch_mobility.
+    """
+    player_boards, opponent_boards = _arrays(player_boards, opponent_boards)
+    occupied_corners = _CORNERS & (player_boards | opponent_boards)
+    one, eight, nine, seven = np.uint64(1), np.uint64(8), np.uint64(9), np.uint64(7)
+    orange_zone = _ORANGE_ZONE & ~(occupied_corners << one | occupied_corners >> one |
+                                   occupied_corners << eight | occupied_corners >> eight)
+    red_zone = _RED_ZONE & ~(occupied_corners << nine | occupied_corners >> nine |
+                             occupied_corners << seven | occupied_corners >> seven)
+    return popcount(player_boards & orange_zone) * -0.5 + popcount(player_boards & red_zone) * -5
+
+
+def batch_edges(player_boards, opponent_boards):
+    """
+    edges_eval for many positions at once, see batch_mobility.
+    """
+    player_boards, opponent_boards = _arrays(player_boards, opponent_boards)
+    return _edges(edge_indices(player_boards, opponent_boards))
+
+
+def batch_wedges(player_boards, opponent_boards):
+    """
+    wedge_eval for many positions at once, see batch_mobility.
+    """
+    player_boards, opponent_boards = _arrays(player_boards, opponent_boards)
+    return _wedges(edge_indices(player_boards, opponent_boards), edge_indices(opponent_boards, player_boards))
+
+
+def batch_eval(player_boards, opponent_boards, dynamic_weight = True, beta_features = False):
+    """
+    combined_eval for many positions at once, the sum of the batch heuristics above.
+    Gives exactly the same score as combined_eval (and fused_eval) for every position,
+    the formulas and the order of the float operations are the same as in fused_eval.
+    The moves, piece counts and edge indices the heuristics share are computed once.
+
+    None of the heuristics depend on whose turn it is, so only the two boards are needed.
+
+    :param player_boards: uint64 array (or list of ints) with the boards of the player to evaluate for.
+    :param opponent_boards: The boards of the opponent.
+
+    :return: float64 array of scores, +-inf for won/lost and 0 for drawn finished games.
+    """
+    player_boards, opponent_boards = _arrays(player_boards, opponent_boards)
+
+    player_moves, opponent_unstable = get_moves_and_capturable(player_boards, opponent_boards)
+    opponent_moves, player_unstable = get_moves_and_capturable(opponent_boards, player_boards)
+    player_pieces = popcount(player_boards)
+    opponent_pieces = popcount(opponent_boards)
+    placed_pieces = popcount(player_boards | opponent_boards)
+
+    scores = (_mobility(player_moves, opponent_moves, placed_pieces, dynamic_weight) +
+              _stability(player_boards, opponent_boards, player_unstable, opponent_unstable,
+                         player_pieces, opponent_pieces, placed_pieces, dynamic_weight) +
+              _coin(player_pieces, opponent_pieces, placed_pieces, dynamic_weight) +
+              _corners(player_boards, opponent_boards, player_moves, opponent_moves, placed_pieces, dynamic_weight))
+    if beta_features:
+        indices = edge_indices(player_boards, opponent_boards)
+        scores = (scores + batch_danger_zones(player_boards, opponent_boards) + _edges(indices) +
+                  _wedges(indices, edge_indices(opponent_boards, player_boards)))
+
+    terminal = (player_moves == 0) & (opponent_moves == 0)
+    if np.any(terminal):
+        final = np.where(player_pieces > opponent_pieces, np.inf, np.where(player_pieces < opponent_pieces, -np.inf, 0.0))
+        scores = np.where(terminal, final, scores)
+    return scores
+
+
+def _arrays(player_boards, opponent_boards):
+    return np.asarray(player_boards, dtype=np.uint64), np.asarray(opponent_boards, dtype=np.uint64)
+
+
+def _mobility(player_moves, opponent_moves, placed_pieces, dynamic_weight):
+    # Like mobility_eval, the opponent's mobility is measured against their own moves
+    player_move_count = popcount(player_moves)
+    opponent_move_count = popcount(opponent_moves)
+    player_mobility = _ratio(player_move_count, player_move_count + opponent_move_count)
+    opponent_mobility = _ratio(opponent_move_count, 2 * opponent_move_count)
+    weight = _MOBILITY_WEIGHTS[placed_pieces] if dynamic_weight else 5
+    return weight * _ratio(player_mobility - opponent_mobility, np.abs(player_mobility) + np.abs(opponent_mobility))
+
+
+def _stability(player_boards, opponent_boards, player_unstable, opponent_unstable, player_pieces, opponent_pieces, placed_pieces, dynamic_weight):
+    # A player without pieces only happens in finished games, which batch_eval scores on its own
+    with np.errstate(divide='ignore', invalid='ignore'):
+        player_stability = popcount(get_safe(player_boards, opponent_boards)) / player_pieces + -popcount(player_unstable) / player_pieces
+        opponent_stability = popcount(get_safe(opponent_boards, player_boards)) / opponent_pieces + -popcount(opponent_unstable) / opponent_pieces
+    weight = _STABILITY_WEIGHTS[placed_pieces] if dynamic_weight else 25
+    return weight * _ratio(player_stability - opponent_stability, np.abs(player_stability) + np.abs(opponent_stability))
+
+
+def _coin(player_pieces, opponent_pieces, placed_pieces, dynamic_weight):
+    weight = _COIN_WEIGHTS[placed_pieces] if dynamic_weight else 25
+    return weight * _ratio(player_pieces - opponent_pieces, player_pieces + opponent_pieces)
+
+
+def _corners(player_boards, opponent_boards, player_moves, opponent_moves, placed_pieces, dynamic_weight):
+    # Including the corners that can be taken next move
+    player_corners = popcount(player_boards & _CORNERS) + popcount(player_moves & _CORNERS) * 0.33
+    opponent_corners = popcount(opponent_boards & _CORNERS) + popcount(opponent_moves & _CORNERS) * 0.33
+    weight = _CORNERS_WEIGHTS[placed_pieces] if dynamic_weight else 30
+    return weight * _ratio(player_corners - opponent_corners, np.abs(player_corners) + np.abs(opponent_corners))
+
+
+def _edges(indices):
+    player_edges = sum(_EDGE_PLAYER_DISCS[index] for index in indices)
+    opponent_edges = sum(_EDGE_OPPONENT_DISCS[index] for index in indices)
+    return EDGES_WEIGHT * _ratio(player_edges - opponent_edges, player_edges + opponent_edges)
+
+
+def _wedges(indices, opponent_indices):
+    player_wedges = sum(_WEDGES[index] for index in indices)
+    opponent_wedges = sum(_WEDGES[index] for index in opponent_indices)
+    return _ratio(player_wedges - opponent_wedges, np.abs(player_wedges) + np.abs(opponent_wedges))
+
+
+def evaluate_children(position, player, dynamic_weight = True, beta_features = False):
+    """
+    Scores every position reachable in one move with a single batch_eval call,
+    e.g. for move ordering or one ply searches.
+
+    :param position: The Position whose moves to score.
+    :param player: The colour to evaluate for, the other colour follows from position.side.
+
+    :return: (moves, scores), the moves as square indices and a float64 array with the score of the position after each.
+             Both are empty if the player to move has no legal moves, the pass is not scored.
+    """
+    moves = squares(position.legal_moves())
+    player_boards = []
+    opponent_boards = []
+    for move in moves:
+        move_bitboard = 1 << move
+        flips = get_flips(move_bitboard, position.player, position.opponent)
+        mover, other = position.player | move_bitboard | flips, position.opponent ^ flips
+        if player == position.side:
+            player_boards.append(mover)
+            opponent_boards.append(other)
+        else:
+            player_boards.append(other)
+            opponent_boards.append(mover)
+    return moves, batch_eval(player_boards, opponent_boards, dynamic_weight, beta_features)
@@ -1,14 +1,15 @@
 import math
+from othello.bitboard import CORNERS
 
 def corners_heuristics_weight_function(placed_pieces: int, maximum_weight: int = 100,  midpoint: int = 35, steepness: float = 0.5) -> float:
     return (-1 * maximum_weight) / (1 + math.e ** (-1* steepness * (placed_pieces - midpoint))) + maximum_weight
 
-def corners_eval(gamestate, player, opponent, placed_pieces, dynamic_weight = True):
-    corners = gamestate.board.corners
+def corners_eval(position, player, opponent, placed_pieces, dynamic_weight = True):
+    corners = CORNERS
     def corners_value(player) -> int:
-        player_board = gamestate.board.get_board(player)
+        player_board = position.get_board(player)
         corners_value = bin(player_board & corners).count('1')
-        potential_corners = bin(gamestate.get_valid_moves(player) & corners).count('1') * 0.33
+        potential_corners = bin(position.get_valid_moves(player) & corners).count('1') * 0.33
 
         return corners_value + potential_corners
     
@@ -1,11 +1,13 @@
+from othello.bitboard import CORNERS
 
-def danger_zones_eval(gamestate, player, opponent):
+
+def danger_zones_eval(position, player, opponent):
     orange_zone_penalty = -0.5
     red_zone_penalty = -5
     
     def evaluate_danger_zones(player, opponent) -> int:
-        player_board = gamestate.board.get_board(player)
-        all_occupied_corners = gamestate.board.corners & (player_board | gamestate.board.get_board(opponent))
+        player_board = position.get_board(player)
+        all_occupied_corners = CORNERS & (player_board | position.get_board(opponent))
         
         # Orange zones are the edge squares directly adjacent to the corners
         orange_zone = 0b01000010_10000001_00000000_00000000_00000000_00000000_10000001_01000010
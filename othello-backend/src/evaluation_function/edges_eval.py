@@ -1,17 +1,14 @@
+from othello.edge_patterns import edge_indices, edge_discs
+
 def edges_weight_function(placed_pieces: int, maximum_weight: int = 2,  midpoint: int = 30, steepness: float = 0.004) -> float:
     return steepness * (placed_pieces - midpoint) + maximum_weight
 
-def edges_eval(gamestate, player, opponent, placed_pieces = 0, dynamic_weight = True):
-    edges = 0b00111110_00000000_10000001_10000001_10000001_10000001_00000000_00111100
-    
-    def evaluate_edges(player) -> int:
-        player_board = gamestate.board.get_board(player)
-        edges_value = bin(player_board & edges).count('1')
-        
-        return edges_value
-    
-    player_edges_value = evaluate_edges(player)
-    opponent_edges_value = evaluate_edges(opponent)
+def edges_eval(position, player, opponent, placed_pieces = 0, dynamic_weight = True):
+    """
+    Compares the pieces on the middle four squares of every edge (the A and B squares).
+    The counts of each edge are read from the edge pattern tables.
+    """
+    player_edges_value, opponent_edges_value = edge_discs(edge_indices(position.get_board(player), position.get_board(opponent)))
     
     edges_denominator = abs(player_edges_value) + abs(opponent_edges_value)
     # prevent division by zero
@@ -21,4 +18,4 @@ def edges_eval(gamestate, player, opponent, placed_pieces = 0, dynamic_weight =
     weight = edges_weight_function(placed_pieces) if dynamic_weight else 2
     
     combined_edges_value = weight * ((player_edges_value - opponent_edges_value) / (edges_denominator))
-    return combined_edges_value
\ No newline at end of file
+    return combined_edges_value
@@ -0,0 +1,109 @@
+from othello.bitboard import CORNERS
+from othello.edge_patterns import edge_indices, edge_discs, WEDGES
+from .mobility_eval import mobility_heuristics_weight_function
+from .stability_eval import stability_heuristics_weight_function
+from .coin_eval import coin_heuristics_weight_function
+from .corners_eval import corners_heuristics_weight_function
+from .edges_eval import edges_weight_function
+
+# The dynamic weights only depend on the number of placed pieces, so they are computed once for 0-64
+MOBILITY_WEIGHTS = tuple(mobility_heuristics_weight_function(placed_pieces) for placed_pieces in range(65))
+STABILITY_WEIGHTS = tuple(stability_heuristics_weight_function(placed_pieces) for placed_pieces in range(65))
+COIN_WEIGHTS = tuple(coin_heuristics_weight_function(placed_pieces) for placed_pieces in range(65))
+CORNERS_WEIGHTS = tuple(corners_heuristics_weight_function(placed_pieces) for placed_pieces in range(65))
+# combined_eval calls edges_eval without placed_pieces, so the edge weight is always the one for 0 pieces
+EDGES_WEIGHT = edges_weight_function(0)
+
+ORANGE_ZONE = 0b01000010_10000001_00000000_00000000_00000000_00000000_10000001_01000010
+RED_ZONE = 0b00000000_01000010_00000000_00000000_00000000_00000000_01000010_00000000
+
+
+def fused_eval(position, player, opponent_player, dynamic_weight = True, beta_features = False):
+    """
+    Gives exactly the same score as combined_eval, in a single pass.
+    Boards, popcounts and moves are fetched once and shared by all the heuristics,
+    and the dynamic weights are read from tables instead of evaluating the sigmoids.
+    The formulas (and the order of the float operations) mirror the separate evaluators,
+    so any change to those has to be made here as well.
+    """
+    if position.is_terminal():
+        winner = position.winner()
+        if winner == 'draw':
+            return 0
+
+        return float('inf') if winner == player else float('-inf')
+
+    player_board = position.get_board(player)
+    opponent_board = position.get_board(opponent_player)
+    player_pieces = player_board.bit_count()
+    opponent_pieces = opponent_board.bit_count()
+    placed_pieces = (player_board | opponent_board).bit_count()
+    player_moves = position.get_valid_moves(player)
+    opponent_moves = position.get_valid_moves(opponent_player)
+
+    # Mobility. Like mobility_eval, the opponent's mobility is measured against their own moves
+    player_move_count = player_moves.bit_count()
+    opponent_move_count = opponent_moves.bit_count()
+    all_valid_moves = player_move_count + opponent_move_count
+    player_mobility = player_move_count / all_valid_moves if all_valid_moves != 0 else 0
+    opponent_mobility = opponent_move_count / (2 * opponent_move_count) if opponent_move_count != 0 else 0
+    mobility_denominator = abs(player_mobility) + abs(opponent_mobility)
+    if mobility_denominator == 0:
+        mobility = 0
+    else:
+        weight = MOBILITY_WEIGHTS[placed_pieces] if dynamic_weight else 5
+        mobility = weight * ((player_mobility - opponent_mobility) / mobility_denominator)
+
+    # Stability
+    player_safe = position.safe_board(player).bit_count()
+    player_unstable = position.unstable_board(player).bit_count()
+    opponent_safe = position.safe_board(opponent_player).bit_count()
+    opponent_unstable = position.unstable_board(opponent_player).bit_count()
+    player_stability = player_safe / player_pieces + -player_unstable / player_pieces
+    opponent_stability = opponent_safe / opponent_pieces + -opponent_unstable / opponent_pieces
+    stability_denominator = abs(player_stability) + abs(opponent_stability)
+    if stability_denominator == 0:
+        stability = 0
+    else:
+        weight = STABILITY_WEIGHTS[placed_pieces] if dynamic_weight else 25
+        stability = weight * ((player_stability - opponent_stability) / stability_denominator)
+
+    # Coin parity
+    weight = COIN_WEIGHTS[placed_pieces] if dynamic_weight else 25
+    coin = weight * ((player_pieces - opponent_pieces) / (player_pieces + opponent_pieces))
+
+    # Corners, including the corners that can be taken next move
+    player_corners = (player_board & CORNERS).bit_count() + (player_moves & CORNERS).bit_count() * 0.33
+    opponent_corners = (opponent_board & CORNERS).bit_count() + (opponent_moves & CORNERS).bit_count() * 0.33
+    corners_denominator = abs(player_corners) + abs(opponent_corners)
+    if corners_denominator == 0:
+        corners = 0
+    else:
+        weight = CORNERS_WEIGHTS[placed_pieces] if dynamic_weight else 30
+        corners = weight * ((player_corners - opponent_corners) / corners_denominator)
+
+    danger_zones = 0
+    edges = 0
+    wedges = 0
+    if beta_features:
+        occupied_corners = CORNERS & (player_board | opponent_board)
+        orange_zone = ORANGE_ZONE & ~(occupied_corners << 1 | occupied_corners >> 1 |
+                                      occupied_corners << 8 | occupied_corners >> 8)
+        red_zone = RED_ZONE & ~(occupied_corners << 9 | occupied_corners >> 9 |
+                                occupied_corners << 7 | occupied_corners >> 7)
+        danger_zones = (player_board & orange_zone).bit_count() * -0.5 + (player_board & red_zone).bit_count() * -5
+
+        # Edges and wedges both come from the edge pattern tables
+        indices = edge_indices(player_board, opponent_board)
+        player_edges, opponent_edges = edge_discs(indices)
+        edges_denominator = player_edges + opponent_edges
+        if edges_denominator != 0:
+            edges = EDGES_WEIGHT * ((player_edges - opponent_edges) / edges_denominator)
+
+        player_wedges = sum(WEDGES[index] for index in indices)
+        opponent_wedges = sum(WEDGES[index] for index in edge_indices(opponent_board, player_board))
+        wedges_denominator = abs(player_wedges) + abs(opponent_wedges)
+        if wedges_denominator != 0:
+            wedges = (player_wedges - opponent_wedges) / wedges_denominator
+
+    return mobility + stability + coin + corners + danger_zones + edges + wedges
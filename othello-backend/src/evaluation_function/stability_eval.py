@@ -3,16 +3,16 @@ import math
 def stability_heuristics_weight_function(placed_pieces: int, maximum_weight: int = 50,  midpoint: int = 37, steepness: float = 0.15) -> float:
     return (-1*maximum_weight) / (1 + math.e ** (-1 * steepness * (placed_pieces - midpoint))) + maximum_weight
 
-def stability_eval(gamestate, player, opponent, placed_pieces, dynamic_weight = True):
+def stability_eval(position, player, opponent, placed_pieces, dynamic_weight = True):
     safe_weight = 1
     stable_weight = 0
     unstable_weight = -1
     
     def get_stability(player) -> int:
-        player_board = gamestate.board.get_board(player)
+        player_board = position.get_board(player)
         number_of_player_pieces = bin(player_board).count('1')
-        safe_board = gamestate.board.safe_board[player]
-        unstable_board = gamestate.board.unstable_board[player]
+        safe_board = position.safe_board(player)
+        unstable_board = position.unstable_board(player)
         stable_board = player_board & ~(safe_board | unstable_board)
         
         stability = (
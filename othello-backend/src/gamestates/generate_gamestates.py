@@ -1,40 +1,169 @@
 import random
-from evaluation_function.combined_eval import combined_eval
-from othello.GameState import GameState
+import struct
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from evaluation_function.fused_eval import fused_eval
+from othello.Position import Position
+from othello.bitboard import get_moves, get_flips, squares, symmetries
+
+# Starting position, the same as GameState: black on 3E and 4D, white on 3D and 4E, black to move
+START_BLACK = 0x00000008_10000000
+START_WHITE = 0x00000010_08000000
+
+# Positions are balanced if the evaluations of both players differ by less than this
+MAX_EVALUATION_DIFFERENCE = 5
+# Random games played by a worker process per task
+BATCH_SIZE = 256
+
+# Binary file format: black and white as unsigned 64-bit little endian, then 0 for black or 1 for white to move
+RECORD = struct.Struct('<QQB')
+
 
 def generate_gamestates(n: int) -> list[(int, int, str)]:
     """
     Generate n random gamestates which are of roughly equal value
     Return a list where each index contains three tuples
-    Each tuple contains the bitboard of black and white respectively, 
+    Each tuple contains the bitboard of black and white respectively,
     and the last tuple contains the player to move ('black' or 'white')
-    
+
     To my knowledge there are no good resoruces online for evaluating gamestates
     As such, we just use the combined evaluation function to evaluate positions
     In addition we dont store already generated gamestates as we want different ones
     """
-    
-    legal_games_generated = []
-    while len(legal_games_generated) < n:
-        number_of_moves = random.randint(4, 32) # early to mid game
-        othello_game = GameState()
-        
-        for _ in range(number_of_moves):
-            valid_moves = othello_game.get_valid_moves(othello_game.current_player)
-            if valid_moves == 0:
-                othello_game.skip_turn()
-                continue
-            
-            move = random.choice(othello_game._bitboard_to_rowcol(valid_moves))
-            othello_game.make_move(move[0], move[1])
-        
-        evaluation_black = combined_eval(othello_game, 'black', 'white', beta_features = True)
-        evaluation_white = combined_eval(othello_game, 'white', 'black', beta_features = True)
-        
-        evaluation_difference = abs(evaluation_black - evaluation_white)
-        game = (othello_game.board.get_board('black'), othello_game.board.get_board('white'), othello_game.current_player)
-        if evaluation_difference < 5 and game not in legal_games_generated:
-            legal_games_generated.append(game)
-    
-    return legal_games_generated    
-    
\ No newline at end of file
+    gamestates = iter_gamestates()
+    return [next(gamestates) for _ in range(n)]
+
+
+def iter_gamestates(canonical=False, workers=1, seed=None):
+    """
+    Yields random balanced gamestates (black, white, player to move) as they are found, without duplicates.
+    The stream never ends, stop taking from it when you have enough.
+
+    :param canonical: Also skip gamestates that are a rotation or mirror image of one already yielded.
+    :param workers: The number of processes playing random games. With 1 everything runs in this process
+                    and uses the global random generator, so random.seed makes the stream repeatable.
+    :param seed: The seed of the worker processes. The stream is the same for the same seed and number of workers.
+    """
+    seen = set()
+    for gamestate in (_random_gamestates(random) if workers <= 1 else _parallel_gamestates(workers, seed)):
+        key = _canonical_key(*gamestate) if canonical else _key(*gamestate)
+        if key not in seen:
+            seen.add(key)
+            yield gamestate
+
+
+def _random_gamestates(generator):
+    while True:
+        gamestate = _random_gamestate(generator)
+        if gamestate is not None:
+            yield gamestate
+
+
+def _random_gamestate(generator):
+    """
+    Plays a random early to mid game.
+
+    :return: The gamestate if it is balanced, None otherwise.
+    """
+    number_of_moves = generator.randint(4, 32) # early to mid game
+    player, opponent = START_BLACK, START_WHITE
+    side = 'black'
+
+    for _ in range(number_of_moves):
+        valid_moves = get_moves(player, opponent)
+        if valid_moves == 0:
+            if get_moves(opponent, player) == 0:
+                return None
+        else:
+            move_bitboard = 1 << generator.choice(squares(valid_moves))
+            flips = get_flips(move_bitboard, player, opponent)
+            player |= move_bitboard | flips
+            opponent ^= flips
+        player, opponent = opponent, player
+        side = 'white' if side == 'black' else 'black'
+
+    position = Position(player, opponent, side)
+    if position.is_terminal():
+        return None
+    evaluation_black = fused_eval(position, 'black', 'white', beta_features = True)
+    evaluation_white = fused_eval(position, 'white', 'black', beta_features = True)
+    if abs(evaluation_black - evaluation_white) >= MAX_EVALUATION_DIFFERENCE:
+        return None
+    return position.get_board('black'), position.get_board('white'), side
+
+
+def _generate_batch(seed, batch_index) -> list:
+    """
+    Runs in a worker process. Every batch has its own generator, so the result
+    only depends on the seed and the batch index.
+    """
+    generator = random.Random(f"{seed}-{batch_index}")
+    gamestates = (_random_gamestate(generator) for _ in range(BATCH_SIZE))
+    return [gamestate for gamestate in gamestates if gamestate is not None]
+
+
+def _parallel_gamestates(workers, seed):
+    """
+    Yields the batches of the worker processes in order, keeping two batches per worker in flight.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        batch_index = 0
+        try:
+            while True:
+                while len(pending) < 2 * workers:
+                    pending.append(pool.submit(_generate_batch, seed, batch_index))
+                    batch_index += 1
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _key(black, white, side) -> int:
+    # One int instead of a tuple keeps the set of seen gamestates small
+    return black | white << 64 | (side == 'white') << 128
+
+
+def _canonical_key(black, white, side) -> int:
+    return min(_key(black, white, side) for black, white in zip(symmetries(black), symmetries(white)))
+
+
+def write_gamestates(path, gamestates) -> int:
+    """
+    Writes gamestates to a binary file, 17 bytes per gamestate (see RECORD).
+    Gamestates are written as they come, so this can be given iter_gamestates directly (with islice).
+
+    :return: The number of gamestates written.
+    """
+    count = 0
+    with open(path, 'wb') as file:
+        for black, white, side in gamestates:
+            file.write(RECORD.pack(black, white, side == 'white'))
+            count += 1
+    return count
+
+
+def read_gamestates(path):
+    """
+    Yields the gamestates (black, white, player to move) of a file written by write_gamestates.
+    """
+    with open(path, 'rb') as file:
+        while record := file.read(RECORD.size):
+            black, white, side = RECORD.unpack(record)
+            yield black, white, 'white' if side else 'black'
+
+
+if __name__ == "__main__":
+    # python -m gamestates.generate_gamestates <count> <output file> [workers] [--canonical]
+    from itertools import islice
+
+    count = int(sys.argv[1])
+    output_path = sys.argv[2]
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3].isdigit() else 1
+    start = time.perf_counter()
+    written = write_gamestates(output_path, islice(iter_gamestates('--canonical' in sys.argv, workers, seed=0), count))
+    seconds = time.perf_counter() - start
+    print(f"Wrote {written} gamestates to {output_path} in {seconds:.1f}s ({written / seconds:,.0f}/s)")
@@ -1,23 +1,47 @@
 from evaluation_function.combined_eval import combined_eval
+from evaluation_function.fused_eval import fused_eval
+from evaluation_function.EvaluationCache import EvaluationCache
 from othello.GameState import GameState
 from AI_opponent.MinMaxAgent import MinMaxAgent
+from AI_opponent.NegamaxAgent import NegamaxAgent
 from gamestates.generate_gamestates import generate_gamestates
+from tournament.runner import run_tournament, print_report
+from othello.bitboard import PASS, squares
+import sys
 import time
 
+# Seconds the AI may think per move when playing against a human
+AI_TIME_BUDGET = 2.0
 
 def print_heuristics(game):
     print("\nCurrent evaluation: ")
     print("------------------------------------------------------------------------------")
-    print("Black's current evaluation:", combined_eval(game, 'black', 'white', print_heuristics = True, beta_features = True))
+    print("Black's current evaluation:", combined_eval(game.to_position(), 'black', 'white', print_heuristics = True, beta_features = True))
     print("------------------------------------------------------------------------------")
-    print("White's current evaluation:", combined_eval(game, 'white', 'black', print_heuristics = True, beta_features = True))
+    print("White's current evaluation:", combined_eval(game.to_position(), 'white', 'black', print_heuristics = True, beta_features = True))
     print("------------------------------------------------------------------------------\n")
 
+def format_move(move):
+    """
+    Moves are square indices (row * 8 + col) everywhere except in the CLI,
+    where they are shown as row number + column letter, e.g. 3C.
+    """
+    if move == PASS:
+        return "skip"
+    return f"{move // 8}{chr(move % 8 + 65)}"
+
+def parse_move(move):
+    row = int(move[0])
+    col = ord(move[1].upper()) - 65
+    if not (0 <= row < 8 and 0 <= col < 8):
+        raise ValueError(f"Invalid square: {move}")
+    return row * 8 + col
+
 def do_move(game, move):
-    if move == "skip":
+    if move == PASS:
         game.skip_turn()
     else:
-        game.make_move(move[0], move[1])
+        game.make_move(move)
 
 def input_move(game):
     while True:
@@ -31,57 +55,49 @@ def input_move(game):
             break
         
         try:
-            row=int(move[0])
-            col=move[1].upper()
-            valid_move = game.make_move(row, col)
+            valid_move = game.make_move(parse_move(move))
             if valid_move:
                 return
         except:
             print("Invalid move. Try again.")
             continue
 
-def play_against_AI(game, player):
-    agent = MinMaxAgent(cache={})
+def play_against_AI(game, player, agent_class=MinMaxAgent, use_evaluation_cache=False):
+    agent = agent_class()
+    evaluation = EvaluationCache(fused_eval) if use_evaluation_cache else fused_eval
     print(game.board)
 
     while not game.game_over:
         if game.current_player == player:
             print("Your possible moves: ")
-            print(game._bitboard_to_rowcol(game.get_valid_moves(player)))
+            print([format_move(move) for move in squares(game.get_valid_moves(player))])
             input_move(game)
             print(game.board)
-            print_heuristics()
+            print_heuristics(game)
             continue
         
-        _, move = agent.get_best_move(game, combined_eval, 5, beta_features=True)
-        agent.clear_cache()
+        _, move, depth = agent.iterative_deepening(game.to_position(), evaluation, time_budget=AI_TIME_BUDGET, beta_features=True)
                 
-        print("AI move: ", move)
-        if move == "skip":
-            game.skip_turn()
-        else:
-            game.make_move(move[0], move[1])
+        print("AI move: ", format_move(move), f"(searched to depth {depth})")
+        do_move(game, move)
         print(game.board)
-        print_heuristics()
+        print_heuristics(game)
         
 
-def play_AI_vs_AI(game, beta_features):
+def play_AI_vs_AI(game, beta_features, agent_class=MinMaxAgent, use_evaluation_cache=False):
     start = time.time()
     print(game.board)
-    agent = MinMaxAgent(cache={})  
+    agent = agent_class()  
+    evaluation = EvaluationCache(fused_eval) if use_evaluation_cache else fused_eval
     beta_features = beta_features
     
     while not game.game_over:
         # print("Current player:", game.current_player)
         # print("Current player's possible moves: ")
-        # print(game._bitboard_to_rowcol(game.get_valid_moves(game.current_player)))
-        _, move = agent.get_best_move(game, combined_eval, 5, beta_features=beta_features)
-        agent.clear_cache()
-        # print("AI move: ", move)
-        if move == "skip":
-            game.skip_turn()
-        else:
-            game.make_move(move[0], move[1])
+        # print([format_move(move) for move in squares(game.get_valid_moves(game.current_player))])
+        _, move = agent.get_best_move(game.to_position(), evaluation, 5, beta_features=beta_features)
+        # print("AI move: ", format_move(move))
+        do_move(game, move)
         # print("Time taken: ", end - start)
         # print_heuristics(game)
         beta_features = not beta_features
@@ -93,58 +109,29 @@ def play_AI_vs_AI(game, beta_features):
     return game.winner, not beta_features
 
 
-def compare_ai(gamestates):
-    new_win = 0
-    old_win = 0
-    tie = 0
-    
-    agent = MinMaxAgent(cache={})
-    amount_of_games = len(gamestates)
+def compare_ai(gamestates, agent_class=MinMaxAgent, output_path=None, workers=None, use_evaluation_cache=False):
+    """
+    Plays the new features against the old ones from every gamestate, once with each colour,
+    using the tournament runner (in parallel, see tournament/runner.py for all options).
     
-    for i in range(amount_of_games):
-        start = time.time()
-        gamestate = GameState(gamestate = gamestates[i])
-        print(gamestate.board)
-        new_features = gamestate.current_player
-        old_features = gamestate.target_player
-        print("New features: ", new_features)
-        print("Old features: ", old_features)
-        
-        while not gamestate.game_over:
-            _, new_features_move = agent.get_best_move(gamestate, combined_eval, 5, beta_features=True)
-            agent.clear_cache()
-            do_move(gamestate, new_features_move)
-            if gamestate.game_over:
-                break
-            
-            _, old_features_move = agent.get_best_move(gamestate, combined_eval, 5, beta_features=False)
-            agent.clear_cache()
-            do_move(gamestate, old_features_move)
-
-        if gamestate.winner == new_features:
-            new_win += 1
-        elif gamestate.winner == old_features:
-            old_win += 1
-        else:
-            tie += 1
-        
-        end = time.time()
-        print(f"Game {i+1} out of {amount_of_games}. \nTook {end - start} seconds. \nAll results: ")
-        print("New features win: ", new_win)
-        print("Old features win: ", old_win)
-        print("Tie: ", tie, "\n")
-
-        del gamestate
-        
-    print("Final results: ") 
-    print("New features win: ", new_win)
-    print("Old features win: ", old_win)
-    print("Tie: ", tie)
+    :param output_path: A JSONL or CSV file to stream the results to, and resume from if it already exists.
+    :param workers: The number of worker processes, all cores if None.
+    :param use_evaluation_cache: Wraps fused_eval in an EvaluationCache in every game.
+    """
+    summary = run_tournament(gamestates, output_path, depth=5, workers=workers, agent_class=agent_class,
+                             use_evaluation_cache=use_evaluation_cache)
+    print_report(summary)
 
 if __name__ == "__main__":
+    # python main.py [minmax|negamax] picks the agent both sides use
+    agents = {'minmax': MinMaxAgent, 'negamax': NegamaxAgent}
+    agent_name = sys.argv[1] if len(sys.argv) > 1 else 'minmax'
+    if agent_name not in agents:
+        sys.exit(f"Unknown agent {agent_name}, use one of {', '.join(agents)}")
+    agent_class = agents[agent_name]
     gamestates = generate_gamestates(100)
     print("Generated gamestates. Starting comparison... \n")
-    compare_ai(gamestates)
+    compare_ai(gamestates, agent_class)
     
     # play_AI_vs_AI(GameState(), beta_features = True)
         
\ No newline at end of file
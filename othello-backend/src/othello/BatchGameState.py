@@ -0,0 +1,271 @@
+import numpy as np
+from .bitboard import PASS, CORNERS, INTERIOR, _LEFT_SHIFTS, _RIGHT_SHIFTS
+from . import edge_patterns
+
+# The same (shift, mask) pairs as the scalar move generator, as uint64 scalars.
+# NumPy uint64 shifts drop the bits shifted past bit 63, so no extra 64-bit mask is needed.
+_LEFT = tuple((np.uint64(shift), np.uint64(mask)) for shift, mask in _LEFT_SHIFTS)
+_RIGHT = tuple((np.uint64(shift), np.uint64(mask)) for shift, mask in _RIGHT_SHIFTS)
+_ONE = np.uint64(1)
+_ZERO = np.uint64(0)
+_CORNERS = np.uint64(CORNERS)
+_INTERIOR = np.uint64(INTERIOR)
+
+_TERNARY = np.array(edge_patterns.TERNARY, dtype=np.intp)
+_STABLE = np.array(edge_patterns.STABLE, dtype=np.uint64)
+_COLUMN_SQUARES = np.array(edge_patterns.COLUMN_SQUARES, dtype=np.uint64)
+
+BLACK = 0
+WHITE = 1
+
+START_BLACK = 0x00000008_10000000
+START_WHITE = 0x00000010_08000000
+
+
+def _fill(start, propagator, shift, left):
+    """
+    The run of propagator squares that starts one step from start, for every game at once.
+    Same three fixed steps as the scalar Kogge-Stone fill in bitboard.py.
+    """
+    if left:
+        run = (start << shift) & propagator
+        run |= propagator & (run << shift)
+        propagator = propagator & (propagator << shift)
+        run |= propagator & (run << (shift << _ONE))
+        propagator &= propagator << (shift << _ONE)
+        run |= propagator & (run << (shift << np.uint64(2)))
+    else:
+        run = (start >> shift) & propagator
+        run |= propagator & (run >> shift)
+        propagator = propagator & (propagator >> shift)
+        run |= propagator & (run >> (shift << _ONE))
+        propagator &= propagator >> (shift << _ONE)
+        run |= propagator & (run >> (shift << np.uint64(2)))
+    return run
+
+
+def get_moves(player_boards, opponent_boards):
+    """
+    The legal moves of every game, the vectorized version of bitboard.get_moves.
+
+    :param player_boards: uint64 array with the boards of the players to move.
+    :param opponent_boards: uint64 array with the boards of their opponents.
+
+    :return: uint64 array of move bitboards.
+    """
+    return get_moves_and_capturable(player_boards, opponent_boards)[0]
+
+
+def get_moves_and_capturable(player_boards, opponent_boards):
+    """
+    The vectorized version of bitboard.get_moves_and_capturable.
+
+    :return: (moves, capturable) uint64 arrays.
+    """
+    empty = ~(player_boards | opponent_boards)
+    moves = np.zeros_like(player_boards)
+    capturable = np.zeros_like(player_boards)
+    for directions, left in ((_LEFT, True), (_RIGHT, False)):
+        for shift, mask in directions:
+            run = _fill(player_boards, opponent_boards & mask, shift, left)
+            placements = ((run << shift) if left else (run >> shift)) & empty & mask
+            moves |= placements
+            # Like the scalar version, only runs in directions with at least one move count
+            capturable |= np.where(placements != _ZERO, run, _ZERO)
+    return moves, capturable
+
+
+def get_flips(move_boards, player_boards, opponent_boards):
+    """
+    The pieces flipped by every move, the vectorized version of bitboard.get_flips.
+    A move of 0 (no move) flips nothing.
+
+    :return: uint64 array of flip bitboards.
+    """
+    flips = np.zeros_like(player_boards)
+    for directions, left in ((_LEFT, True), (_RIGHT, False)):
+        for shift, mask in directions:
+            run = _fill(move_boards, opponent_boards & mask, shift, left)
+            closed = ((run << shift) if left else (run >> shift)) & player_boards & mask
+            flips |= np.where(closed != _ZERO, run, _ZERO)
+    return flips
+
+
+def edge_lines(boards):
+    """
+    The vectorized version of edge_patterns.edge_lines.
+
+    :return: (top, bottom, left, right) arrays with the 8 squares of each edge as a byte.
+    """
+    left_edge = np.uint64(edge_patterns.LEFT_EDGE)
+    magic = np.uint64(edge_patterns._COLUMN_MAGIC)
+    shift = np.uint64(56)
+    # The uint64 product wraps around, but the top byte is the same as with Python integers
+    return (boards & np.uint64(0xFF), boards >> shift,
+            ((boards & left_edge) * magic) >> shift, (((boards >> np.uint64(7)) & left_edge) * magic) >> shift)
+
+
+def edge_indices(player_boards, opponent_boards):
+    """
+    The vectorized version of edge_patterns.edge_indices.
+
+    :return: The pattern indices of the top, bottom, left and right edge as intp arrays.
+    """
+    return tuple(_TERNARY[player.astype(np.intp)] + 2 * _TERNARY[opponent.astype(np.intp)]
+                 for player, opponent in zip(edge_lines(player_boards), edge_lines(opponent_boards)))
+
+
+def get_safe(boards, opponent_boards):
+    """
+    The pieces that can never be flipped, the vectorized version of bitboard.get_safe.
+
+    :param boards: uint64 array with the boards of one player per game.
+    :param opponent_boards: uint64 array with the boards of the other player.
+
+    :return: uint64 array of safe pieces.
+    """
+    top, bottom, left, right = edge_indices(boards, opponent_boards)
+    safe = (_STABLE[top] | _STABLE[bottom] << np.uint64(56) |
+            _COLUMN_SQUARES[_STABLE[left].astype(np.intp)] |
+            _COLUMN_SQUARES[_STABLE[right].astype(np.intp)] << np.uint64(7)) & boards
+
+    # The interior is only filled in where edges other than corners are safe
+    active = safe != (boards & _CORNERS)
+    eight, one, nine, seven = np.uint64(8), np.uint64(1), np.uint64(9), np.uint64(7)
+    while np.any(active):
+        filled = safe | (
+            ((safe >> eight) | (safe << eight)) &
+            ((safe >> one) | (safe << one)) &
+            ((safe >> nine) | (safe << nine)) &
+            ((safe >> seven) | (safe << seven)) &
+            boards & _INTERIOR
+        )
+        active &= filled != safe
+        safe = np.where(active, filled, safe)
+    return safe
+
+
+def popcount(boards):
+    return np.bitwise_count(boards).astype(np.int64)
+
+
+class BatchGameState:
+    """
+    N games of Othello stepped together, for self-play and data generation.
+
+    The boards are uint64 arrays (one element per game) from the point of view of the player
+    to move, like Position, and side says whose turn it is (BLACK or WHITE).
+    Move generation, flipping, passing and the end of the game are computed for all games at once
+    with the same shifts and masks as the scalar code, so no Python loop runs per game.
+
+    Finished games stay in the batch unchanged, game_over tells which ones they are.
+    """
+
+    def __init__(self, number_of_games=None, gamestates=None):
+        """
+        :param number_of_games: Start this many games from the starting position.
+        :param gamestates: Or start from these (black, white, player to move) tuples, e.g. from generate_gamestates.
+        """
+        if gamestates is None:
+            black = np.full(number_of_games, START_BLACK, dtype=np.uint64)
+            white = np.full(number_of_games, START_WHITE, dtype=np.uint64)
+            side = np.zeros(number_of_games, dtype=np.int8)
+        else:
+            black = np.array([gamestate[0] for gamestate in gamestates], dtype=np.uint64)
+            white = np.array([gamestate[1] for gamestate in gamestates], dtype=np.uint64)
+            side = np.array([gamestate[2] == 'white' for gamestate in gamestates], dtype=np.int8)
+
+        self.side = side
+        self.player = np.where(side == WHITE, white, black)
+        self.opponent = np.where(side == WHITE, black, white)
+        self.moves = get_moves(self.player, self.opponent)
+        self.game_over = np.zeros(len(side), dtype=bool)
+        self._update_game_over()
+
+    def __len__(self) -> int:
+        return len(self.side)
+
+    @property
+    def black(self):
+        return np.where(self.side == WHITE, self.opponent, self.player)
+
+    @property
+    def white(self):
+        return np.where(self.side == WHITE, self.player, self.opponent)
+
+    def get_valid_moves(self):
+        """
+        :return: uint64 array with the legal moves of the player to move in every game.
+        """
+        return self.moves
+
+    def step(self, squares):
+        """
+        Plays one move in every game that is not over.
+        A game where the player to move has no legal move has to be given PASS.
+
+        :param squares: int array with a square index (row * 8 + col) or PASS per game. Ignored for finished games.
+
+        :return: uint64 array of the flipped pieces per game.
+        """
+        squares = np.asarray(squares, dtype=np.int64)
+        active = ~self.game_over
+        passing = active & (squares == PASS)
+        playing = active & ~passing
+
+        move_boards = np.where(playing, _ONE << np.where(playing, squares, 0).astype(np.uint64), _ZERO)
+        if np.any(playing & ((move_boards & self.moves) == _ZERO)):
+            raise ValueError("Illegal move in game(s) " + str(np.flatnonzero(playing & ((move_boards & self.moves) == _ZERO)).tolist()))
+        if np.any(passing & (self.moves != _ZERO)):
+            raise ValueError("Pass with legal moves in game(s) " + str(np.flatnonzero(passing & (self.moves != _ZERO)).tolist()))
+
+        flips = get_flips(move_boards, self.player, self.opponent)
+        player = self.player | move_boards | flips
+        opponent = self.opponent ^ flips
+
+        # Both placing and passing hand the turn over
+        self.player = np.where(active, opponent, self.player)
+        self.opponent = np.where(active, player, self.opponent)
+        self.side = np.where(active, 1 - self.side, self.side).astype(np.int8)
+        self.moves = get_moves(self.player, self.opponent)
+        self._update_game_over()
+        return flips
+
+    def random_moves(self, generator):
+        """
+        Picks a uniformly random legal move for every game, PASS where there is none
+        (and for finished games).
+
+        :param generator: A numpy.random.Generator.
+
+        :return: int array of square indices or PASS.
+        """
+        moves = np.where(self.game_over, _ZERO, self.moves)
+        counts = popcount(moves)
+        picks = (generator.random(len(moves)) * counts).astype(np.int64)
+        # Clear the lowest set bit as many times as the pick, then take the lowest remaining one
+        for index in range(int(picks.max(initial=0))):
+            moves = np.where(picks > index, moves & (moves - _ONE), moves)
+        lowest = moves & (~moves + _ONE)
+        return np.where(counts > 0, popcount(lowest - _ONE), PASS)
+
+    def scores(self):
+        """
+        :return: int array with the disc difference (black minus white) of every game.
+        """
+        difference = popcount(self.player) - popcount(self.opponent)
+        return np.where(self.side == WHITE, -difference, difference)
+
+    def to_gamestates(self) -> list:
+        """
+        :return: The games as (black, white, player to move) tuples of Python ints.
+        """
+        return [(int(black), int(white), 'white' if side == WHITE else 'black')
+                for black, white, side in zip(self.black, self.white, self.side)]
+
+    def _update_game_over(self) -> None:
+        # Over when neither player can move. The player to move can't if the moves array is 0
+        no_moves = self.moves == _ZERO
+        if np.any(no_moves):
+            opponent_moves = get_moves(self.opponent, self.player)
+            self.game_over |= no_moves & (opponent_moves == _ZERO)
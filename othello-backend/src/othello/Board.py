@@ -16,15 +16,9 @@ class Board:
             'white': 0b00000000_00000000_00000000_00000000_00000000_00000000_00000000_00000000
         }
         
-        self.safe_board = {
-            'black': 0b00000000_00000000_00000000_00000000_00000000_00000000_00000000_00000000,
-            'white': 0b00000000_00000000_00000000_00000000_00000000_00000000_00000000_00000000,
-        }
-        
-        self.unstable_board = {
-            'black': 0b00000000_00000000_00000000_00000000_00000000_00000000_00000000_00000000,
-            'white': 0b00000000_00000000_00000000_00000000_00000000_00000000_00000000_00000000
-        }
+        # Filled in on demand by GameState.get_safe_board/get_unstable_board, None means not computed yet
+        self.safe_board = {'black': None, 'white': None}
+        self.unstable_board = {'black': None, 'white': None}
         
         self.corners = 0b10000001_00000000_00000000_00000000_00000000_00000000_00000000_10000001
         
@@ -70,7 +64,22 @@ class Board:
         self.board[from_player] &= ~bitboard
         self.board[to_player] |= bitboard
 
-        
+    def xor_move(self, move_bitboard, flips, player, opponent) -> None:
+        """
+        Places a piece and flips the captured pieces in one step by XOR-ing the masks into the boards.
+        Since XOR is its own inverse, calling it again with the same arguments takes the move back.
+
+        :param move_bitboard (int): The bitboard with only the placed square set.
+        :param flips (int): The bitboard of the captured pieces.
+        :param player (str): The player who made the move.
+        :param opponent (str): The player whose pieces were captured.
+
+        :return (None): None
+        """
+        self.board[player] ^= move_bitboard | flips
+        self.board[opponent] ^= flips
+
+
     def get_color_of_piece(self, row, col) -> str:
         """
         Returns the color of the piece at the specified position.
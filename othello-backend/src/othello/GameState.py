@@ -1,5 +1,11 @@
 from .Board import Board
-import time
+from .bitboard import FULL_MASK, PASS, get_moves_and_capturable, get_flips, get_safe
+from .Position import Position
+from . import zobrist
+from . import move_log
+
+# A game has at most 60 moves, the rest leaves room for skipped turns
+UNDO_STACK_SIZE = 128
 
 class GameState:
     """
@@ -8,7 +14,12 @@ class GameState:
     It contains the board as a class and the current player.
     """
     
-    def __init__(self, include_stability=True, gamestate=None):
+    def __init__(self, gamestate=None):
+        """
+        Stability is not tracked after every move, it is computed when get_safe_board/get_unstable_board ask for it.
+
+        :param gamestate: Optional (black board, white board, current player, game over, current turn) to start from.
+        """
         self.board = Board()
         self.game_over = False
         self.winner = None
@@ -31,35 +42,48 @@ class GameState:
             self.board.place_piece(3, 4, 'black')
             self.board.place_piece(4, 3, 'black')
     
-        self.directions = {
-            "north": -8,
-            "south": 8,
-            "west": -1,
-            "east": 1,
-            "north_west": -9,
-            "north_east": -7,
-            "south_west": 7,
-            "south_east": 9
-        }
-        
-        self.wraparound_masks = {
-            'north': 0b00000000_11111111_11111111_11111111_11111111_11111111_11111111_11111111,
-            'south': 0b11111111_11111111_11111111_11111111_11111111_11111111_11111111_00000000,
-            'east': 0b11111110_11111110_11111110_11111110_11111110_11111110_11111110_11111110,
-            'west': 0b01111111_01111111_01111111_01111111_01111111_01111111_01111111_01111111,
-            'north_east': 0b00000000_11111110_11111110_11111110_11111110_11111110_11111110_11111110,
-            'north_west': 0b00000000_01111111_01111111_01111111_01111111_01111111_01111111_01111111,
-            'south_east': 0b11111110_11111110_11111110_11111110_11111110_11111110_11111110_00000000,
-            'south_west': 0b01111111_01111111_01111111_01111111_01111111_01111111_01111111_00000000
-        }
-        
         self.valid_moves_bitboard_cache = {'black': 0, 'white': 0}
         self.player_can_capture_cache = {'black': 0, 'white': 0}
         
-        self.history = []
-        self.include_stability = include_stability
-        if self.include_stability and gamestate is not None:
-            self._update_stability()
+        # Each entry is the placed square and the flipped pieces, a skipped turn is stored as (0, 0)
+        self.undo_moves = [0] * UNDO_STACK_SIZE
+        self.undo_flips = [0] * UNDO_STACK_SIZE
+        self.undo_length = 0
+        
+        # The moves of the game, one byte per ply (see move_log.py), with the boards every CHECKPOINT_INTERVAL plies.
+        # None for a game that did not start from the starting position, its moves don't describe it
+        self.move_log = bytearray() if gamestate is None else None
+        self.checkpoints = [(self.board.get_board('black'), self.board.get_board('white'), self.current_player, self.current_turn)]
+        
+        # Zobrist hash of the position, kept up to date by make_move, skip_turn and undo_move
+        self.hash = zobrist.compute_hash(self.board.get_board('black'), self.board.get_board('white'), self.current_player)
+    
+    @classmethod
+    def from_move_log(cls, log) -> 'GameState':
+        """
+        Replays a game from its move log, so the result can be undone all the way to the start.
+        
+        :param log: The moves as written by move_log (bytes), e.g. a GameState's move_log.
+        
+        :return: The GameState after the last move of the log.
+        """
+        gamestate = cls()
+        for square in log:
+            if square == PASS:
+                gamestate.skip_turn()
+            elif not gamestate.make_move(square):
+                raise ValueError(f"Illegal move {square} in move log")
+        return gamestate
+    
+    def position_at(self, ply) -> tuple:
+        """
+        :param ply: The number of moves and skipped turns from the start of the game.
+        
+        :return: (black board, white board, player to move, turn) after ply plies.
+        """
+        if self.move_log is None:
+            raise ValueError("The game did not start from the starting position")
+        return move_log.position_at(self.move_log, ply, self.checkpoints)
     
     
     def get_valid_moves(self, player) -> int:
@@ -67,6 +91,8 @@ class GameState:
         Given a player, returns the valid moves for that player in the current state.
         The valid moves are returned as a bitboard where 1 represents a valid move.
         Based on: https://core.ac.uk/download/pdf/33500946.pdf
+        The generation itself is done by the Kogge-Stone generator in bitboard.py,
+        which also reports the pieces that can be captured (used for stability).
         
         :param player: The player whose valid moves to return as a string.
         
@@ -77,85 +103,56 @@ class GameState:
             return self.valid_moves_bitboard_cache[player]
         target_player = 'black' if player == 'white' else 'white'
         
-        player_board = self.board.get_board(player)
-        target_board = self.board.get_board(target_player)
-        empty_board = self.board.get_board('empty')
-        
-        # Go through every direction
-        valid_moves = 0
-        capturable_pieces = 0 # Pieces that can be captured used for stability
-        
-        for direction, shift in self.directions.items():
-            potentially_capturable = 0
-            mask = self.wraparound_masks[direction]
-            can_place_in_direction = False
-            candidate_moves = self._shift_bitboard_direction(player_board, shift) & target_board & mask
-            
-            while candidate_moves > 0:
-                valid_placements = self._shift_bitboard_direction(candidate_moves, shift) & empty_board & mask
-                if valid_placements > 0: # We can place a piece in this direction, which is important for stability
-                    can_place_in_direction = True
-                valid_moves |= valid_placements
-                potentially_capturable |= candidate_moves
-                candidate_moves = self._shift_bitboard_direction(candidate_moves, shift) & target_board & mask
-                
-            if can_place_in_direction: # If we can place a piece in this direction, we can capture pieces
-                capturable_pieces |= potentially_capturable # Update the capturable pieces
+        valid_moves, capturable_pieces = get_moves_and_capturable(self.board.get_board(player), 
+                                                                  self.board.get_board(target_player))
         # Add to the cache
         self.valid_moves_bitboard_cache[player] = valid_moves
         self.player_can_capture_cache[player] = capturable_pieces
         return valid_moves
         
     
-    def make_move(self, row, col) -> bool:
+    def make_move(self, square) -> int:
         """
-        Given a row and col, make a move for the current player.
-        The move is assumed to be valid.
+        Given a square, make a move for the current player.
+        The flipped pieces are computed once and pushed to the undo stack,
+        so the move can be taken back by XOR-ing the same masks again.
         
-        :param row: The row to place the piece, (0-7)
-        :param col: The col to place the piece, (A-H)
+        :param square: The square to place the piece, row * 8 + col (0-63)
         
-        :return: True if the move was successful, False otherwise.
+        :return: The bitboard of the flipped pieces if the move was successful, 0 otherwise.
         """
-        col = ord(col) - 65
-        move_bitboard = self._translate_rowcol_to_bitboard(row, col)
+        if not 0 <= square < 64:
+            print(f"{self.current_player} attempted move outside the board: {square}")
+            return 0
+        move_bitboard = 1 << square
         if move_bitboard & self.get_valid_moves(self.current_player) == 0:
             print("Illegal move")
-            print(f"{self.current_player} attempted move: {row, col}")
-            return False
+            print(f"{self.current_player} attempted move: {square}")
+            return 0
+        
+        flips = get_flips(move_bitboard, 
+                          self.board.get_board(self.current_player), 
+                          self.board.get_board(self.target_player))
         
         # Move was successful
         self.pass_count = 0
         self.current_turn += 1
-        self.history.append(self._generate_current_history())
-        
-        self.board.place_piece(row, col, self.current_player)
-        player_bitboard = self.board.get_board(self.current_player)
-        target_bitboard = self.board.get_board(self.target_player)   
-        
-        for direction, shift in self.directions.items():
-            mask = self.wraparound_masks[direction]
-            init_move = self._shift_bitboard_direction(move_bitboard, shift) & target_bitboard & mask
-            if init_move == 0:
-                continue
-            captured = init_move
-            for _ in range(5):
-                old_captured = captured
-                captured |= self._shift_bitboard_direction(captured, shift) & target_bitboard & mask
-                if old_captured == captured:
-                    break
-            if self._shift_bitboard_direction(captured, shift) & player_bitboard & mask > 0:
-                self.board.flip_piece(captured, self.target_player, self.current_player)
+        self._push_undo(move_bitboard, flips)
+        self.board.xor_move(move_bitboard, flips, self.current_player, self.target_player)
+        self.hash ^= zobrist.move_delta(square, flips, self.current_player)
         
         self.next_turn()
-        return True
+        self._log(square)
+        return flips
     
     def skip_turn(self) -> None:
-        self.history.append(self._generate_current_history())
+        self._push_undo(0, 0)
+        self.hash ^= zobrist.SIDE_KEY
         self.next_turn()
+        self._log(PASS)
                 
     def undo_move(self) -> None:
-        if len(self.history) == 0:
+        if self.undo_length == 0:
             print("At the start of the game, can't undo")
             return
         
@@ -163,48 +160,96 @@ class GameState:
             self.game_over = False
             self.winner = None
         
-        self.current_turn -= 1
+        self.undo_length -= 1
+        if self.move_log is not None:
+            del self.move_log[-1]
+            if len(self.checkpoints) > len(self.move_log) // move_log.CHECKPOINT_INTERVAL + 1:
+                self.checkpoints.pop()
+        move_bitboard = self.undo_moves[self.undo_length]
+        flips = self.undo_flips[self.undo_length]
         
-        last_state = self.history.pop()
-        self.board.board['black'] = last_state['board'][0]
-        self.board.board['white'] = last_state['board'][1]
-        self.valid_moves_bitboard_cache['black'] = last_state['valid_moves'][0]
-        self.valid_moves_bitboard_cache['white'] = last_state['valid_moves'][1]
-        self.player_can_capture_cache['black'] = last_state['player_can_capture'][0]
-        self.player_can_capture_cache['white'] = last_state['player_can_capture'][1]
-        self.board.safe_board['black'] = last_state['safe_board'][0]
-        self.board.safe_board['white'] = last_state['safe_board'][1]
-        self.board.unstable_board['black'] = last_state['unstable_board'][0]
-        self.board.unstable_board['white'] = last_state['unstable_board'][1]
+        # A skipped turn is stored as an empty move and only hands the turn back
+        if move_bitboard != 0:
+            self.current_turn -= 1
+            # The player who made the move is the one waiting for their turn now
+            self.board.xor_move(move_bitboard, flips, self.target_player, self.current_player)
+            self.hash ^= zobrist.move_delta(move_bitboard.bit_length() - 1, flips, self.target_player)
+        else:
+            self.hash ^= zobrist.SIDE_KEY
         self.next_turn()
         
     def next_turn(self) -> None:
-        self.capturable_squares_bitboard_cache = {'black': 0, 'white': 0}
-        self.valid_moves_bitboard_cache = {'black': 0, 'white': 0}
+        self.valid_moves_bitboard_cache['black'] = 0
+        self.valid_moves_bitboard_cache['white'] = 0
         self.current_player = 'black' if self.current_player == 'white' else 'white'
         self.target_player = 'black' if self.current_player == 'white' else 'white'
-        if self.include_stability:
-            self._update_stability()   
+        if zobrist.VERIFY_HASH:
+            zobrist.verify_hash(self.hash, self.board.get_board('black'), self.board.get_board('white'), self.current_player)
+        # The position changed, so the stability is recomputed when it is asked for again
+        for player in ('black', 'white'):
+            self.board.safe_board[player] = None
+            self.board.unstable_board[player] = None
             
         # Check if game is over
         if self._is_game_over():
             self._set_game_over()
             return 
     
-    def _generate_current_history(self) -> dict:
-        current_history = {}
-        current_history['board'] = (self.board.get_board('black'), self.board.get_board('white'))
-        current_history['valid_moves'] = (self.valid_moves_bitboard_cache['black'], self.valid_moves_bitboard_cache['white'])
-        current_history['player_can_capture'] = (self.player_can_capture_cache['black'], self.player_can_capture_cache['white'])
-        current_history['safe_board'] = (self.board.safe_board['black'], self.board.safe_board['white'])
-        current_history['unstable_board'] = (self.board.unstable_board['black'], self.board.unstable_board['white'])
+    def to_position(self) -> Position:
+        """
+        Returns an immutable snapshot of the current state, used by the AI and the evaluation functions.
+        """
+        return Position(self.board.get_board(self.current_player), 
+                        self.board.get_board(self.target_player), 
+                        self.current_player,
+                        self.hash)
+    
+    def history(self) -> list:
+        """
+        Every state of the game so far, found by taking the moves on the undo stack back one by one
+        (two XORs per move), so no move has to be replayed.
         
-        return current_history
+        :return: (black board, white board, player to move, turn) per ply, starting with the first state of the game.
+        """
+        boards = {'black': self.board.get_board('black'), 'white': self.board.get_board('white')}
+        player, turn = self.current_player, self.current_turn
+        states = [(boards['black'], boards['white'], player, turn)]
+        for index in range(self.undo_length - 1, -1, -1):
+            opponent = player
+            player = 'black' if player == 'white' else 'white'
+            move_bitboard = self.undo_moves[index]
+            if move_bitboard != 0:
+                flips = self.undo_flips[index]
+                boards[player] ^= move_bitboard | flips
+                boards[opponent] ^= flips
+                turn -= 1
+            states.append((boards['black'], boards['white'], player, turn))
+        states.reverse()
+        return states
+    
+    def _push_undo(self, move_bitboard, flips) -> None:
+        """
+        The undo stack is two preallocated lists indexed by undo_length, 
+        so making a move only overwrites two slots instead of building a snapshot.
+        """
+        if self.undo_length == len(self.undo_moves):
+            self.undo_moves.extend([0] * UNDO_STACK_SIZE)
+            self.undo_flips.extend([0] * UNDO_STACK_SIZE)
+        self.undo_moves[self.undo_length] = move_bitboard
+        self.undo_flips[self.undo_length] = flips
+        self.undo_length += 1
+    
+    def _log(self, square) -> None:
+        if self.move_log is None:
+            return
+        self.move_log.append(square)
+        if len(self.move_log) % move_log.CHECKPOINT_INTERVAL == 0:
+            self.checkpoints.append((self.board.get_board('black'), self.board.get_board('white'), self.current_player, self.current_turn))
     
     def _is_game_over(self) -> bool:
         player_is_empty = ((bin(self.board.get_board('black')).count('1') == 0) or 
                            (bin(self.board.get_board('white')).count('1') == 0))
-        is_empty_board_zero = len(self._bitboard_to_rowcol(self.board.get_board('empty'))) == 0
+        is_empty_board_zero = self.board.get_board('empty') & FULL_MASK == 0
         is_both_players_depleted_moves = (self.get_valid_moves('black') == 0 and self.get_valid_moves('white') == 0)
         is_game_over = is_empty_board_zero or player_is_empty or is_both_players_depleted_moves
         return is_game_over
@@ -220,7 +265,7 @@ class GameState:
             self.winner = 'draw'
         self.game_over = True
     
-    def _update_stability(self) -> None:
+    def get_safe_board(self, player) -> int:
         """
         Stability is defined in three categories:
         - Safe: A piece that can't ever be flipped in an ancestor state.
@@ -229,152 +274,29 @@ class GameState:
         
         The Board class has two bitboards that represent the safe and unstable pieces.
         Stable can be derived from these two bitboards.
-        """
-        self._update_safe('black')
-        self._update_safe('white')
+        They are only computed the first time they are asked for in a position, 
+        as only the evaluation needs them and making moves should stay cheap.
         
-        self._update_unstable('black', 'white')
-        self._update_unstable('white', 'black')
-
-    def _update_safe(self, player) -> None:
-        """
-        Is a potentially expensive operation, at least in the current implementation.
-        However, it is required for the stability calculation.
-        The algorithm is relatively complex, but it is based on the following:
-         - A corner piece is always safe.
-         - Edges "built" from the corners are safe.
-         - All other pieces are safe if their immediate neighbor in all 4 opposing directions are safe.
-        """
-        player_board = self.board.get_board(player)
-        player_corners = player_board & self.board.corners
-        if player_corners == 0:
-            return
+        :param player: The player whose safe pieces to return.
         
-        safe_board = player_corners
-        
-        # Check edges, for each cardinal direction
-        for direction in ['north', 'south', 'west', 'east']:
-            candidates = player_corners
-            shift = self.directions[direction]
-            for i in range(6):
-                edge = self._shift_bitboard_direction(candidates, shift) & player_board
-                if edge == 0:
-                    if i > 0:
-                        print(f"Found safe edge(s) in direction {direction} for {player} in {i} iterations")
-                    break
-                #print(f"Edge getting added: {bin(edge)} in direction {direction} for {player}")
-                candidates |= edge
-            safe_board |= candidates
-        
-        # See if any of the edges were added as safe, if not we can early return
-        if safe_board == player_corners:
-            return
-        
-        # Now find the rest
-        iter = 0
-        while True:
-            old_safe_board = safe_board
-            safe_board |= (
-                (self._shift_bitboard_direction(safe_board, self.directions['north']) | 
-                 self._shift_bitboard_direction(safe_board, self.directions['south'])) &
-                (self._shift_bitboard_direction(safe_board, self.directions['west']) |
-                 self._shift_bitboard_direction(safe_board, self.directions['east'])) &
-                (self._shift_bitboard_direction(safe_board, self.directions['north_west']) |
-                 self._shift_bitboard_direction(safe_board, self.directions['south_east'])) &
-                (self._shift_bitboard_direction(safe_board, self.directions['north_east']) |
-                 self._shift_bitboard_direction(safe_board, self.directions['south_west'])) &
-                player_board
-            )
-            
-            if old_safe_board == safe_board:
-                #print(f"Found safe board for {player} in {iter} iterations")
-                break
-            iter += 1
-            
-        self.board.safe_board[player] = safe_board
+        :return: The safe pieces of the player as a bitboard.
+        """
+        if self.board.safe_board[player] is None:
+            self.board.safe_board[player] = get_safe(self.board.get_board(player), self.board.get_board('white' if player == 'black' else 'black'))
+        return self.board.safe_board[player]
         
-    def _update_unstable(self, player, opponent) -> None:
+    def get_unstable_board(self, player) -> int:
         """
         An unstable piece is a piece that can be flipped in the current state.
         To do this, we need to find all pieces that can be captured in the current state.
         This is done in the get_valid_moves method, and we can use the cached value.
-        The reason we do it this way is to avoid recalculating the same thing multiple times.
-        Though readability is sacrificed, considering this is a bitboard implementation of Othello,
-        readability is already massacred.
-        """
-        self.get_valid_moves(player) # This will update the cache and mark all opponent pieces that can be captured
-        self.board.unstable_board[opponent] = self.player_can_capture_cache[player] # The opponent's pieces that can be captured are unstable
         
-    def _shift_bitboard_direction(self, bitboard, shift) -> None:
-        return (bitboard << shift) if shift > 0 else (bitboard >> abs(shift))
-    
-    def _translate_rowcol_to_bitboard(self, row, col) -> int:
-        return 1 << (row * 8 + col)
-    
-    def _bitboard_to_rowcol(self, bitboard) -> list:
-        rowcol = [(i // 8, chr((i % 8) + 65)) for i in range(64) if bitboard & (1 << i)]
-        return rowcol
-            
-
-# if __name__ == "__main__":
-#     import time
-#     def benchmark(game_state, iterations=100_000):
-#         start = time.time()   
-#         for _ in range(iterations):
-#             game_state.make_move(3, 'C')
-#             game_state.make_move(2, 'C')
-#             game_state.make_move(2, 'D')
-#             game_state.undo_move()
-#             game_state.make_move(1, 'C')
-#             game_state.undo_move()
-#             game_state.undo_move()
-#             game_state.undo_move()
-            
-#         end = time.time()
-#         return end - start
-
-#     for i in range(5):
-#         print(f"Run {i + 1}")
-#         # Initialize game states
-#         print("Running benchmarks...")
-#         stability_game_state = GameState(include_stability=True)
-#         standard_game_state = GameState(include_stability=False)
-
-#         # Run benchmarks
-#         print("Stability game state")
-#         original_time = benchmark(stability_game_state)
-#         print(f"Seconds: {original_time:.4f}")
-#         print("Standard game state")
-#         new_time = benchmark(standard_game_state)
-#         print(f"Seconds: {new_time:.4f}")
-
-# if __name__ == "__main__":
-#     gamestate = GameState()
-#     print(gamestate.board)
-#     while True:
-#         print(f"Current player: {gamestate.current_player}")
-#         print("Valid moves: ")
-#         print(gamestate._bitboard_to_rowcol(gamestate.get_valid_moves(gamestate.current_player)))
-#         if gamestate.get_valid_moves(gamestate.current_player) == 0:
-#             print("No valid moves, skipping turn")
-#             gamestate.skip_turn()
-#             continue
-#         move = input("Enter rowcol (number+letter in one): ")
-#         if move == 'undo':
-#             gamestate.undo_move()
-#             print(gamestate.board)
-#             continue
-#         try:
-#             row = int(move[0])
-#             col = move[1].upper()
-#         except:
-#             print("Invalid input")
-#             continue
+        :param player: The player whose unstable pieces to return.
         
-#         print(f"Making move {row}, {col}")
-#         gamestate.make_move(row, col)
-#         print(gamestate.board)
-#         print("Safe board black")
-#         print(bin(gamestate.board.safe_board['black']))
-#         print("Safe board white")
-#         print(bin(gamestate.board.safe_board['white']))
+        :return: The unstable pieces of the player as a bitboard.
+        """
+        if self.board.unstable_board[player] is None:
+            opponent = 'black' if player == 'white' else 'white'
+            self.get_valid_moves(opponent) # This will update the cache and mark all of player's pieces that can be captured
+            self.board.unstable_board[player] = self.player_can_capture_cache[opponent]
+        return self.board.unstable_board[player]
@@ -0,0 +1,184 @@
+from .bitboard import get_moves_and_capturable, get_flips, get_safe
+from . import zobrist
+
+
+class Position:
+    """
+    An immutable, compact representation of a position.
+    It only holds the bitboard of the player to move, the bitboard of the opponent and
+    the colour of the player to move. Making a move returns a new Position instead of
+    changing this one, so positions can be shared freely (between threads, processes or caches)
+    and the search does not need to undo anything.
+
+    GameState is still the stateful wrapper with history used by the API and the CLI,
+    GameState.to_position() gives the Position of the current state.
+
+    Every position carries its Zobrist hash, which apply and pass_turn update incrementally,
+    so caches can key on the single integer position.hash.
+
+    Moves and stability are computed the first time they are asked for and then memoized,
+    so the interior nodes of a search never pay for the stability only the leaves need.
+    """
+    __slots__ = ('player', 'opponent', 'side', 'hash', '_moves', '_opponent_moves',
+                 '_player_safe', '_opponent_safe', '_player_unstable', '_opponent_unstable')
+
+    def __init__(self, player, opponent, side, hash=None):
+        """
+        :param player (int): The bitboard of the player to move.
+        :param opponent (int): The bitboard of the opponent.
+        :param side (str): The colour of the player to move.
+        :param hash (int): The Zobrist hash if already known, computed from the boards otherwise.
+        """
+        if hash is None:
+            black, white = (player, opponent) if side == 'black' else (opponent, player)
+            hash = zobrist.compute_hash(black, white, side)
+        object.__setattr__(self, 'player', player)
+        object.__setattr__(self, 'opponent', opponent)
+        object.__setattr__(self, 'side', side)
+        object.__setattr__(self, 'hash', hash)
+        # Move generation and stability are memoized, which does not change the value of the position
+        object.__setattr__(self, '_moves', None)
+        object.__setattr__(self, '_opponent_moves', None)
+        object.__setattr__(self, '_player_safe', None)
+        object.__setattr__(self, '_opponent_safe', None)
+        object.__setattr__(self, '_player_unstable', None)
+        object.__setattr__(self, '_opponent_unstable', None)
+
+    @classmethod
+    def from_boards(cls, black, white, side) -> 'Position':
+        """
+        Creates a position from the bitboards of each colour and the player to move.
+        """
+        if side == 'black':
+            return cls(black, white, side)
+        return cls(white, black, side)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Position is immutable")
+
+    def __eq__(self, other):
+        return (isinstance(other, Position) and self.player == other.player and
+                self.opponent == other.opponent and self.side == other.side)
+
+    def __hash__(self):
+        return self.hash
+
+    def __repr__(self):
+        return f"Position(player={self.player:#x}, opponent={self.opponent:#x}, side={self.side!r})"
+
+    def verify_hash(self) -> None:
+        """
+        Raises an AssertionError if the stored hash differs from a full recompute.
+        """
+        zobrist.verify_hash(self.hash, self.get_board('black'), self.get_board('white'), self.side)
+
+    @property
+    def other_side(self) -> str:
+        return 'black' if self.side == 'white' else 'white'
+
+    def get_board(self, player) -> int:
+        """
+        Returns the board of the given colour, or the empty squares if player is "empty".
+
+        :param player (str): 'black', 'white' or 'empty'.
+
+        :return (int): The bitboard.
+        """
+        if player == self.side:
+            return self.player
+        if player == 'empty':
+            return ~(self.player | self.opponent)
+        return self.opponent
+
+    def legal_moves(self) -> int:
+        """
+        :return (int): The legal moves of the player to move as a bitboard.
+        """
+        if self._moves is None:
+            moves, capturable = get_moves_and_capturable(self.player, self.opponent)
+            object.__setattr__(self, '_moves', moves)
+            object.__setattr__(self, '_opponent_unstable', capturable)
+        return self._moves
+
+    def opponent_moves(self) -> int:
+        """
+        :return (int): The moves the opponent would have if it were their turn, as a bitboard.
+        """
+        if self._opponent_moves is None:
+            moves, capturable = get_moves_and_capturable(self.opponent, self.player)
+            object.__setattr__(self, '_opponent_moves', moves)
+            object.__setattr__(self, '_player_unstable', capturable)
+        return self._opponent_moves
+
+    def get_valid_moves(self, player) -> int:
+        """
+        Same as GameState.get_valid_moves, the valid moves of the given colour as a bitboard.
+        """
+        return self.legal_moves() if player == self.side else self.opponent_moves()
+
+    def apply(self, square) -> 'Position':
+        """
+        Returns the position after the player to move places a piece on square.
+        The move is assumed to be legal.
+
+        :param square (int): The square index, row * 8 + col.
+
+        :return (Position): The new position, with the opponent to move.
+        """
+        move_bitboard = 1 << square
+        flips = get_flips(move_bitboard, self.player, self.opponent)
+        child = self.__class__(self.opponent ^ flips, self.player | move_bitboard | flips, self.other_side,
+                         self.hash ^ zobrist.move_delta(square, flips, self.side))
+        if zobrist.VERIFY_HASH:
+            child.verify_hash()
+        return child
+
+    def pass_turn(self) -> 'Position':
+        """
+        :return (Position): The same board with the other player to move.
+        """
+        return self.__class__(self.opponent, self.player, self.other_side, self.hash ^ zobrist.SIDE_KEY)
+
+    def is_terminal(self) -> bool:
+        """
+        The game is over when neither player can move.
+        This also covers a full board and a player without pieces.
+        """
+        return self.legal_moves() == 0 and self.opponent_moves() == 0
+
+    def winner(self) -> str:
+        """
+        :return (str): 'black', 'white' or 'draw', only meaningful if the position is terminal.
+        """
+        player_count = self.player.bit_count()
+        opponent_count = self.opponent.bit_count()
+        if player_count > opponent_count:
+            return self.side
+        if opponent_count > player_count:
+            return self.other_side
+        return 'draw'
+
+    def safe_board(self, player) -> int:
+        """
+        :return (int): The pieces of the given colour that can never be flipped.
+        """
+        if player == self.side:
+            if self._player_safe is None:
+                object.__setattr__(self, '_player_safe', get_safe(self.player, self.opponent))
+            return self._player_safe
+        if self._opponent_safe is None:
+            object.__setattr__(self, '_opponent_safe', get_safe(self.opponent, self.player))
+        return self._opponent_safe
+
+    def unstable_board(self, player) -> int:
+        """
+        :return (int): The pieces of the given colour that the other colour could capture right now.
+        Comes for free with the move generation of the other colour.
+        """
+        if player == self.side:
+            if self._player_unstable is None:
+                self.opponent_moves()
+            return self._player_unstable
+        if self._opponent_unstable is None:
+            self.legal_moves()
+        return self._opponent_unstable
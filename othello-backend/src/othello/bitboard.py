@@ -0,0 +1,232 @@
+"""
+Stateless bitboard primitives shared by the game logic and the AI.
+
+Bit i of a bitboard represents square (i // 8, i % 8), so a shift of +1 moves a piece east
+and a shift of +8 moves it south. Python integers are unbounded, so every shift is followed by
+a mask that both removes the bits that wrapped around a file and keeps the result within 64 bits.
+"""
+
+from .edge_patterns import edge_stable
+
+FULL_MASK = 0xFFFF_FFFF_FFFF_FFFF
+# Squares are indexed row * 8 + col (0-63), a skipped turn is represented by PASS
+PASS = 64
+
+CORNERS = 0b10000001_00000000_00000000_00000000_00000000_00000000_00000000_10000001
+
+NOT_A_FILE = 0b11111110_11111110_11111110_11111110_11111110_11111110_11111110_11111110
+NOT_H_FILE = 0b01111111_01111111_01111111_01111111_01111111_01111111_01111111_01111111
+# Every square that is not on an edge
+INTERIOR = 0x007E7E7E_7E7E7E00
+
+# (shift, mask) pairs. The mask is applied after shifting and contains every square
+# a piece can legally land on when moving one step in that direction.
+_LEFT_SHIFTS = (
+    (1, NOT_A_FILE & FULL_MASK),   # east
+    (8, FULL_MASK & ~0xFF),        # south
+    (7, NOT_H_FILE & ~0xFF),       # south west
+    (9, NOT_A_FILE & ~0xFF),       # south east
+)
+_RIGHT_SHIFTS = (
+    (1, NOT_H_FILE),                # west
+    (8, FULL_MASK >> 8),            # north
+    (7, NOT_A_FILE & FULL_MASK >> 8),  # north east
+    (9, NOT_H_FILE & FULL_MASK >> 8),  # north west
+)
+
+
+def squares(bitboard: int) -> list:
+    """
+    Returns the indices of the set bits, lowest first.
+    Only loops once per set bit by repeatedly isolating the lowest one.
+
+    :param bitboard: Any bitboard.
+
+    :return: A list of square indices (0-63).
+    """
+    result = []
+    while bitboard:
+        lowest_bit = bitboard & -bitboard
+        result.append(lowest_bit.bit_length() - 1)
+        bitboard ^= lowest_bit
+    return result
+
+
+def get_moves(player_board: int, opponent_board: int) -> int:
+    """
+    Returns the legal moves of the player as a bitboard.
+
+    :param player_board: The bitboard of the player to move.
+    :param opponent_board: The bitboard of the opponent.
+
+    :return: A bitboard where 1 represents a legal move.
+    """
+    return get_moves_and_capturable(player_board, opponent_board)[0]
+
+
+def get_moves_and_capturable(player_board: int, opponent_board: int) -> tuple:
+    """
+    Kogge-Stone move generator.
+    For every direction the runs of opponent pieces that start next to a player piece are
+    flood filled in three fixed steps (1, 2 and 4 squares), which covers the longest possible
+    run of six pieces without any data dependent loop.
+
+    The capturable pieces are all opponent runs in the directions where at least one move exists,
+    which is exactly what the original direction-walking generator reported for stability.
+
+    :param player_board: The bitboard of the player to move.
+    :param opponent_board: The bitboard of the opponent.
+
+    :return: A tuple (moves, capturable) of bitboards.
+    """
+    empty = ~(player_board | opponent_board) & FULL_MASK
+    moves = 0
+    capturable = 0
+
+    for shift, mask in _LEFT_SHIFTS:
+        propagator = opponent_board & mask
+        run = (player_board << shift) & propagator
+        run |= propagator & (run << shift)
+        propagator &= propagator << shift
+        run |= propagator & (run << (shift << 1))
+        propagator &= propagator << (shift << 1)
+        run |= propagator & (run << (shift << 2))
+        placements = (run << shift) & empty & mask
+        if placements:
+            moves |= placements
+            capturable |= run
+
+    for shift, mask in _RIGHT_SHIFTS:
+        propagator = opponent_board & mask
+        run = (player_board >> shift) & propagator
+        run |= propagator & (run >> shift)
+        propagator &= propagator >> shift
+        run |= propagator & (run >> (shift << 1))
+        propagator &= propagator >> (shift << 1)
+        run |= propagator & (run >> (shift << 2))
+        placements = (run >> shift) & empty & mask
+        if placements:
+            moves |= placements
+            capturable |= run
+
+    return moves, capturable
+
+
+def get_flips(move_bitboard: int, player_board: int, opponent_board: int) -> int:
+    """
+    Returns the pieces flipped when the player places a piece on move_bitboard.
+    Uses the same fixed-step fill as get_moves_and_capturable, but starting from the move.
+    The move is assumed to be legal.
+
+    :param move_bitboard: A bitboard with only the placed square set.
+    :param player_board: The bitboard of the player to move.
+    :param opponent_board: The bitboard of the opponent.
+
+    :return: The bitboard of the opponent pieces that change colour.
+    """
+    flips = 0
+
+    for shift, mask in _LEFT_SHIFTS:
+        propagator = opponent_board & mask
+        run = (move_bitboard << shift) & propagator
+        if run == 0:
+            continue
+        run |= propagator & (run << shift)
+        propagator &= propagator << shift
+        run |= propagator & (run << (shift << 1))
+        propagator &= propagator << (shift << 1)
+        run |= propagator & (run << (shift << 2))
+        if (run << shift) & player_board & mask:
+            flips |= run
+
+    for shift, mask in _RIGHT_SHIFTS:
+        propagator = opponent_board & mask
+        run = (move_bitboard >> shift) & propagator
+        if run == 0:
+            continue
+        run |= propagator & (run >> shift)
+        propagator &= propagator >> shift
+        run |= propagator & (run >> (shift << 1))
+        propagator &= propagator >> (shift << 1)
+        run |= propagator & (run >> (shift << 2))
+        if (run >> shift) & player_board & mask:
+            flips |= run
+
+    return flips
+
+
+def get_safe(board: int, opponent_board: int) -> int:
+    """
+    Returns the pieces of board that can never be flipped.
+    The algorithm is relatively complex, but it is based on the following:
+     - Edge pieces can only be flipped along their edge, so whether they are safe follows from
+       the configuration of the edge alone, which is looked up in a table (see edge_patterns).
+       This includes corners, and also edges that are anchored by the opponent or completely filled.
+     - All other (interior) pieces are safe if their immediate neighbor in all 4 opposing directions are safe.
+       Interior squares have all 8 neighbours on the board, so the shifts below can't wrap around a file.
+
+    :param board: The bitboard of one player.
+    :param opponent_board: The bitboard of the other player.
+
+    :return: The bitboard of the safe pieces.
+    """
+    safe = edge_stable(board, opponent_board) & board
+
+    # The other pieces need safe neighbours on all four lines, which only safe edges
+    # (not corners alone) can provide, so we can early return
+    if safe == board & CORNERS:
+        return safe
+
+    # Now find the rest
+    while True:
+        old_safe = safe
+        safe |= (
+            ((safe >> 8) | (safe << 8)) &
+            ((safe >> 1) | (safe << 1)) &
+            ((safe >> 9) | (safe << 9)) &
+            ((safe >> 7) | (safe << 7)) &
+            board & INTERIOR
+        )
+        if old_safe == safe:
+            return safe
+
+
+def flip_vertical(bitboard: int) -> int:
+    """
+    Mirrors the board top to bottom (row r becomes row 7 - r).
+    """
+    return int.from_bytes(bitboard.to_bytes(8, 'little'), 'big')
+
+
+def mirror_horizontal(bitboard: int) -> int:
+    """
+    Mirrors the board left to right (column c becomes column 7 - c), by swapping
+    neighbouring bits, then pairs, then nibbles within every row.
+    """
+    bitboard = ((bitboard >> 1) & 0x5555_5555_5555_5555) | ((bitboard & 0x5555_5555_5555_5555) << 1)
+    bitboard = ((bitboard >> 2) & 0x3333_3333_3333_3333) | ((bitboard & 0x3333_3333_3333_3333) << 2)
+    return ((bitboard >> 4) & 0x0F0F_0F0F_0F0F_0F0F) | ((bitboard & 0x0F0F_0F0F_0F0F_0F0F) << 4)
+
+
+def flip_diagonal(bitboard: int) -> int:
+    """
+    Mirrors the board in the A0-H7 diagonal (square (r, c) becomes (c, r)),
+    by swapping 4x4, 2x2 and 1x1 blocks on either side of the diagonal.
+    """
+    temp = 0x0F0F_0F0F_0000_0000 & (bitboard ^ (bitboard << 28))
+    bitboard ^= temp ^ (temp >> 28)
+    temp = 0x3333_0000_3333_0000 & (bitboard ^ (bitboard << 14))
+    bitboard ^= temp ^ (temp >> 14)
+    temp = 0x5500_5500_5500_5500 & (bitboard ^ (bitboard << 7))
+    return bitboard ^ temp ^ (temp >> 7)
+
+
+def symmetries(bitboard: int) -> list:
+    """
+    :return: The bitboard under all 8 symmetries of the board, starting with itself.
+    """
+    result = []
+    for board in (bitboard, flip_diagonal(bitboard)):
+        vertical = flip_vertical(board)
+        result += [board, mirror_horizontal(board), vertical, mirror_horizontal(vertical)]
+    return result
@@ -0,0 +1,186 @@
+"""
+Lookup tables for the four edges of the board.
+
+An edge is a line of 8 squares, each empty, the player's or the opponent's, so it has only
+3^8 = 6561 configurations. Every edge is turned into a base-3 index (0 empty, 1 player, 2 opponent,
+square i worth 3^i) and the properties of that configuration are read from tables instead of
+being computed with shifts and loops:
+- STABLE: the squares that can never change colour again (true edge stability, see _stable).
+- WEDGES: the wedge score of the player (see _wedges).
+- EDGE_PLAYER_DISCS, EDGE_OPPONENT_DISCS: the discs of the player and the opponent on the middle squares 2-5.
+
+The same edge configuration seen by the opponent has the index with 1 and 2 swapped,
+which is edge_indices with the boards swapped.
+
+The tables take a moment to build, so they are saved next to this file the first time
+and loaded from there afterwards.
+"""
+import os
+from array import array
+
+TABLE_VERSION = 3
+NUMBER_OF_PATTERNS = 3 ** 8
+NUMBER_OF_TABLES = 4
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'edge_patterns.cache')
+
+# The squares of one edge in the order of the pattern index
+TOP_EDGE = 0x00000000_000000FF
+BOTTOM_EDGE = 0xFF000000_00000000
+LEFT_EDGE = 0x01010101_01010101
+RIGHT_EDGE = 0x80808080_80808080
+# Gathers the 8 squares of the left column into the top byte, square of row i in bit 56 + i
+_COLUMN_MAGIC = 0x01020408_10204080
+
+# Middle squares of an edge counted by the edges heuristic
+EDGE_MIDDLE = 0b00111100
+WEDGE_PLAYER = 2
+POTENTIAL_WEDGE = -1
+
+# Base-3 value of the set bits of a byte, the index of a line that only has pieces of one colour
+TERNARY = tuple(sum(3 ** square for square in range(8) if byte >> square & 1) for byte in range(256))
+# Puts the bits of a byte back on the left column
+COLUMN_SQUARES = tuple(sum(1 << (8 * row) for row in range(8) if byte >> row & 1) for byte in range(256))
+
+
+def _column(board: int, col: int) -> int:
+    return (((board >> col) & LEFT_EDGE) * _COLUMN_MAGIC >> 56) & 0xFF
+
+
+def edge_lines(board: int) -> tuple:
+    """
+    :return: The 8 squares of the top, bottom, left and right edge of board, each as a byte
+             (bit i is column i for the rows, row i for the columns).
+    """
+    return board & 0xFF, board >> 56, _column(board, 0), _column(board, 7)
+
+
+def edge_indices(player_board: int, opponent_board: int) -> tuple:
+    """
+    :return: The pattern indices of the top, bottom, left and right edge for the player.
+    """
+    return tuple(TERNARY[player] + 2 * TERNARY[opponent]
+                 for player, opponent in zip(edge_lines(player_board), edge_lines(opponent_board)))
+
+
+def edge_stable(player_board: int, opponent_board: int) -> int:
+    """
+    :return: The discs on the edges (of both colours) that can never be flipped, as a bitboard.
+    """
+    top, bottom, left, right = edge_indices(player_board, opponent_board)
+    return (STABLE[top] | STABLE[bottom] << 56 |
+            COLUMN_SQUARES[STABLE[left]] | COLUMN_SQUARES[STABLE[right]] << 7)
+
+
+def edge_discs(indices) -> tuple:
+    """
+    :param indices: The pattern indices of the four edges, from edge_indices.
+
+    :return: The discs of the player and of the opponent on the middle squares of the edges.
+    """
+    return sum(EDGE_PLAYER_DISCS[index] for index in indices), sum(EDGE_OPPONENT_DISCS[index] for index in indices)
+
+
+def _pattern(player: int, opponent: int) -> int:
+    return TERNARY[player] + 2 * TERNARY[opponent]
+
+
+def _line_flips(square: int, player: int, opponent: int) -> int:
+    """
+    The opponent discs flipped along the line when the player places on square.
+    """
+    flips = 0
+    for step in (-1, 1):
+        run = 0
+        current = square + step
+        while 0 <= current < 8 and opponent >> current & 1:
+            run |= 1 << current
+            current += step
+        if 0 <= current < 8 and player >> current & 1:
+            flips |= run
+    return flips
+
+
+def _stable(player: int, opponent: int, memo: dict) -> int:
+    """
+    The occupied squares that keep their colour whatever is played on the empty squares of the line.
+    Any empty square might be played by either colour (a move can be legal because of
+    what it flips off the edge), and an edge disc can only be flipped along the edge itself.
+    """
+    key = (player, opponent)
+    if key in memo:
+        return memo[key]
+    stable = player | opponent
+    empty = ~stable & 0xFF
+    for square in range(8):
+        if not empty >> square & 1:
+            continue
+        move = 1 << square
+        for mover, other, is_player in ((player, opponent, True), (opponent, player, False)):
+            flips = _line_flips(square, mover, other)
+            stable &= ~flips
+            if is_player:
+                stable &= _stable(mover | move | flips, other & ~flips, memo)
+            else:
+                stable &= _stable(other & ~flips, mover | move | flips, memo)
+    memo[key] = stable
+    return stable
+
+
+def _wedges(player: int, opponent: int) -> int:
+    """
+    A wedge is a player disc between two opponent discs on the edge, it is worth WEDGE_PLAYER.
+    An empty square between two player discs is a potential wedge for the opponent, worth POTENTIAL_WEDGE.
+    """
+    empty = ~(player | opponent) & 0xFF
+    wedges = (player & opponent << 1 & opponent >> 1).bit_count()
+    potential_wedges = (empty & player << 1 & player >> 1).bit_count()
+    return wedges * WEDGE_PLAYER + potential_wedges * POTENTIAL_WEDGE
+
+
+def _build_tables() -> tuple:
+    stable = [0] * NUMBER_OF_PATTERNS
+    wedges = [0] * NUMBER_OF_PATTERNS
+    player_discs = [0] * NUMBER_OF_PATTERNS
+    opponent_discs = [0] * NUMBER_OF_PATTERNS
+    memo = {}
+    for player in range(256):
+        for opponent in range(256):
+            if player & opponent:
+                continue
+            index = _pattern(player, opponent)
+            stable[index] = _stable(player, opponent, memo)
+            wedges[index] = _wedges(player, opponent)
+            player_discs[index] = (player & EDGE_MIDDLE).bit_count()
+            opponent_discs[index] = (opponent & EDGE_MIDDLE).bit_count()
+    return stable, wedges, player_discs, opponent_discs
+
+
+def _load_tables() -> tuple:
+    """
+    Loads the tables from CACHE_PATH, building (and trying to save) them if the file
+    is missing or from another version.
+    """
+    values = array('h')
+    try:
+        with open(CACHE_PATH, 'rb') as file:
+            values.frombytes(file.read())
+        if len(values) == 1 + NUMBER_OF_TABLES * NUMBER_OF_PATTERNS and values[0] == TABLE_VERSION:
+            return tuple(tuple(values[1 + table * NUMBER_OF_PATTERNS:1 + (table + 1) * NUMBER_OF_PATTERNS]) for table in range(NUMBER_OF_TABLES))
+    except (OSError, ValueError):
+        pass
+
+    tables = _build_tables()
+    values = array('h', [TABLE_VERSION])
+    for table in tables:
+        values.extend(table)
+    try:
+        with open(CACHE_PATH + '.tmp', 'wb') as file:
+            file.write(values.tobytes())
+        os.replace(CACHE_PATH + '.tmp', CACHE_PATH)
+    except OSError:
+        # A read only install just builds the tables every time
+        pass
+    return tuple(tuple(table) for table in tables)
+
+
+STABLE, WEDGES, EDGE_PLAYER_DISCS, EDGE_OPPONENT_DISCS = _load_tables()
@@ -0,0 +1,76 @@
+"""
+A game stored as the list of its moves, one byte per ply: the square (row * 8 + col, 0-63)
+or PASS (64) for a skipped turn. Every game starts from the same position, so this describes
+the whole game in at most about 60 bytes, and every position of it can be replayed.
+
+Replaying is a few shifts per ply. To get to a ply without replaying from the start,
+checkpoints (the boards every CHECKPOINT_INTERVAL plies) can be built once and passed to position_at.
+"""
+from .bitboard import PASS, get_flips
+
+# Black on 3E and 4D, white on 3D and 4E, black to move, the same as GameState
+START_BLACK = 0x00000008_10000000
+START_WHITE = 0x00000010_08000000
+CHECKPOINT_INTERVAL = 8
+
+
+def encode(moves) -> bytes:
+    """
+    :param moves: Square indices, PASS for a skipped turn.
+    """
+    return bytes(moves)
+
+
+def replay(log):
+    """
+    Yields the state after every ply of the log, starting with the starting position.
+
+    :return: (black, white, player to move, turn) per ply, where turn counts the moves made so far like GameState.current_turn.
+    """
+    black, white, side, turn = START_BLACK, START_WHITE, 'black', 0
+    yield black, white, side, turn
+    for square in log:
+        if square != PASS:
+            black, white = _play(square, black, white, side)
+            turn += 1
+        side = 'white' if side == 'black' else 'black'
+        yield black, white, side, turn
+
+
+def build_checkpoints(log) -> list:
+    """
+    :return: The state (as from replay) after every CHECKPOINT_INTERVAL-th ply, starting with ply 0.
+    """
+    return [state for ply, state in enumerate(replay(log)) if ply % CHECKPOINT_INTERVAL == 0]
+
+
+def position_at(log, ply, checkpoints=None) -> tuple:
+    """
+    :param ply: The number of plies (moves and passes) played, 0 for the starting position.
+    :param checkpoints: From build_checkpoints, to replay at most CHECKPOINT_INTERVAL - 1 plies.
+
+    :return: The state after ply plies, as from replay.
+    """
+    if not 0 <= ply <= len(log):
+        raise IndexError(f"ply {ply} is not in a game of {len(log)} plies")
+    if checkpoints:
+        black, white, side, turn = checkpoints[ply // CHECKPOINT_INTERVAL]
+        start = ply - ply % CHECKPOINT_INTERVAL
+    else:
+        black, white, side, turn = START_BLACK, START_WHITE, 'black', 0
+        start = 0
+    for square in log[start:ply]:
+        if square != PASS:
+            black, white = _play(square, black, white, side)
+            turn += 1
+        side = 'white' if side == 'black' else 'black'
+    return black, white, side, turn
+
+
+def _play(square, black, white, side) -> tuple:
+    move_bitboard = 1 << square
+    if side == 'black':
+        flips = get_flips(move_bitboard, black, white)
+        return black | move_bitboard | flips, white ^ flips
+    flips = get_flips(move_bitboard, white, black)
+    return black ^ flips, white | move_bitboard | flips
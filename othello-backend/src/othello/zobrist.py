@@ -0,0 +1,76 @@
+"""
+Zobrist hashing of positions.
+
+Every (colour, square) pair gets a random 64-bit key and the hash of a position is the XOR of
+the keys of all pieces, plus SIDE_KEY when white is to move. Because XOR is its own inverse,
+the hash can be updated from the placed square and the flip mask alone, see move_delta.
+
+The keys are generated from a fixed seed so the same position has the same hash in every
+process, which matters for caches that are shared or saved.
+"""
+import os
+import random
+
+# When enabled, every incremental update is compared against a full recompute.
+# Can be turned on with the environment variable OTHELLO_VERIFY_HASH=1 or by setting it directly.
+VERIFY_HASH = os.environ.get('OTHELLO_VERIFY_HASH') == '1'
+
+_random = random.Random(0x07E110)
+BLACK_KEYS = tuple(_random.getrandbits(64) for _ in range(64))
+WHITE_KEYS = tuple(_random.getrandbits(64) for _ in range(64))
+SIDE_KEY = _random.getrandbits(64)
+# Flipping a piece removes it from one colour and adds it to the other
+FLIP_KEYS = tuple(black ^ white for black, white in zip(BLACK_KEYS, WHITE_KEYS))
+# Search values also depend on whose point of view they are from and on the evaluated features.
+# Caches that are kept between searches XOR these into the hash, see MinMaxAgent
+CONTEXT_KEYS = {(player, beta_features): _random.getrandbits(64)
+                for player in ('black', 'white') for beta_features in (False, True)}
+
+
+def _hash_bitboard(bitboard: int, keys: tuple) -> int:
+    value = 0
+    while bitboard:
+        lowest_bit = bitboard & -bitboard
+        value ^= keys[lowest_bit.bit_length() - 1]
+        bitboard ^= lowest_bit
+    return value
+
+
+def compute_hash(black_board: int, white_board: int, side: str) -> int:
+    """
+    Computes the hash of a position from scratch.
+
+    :param black_board: The bitboard of black.
+    :param white_board: The bitboard of white.
+    :param side: The player to move, 'black' or 'white'.
+
+    :return: The 64-bit Zobrist hash.
+    """
+    value = _hash_bitboard(black_board, BLACK_KEYS) ^ _hash_bitboard(white_board, WHITE_KEYS)
+    if side == 'white':
+        value ^= SIDE_KEY
+    return value
+
+
+def move_delta(square: int, flips: int, player: str) -> int:
+    """
+    Returns the value to XOR into the hash when player places a piece on square and flips the given pieces.
+    The side to move changes as well, so SIDE_KEY is included. Applying the delta again undoes the move.
+
+    :param square: The square index of the placed piece.
+    :param flips: The bitboard of the flipped pieces.
+    :param player: The player who made the move.
+
+    :return: The hash delta.
+    """
+    keys = BLACK_KEYS if player == 'black' else WHITE_KEYS
+    return keys[square] ^ _hash_bitboard(flips, FLIP_KEYS) ^ SIDE_KEY
+
+
+def verify_hash(value: int, black_board: int, white_board: int, side: str) -> None:
+    """
+    Raises an AssertionError if an incrementally updated hash differs from the full recompute.
+    """
+    expected = compute_hash(black_board, white_board, side)
+    if value != expected:
+        raise AssertionError(f"Incremental hash {value:#x} does not match recomputed hash {expected:#x}")
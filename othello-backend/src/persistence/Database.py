@@ -0,0 +1,173 @@
+"""
+SQLite storage of the games played through the API.
+
+Every thread gets one connection that it keeps using (a small pool, sqlite3 connections can't be
+shared between threads), so a request does not pay for opening the database. The database is in
+WAL mode, so readers don't wait for the writer and a commit only appends to the log.
+The statements are module constants, which sqlite3 compiles once per connection and then
+takes from its statement cache.
+"""
+import os
+import sqlite3
+import threading
+
+from othello.GameState import GameState
+from othello.move_log import replay
+
+# One database for the whole backend, src/othello.db unless OTHELLO_DATABASE says otherwise
+DATABASE = os.environ.get('OTHELLO_DATABASE', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'othello.db'))
+# Milliseconds a connection waits for another writer before giving up
+BUSY_TIMEOUT = 5000
+
+CREATE_GAMES = '''
+    CREATE TABLE IF NOT EXISTS games (
+        id INTEGER PRIMARY KEY,
+        black_board INTEGER,
+        white_board INTEGER,
+        current_player TEXT,
+        current_turn INTEGER,
+        game_over BOOLEAN,
+        move_log BLOB
+    )'''
+# Databases from before the move log
+ADD_MOVE_LOG = 'ALTER TABLE games ADD COLUMN move_log BLOB'
+CREATE_GAME_HISTORY = '''
+    CREATE TABLE IF NOT EXISTS game_history (
+        game_id INTEGER,
+        turn INTEGER,
+        black_board INTEGER,
+        white_board INTEGER,
+        current_player TEXT,
+        PRIMARY KEY (game_id, turn)
+    )'''
+SAVE_GAME = 'REPLACE INTO games (id, black_board, white_board, current_player, current_turn, game_over, move_log) VALUES (?, ?, ?, ?, ?, ?, ?)'
+SAVE_HISTORY = 'REPLACE INTO game_history (game_id, turn, black_board, white_board, current_player) VALUES (?, ?, ?, ?, ?)'
+DELETE_HISTORY = 'DELETE FROM game_history WHERE game_id = ?'
+LOAD_GAME = 'SELECT black_board, white_board, current_player, current_turn, game_over, move_log FROM games WHERE id = ?'
+LOAD_MOVE_LOG = 'SELECT move_log FROM games WHERE id = ?'
+LOAD_HISTORY = 'SELECT turn, black_board, white_board, current_player FROM game_history WHERE game_id = ? ORDER BY turn'
+
+
+def to_signed(bitboard: int) -> int:
+    """
+    SQLite integers are signed 64-bit, so a board with the last square set is stored as a negative number.
+    """
+    return bitboard - (1 << 64) if bitboard >> 63 else bitboard
+
+
+def to_unsigned(value: int) -> int:
+    return value & 0xFFFFFFFF_FFFFFFFF
+
+
+def snapshot(game_id, gamestate) -> tuple:
+    """
+    :return: The games row of the game as it is now, (id, black_board, white_board, current_player, current_turn, game_over, move_log).
+    """
+    return (game_id, to_signed(gamestate.board.get_board('black')), to_signed(gamestate.board.get_board('white')),
+            gamestate.current_player, gamestate.current_turn, gamestate.game_over,
+            bytes(gamestate.move_log) if gamestate.move_log is not None else None)
+
+
+class Database:
+    """
+    The games table holds the current state of every game and its move log (see othello/move_log.py),
+    which is the whole history of the game in one row. A move only rewrites that row.
+    game_history (one row per turn) is only written for games without a move log,
+    those that did not start from the starting position, and read for games saved before the move log.
+    persistence.WriteBehind has the same methods, for saving moves in the background.
+    """
+
+    def __init__(self, path=DATABASE):
+        self.path = path
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+        with self.connection() as connection:
+            connection.execute(CREATE_GAMES)
+            connection.execute(CREATE_GAME_HISTORY)
+            columns = [column[1] for column in connection.execute('PRAGMA table_info(games)')]
+            if 'move_log' not in columns:
+                connection.execute(ADD_MOVE_LOG)
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        :return: The connection of the calling thread, opened the first time the thread asks for it.
+        """
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            # check_same_thread is off only so close() can close every connection,
+            # each connection is still only used by the thread that opened it
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT / 1000, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # In WAL mode NORMAL only syncs at checkpoints. A power cut can lose the last commits, never corrupt the file
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def close(self) -> None:
+        """
+        Closes the connections of all threads. They are opened again when they are needed.
+        """
+        with self.lock:
+            for connection in self.connections:
+                connection.close()
+            self.connections.clear()
+        self.local = threading.local()
+
+    def start_game(self, game_id, gamestate) -> None:
+        """
+        Saves a new game, replacing the state and history of an earlier game with the same id.
+        """
+        self.write([(snapshot(game_id, gamestate), True)])
+
+    def save_move(self, game_id, gamestate) -> None:
+        """
+        Saves the state of a game after a move (and its history row if it has no move log), in one transaction.
+        """
+        self.write([(snapshot(game_id, gamestate), False)])
+
+    def write(self, rows) -> None:
+        """
+        Saves many moves in one transaction, in order.
+        Only the last games row of every game is written, it has all the moves before it in its move log.
+
+        :param rows: (games row from snapshot, new game) pairs. The history of a new game is deleted first.
+        """
+        last = {row[0]: index for index, (row, _) in enumerate(rows)}
+        with self.connection() as connection:
+            for index, (row, new_game) in enumerate(rows):
+                game_id, black_board, white_board, current_player, current_turn, _, log = row
+                if new_game:
+                    connection.execute(DELETE_HISTORY, (game_id,))
+                if last[game_id] == index:
+                    connection.execute(SAVE_GAME, row)
+                if log is None:
+                    connection.execute(SAVE_HISTORY, (game_id, current_turn, black_board, white_board, current_player))
+
+    def load_gamestate(self, game_id):
+        """
+        :return: The GameState of the game, None if there is no such game.
+                 It is replayed from the move log, so its moves can be undone. Games without one start from their last state.
+        """
+        row = self.connection().execute(LOAD_GAME, (game_id,)).fetchone()
+        if row is None:
+            return None
+        black_board, white_board, current_player, current_turn, game_over, log = row
+        if log is not None:
+            return GameState.from_move_log(log)
+        return GameState(gamestate=(to_unsigned(black_board), to_unsigned(white_board), current_player, bool(game_over), current_turn))
+
+    def load_game_history(self, game_id) -> list:
+        """
+        :return: One dict (turn, black_board, white_board, current_player) per ply, in order,
+                 starting with the starting position. A skipped turn repeats the turn with the other player to move.
+        """
+        row = self.connection().execute(LOAD_MOVE_LOG, (game_id,)).fetchone()
+        if row is not None and row[0] is not None:
+            return [{'turn': turn, 'black_board': black_board, 'white_board': white_board, 'current_player': current_player}
+                    for black_board, white_board, current_player, turn in replay(row[0])]
+        rows = self.connection().execute(LOAD_HISTORY, (game_id,)).fetchall()
+        return [{'turn': turn, 'black_board': to_unsigned(black_board), 'white_board': to_unsigned(white_board), 'current_player': current_player}
+                for turn, black_board, white_board, current_player in rows]
@@ -0,0 +1,122 @@
+import sys
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_GAMES = 10_000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Measured with tracemalloc: a GameState with its Board and caches, not counting the undo stack
+GAMESTATE_BYTES = 1500
+
+
+def estimate_size(gamestate) -> int:
+    """
+    :return: The approximate memory use of a GameState in bytes, most of it is the undo stack.
+    """
+    return (GAMESTATE_BYTES + sys.getsizeof(gamestate.undo_moves) + sys.getsizeof(gamestate.undo_flips) +
+            sys.getsizeof(gamestate.move_log) + sys.getsizeof(gamestate.checkpoints))
+
+
+class GameStore:
+    """
+    The games the API is playing, kept in memory in place of a plain dict.
+
+    At most max_games games (and about max_bytes of them) are kept. When the store is full, the least
+    recently used game is dropped, and loaded from the database again the next time it is asked for.
+    Dropping a game never writes to the database: every move is saved when it is made, so the database is already current.
+    A game loaded from the database is replayed from its move log, so it keeps its undo stack.
+
+    Can be used by several request threads at once.
+    """
+
+    def __init__(self, database, max_games=DEFAULT_MAX_GAMES, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        :param database: The Database (or WriteBehind) dropped games are loaded from again.
+        :param max_games: The maximum number of games kept.
+        :param max_bytes: The maximum memory of the games kept, as estimated by estimate_size.
+        """
+        self.database = database
+        self.max_games = max_games
+        self.max_bytes = max_bytes
+        self.games = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rehydrations = 0
+        self.evictions = 0
+
+    def get(self, game_id):
+        """
+        :return: The GameState of the game, loaded from the database if it is not in memory. None if there is no such game.
+        """
+        with self.lock:
+            entry = self.games.get(game_id)
+            if entry is not None:
+                self.hits += 1
+                self.games.move_to_end(game_id)
+                return entry[0]
+
+        # Other games can be used while this one is loaded
+        gamestate = self.database.load_gamestate(game_id)
+        with self.lock:
+            if gamestate is None:
+                self.misses += 1
+                return None
+            entry = self.games.get(game_id)
+            if entry is not None:
+                # Another request loaded it first
+                return entry[0]
+            self.rehydrations += 1
+            self._add(game_id, gamestate)
+            return gamestate
+
+    def peek(self, game_id):
+        """
+        :return: The GameState of the game if it is in memory, None otherwise. Never loads it and is not counted in the stats.
+        """
+        with self.lock:
+            entry = self.games.get(game_id)
+            return entry[0] if entry is not None else None
+
+    def put(self, game_id, gamestate) -> None:
+        """
+        Adds a game, or replaces the game with the same id.
+        """
+        with self.lock:
+            entry = self.games.pop(game_id, None)
+            if entry is not None:
+                self.bytes -= entry[1]
+            self._add(game_id, gamestate)
+
+    def __contains__(self, game_id) -> bool:
+        with self.lock:
+            return game_id in self.games
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.games)
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses + self.rehydrations
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'rehydrations': self.rehydrations,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'games': len(self.games),
+                'max_games': self.max_games,
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _add(self, game_id, gamestate) -> None:
+        size = estimate_size(gamestate)
+        self.games[game_id] = (gamestate, size)
+        self.bytes += size
+        # The newest game always stays, even if it is bigger than max_bytes on its own
+        while len(self.games) > 1 and (len(self.games) > self.max_games or self.bytes > self.max_bytes):
+            _, (_, evicted_size) = self.games.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
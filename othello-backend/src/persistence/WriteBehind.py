@@ -0,0 +1,167 @@
+"""
+Saves moves in the background, so a request does not wait for the database.
+
+The games in memory (gamestate_store in app.py) are the real state. save_move only takes a snapshot
+of the game and queues it, and a writer thread saves the queue in one transaction whenever it holds
+max_batch moves or the oldest move has waited max_delay seconds. Loads save the queue first,
+so they always see every move that was made.
+
+What a crash can lose: the moves queued at that moment, which is at most the moves of the last
+max_delay seconds plus the time of one write, and never more than max_pending moves (save_move
+waits for the writer when the queue is that long). The queue is also saved when the process exits
+normally (atexit), but not when it is killed. Use Database directly if no move may be lost.
+If the writer thread stops on an unexpected error, save_move and flush raise RuntimeError instead of waiting for it.
+"""
+import atexit
+import sqlite3
+import sys
+import threading
+import time
+
+from .Database import snapshot
+
+DEFAULT_MAX_DELAY = 0.05
+DEFAULT_MAX_BATCH = 256
+# Seconds the writer waits before trying again after the database failed
+RETRY_DELAY = 1.0
+
+
+class WriteBehind:
+    """
+    Has the same methods as Database (start_game, save_move, load_gamestate, load_game_history),
+    and can be used instead of it.
+    """
+
+    def __init__(self, database, max_delay=DEFAULT_MAX_DELAY, max_batch=DEFAULT_MAX_BATCH, max_pending=None):
+        """
+        :param database: The Database the moves are saved to.
+        :param max_delay: The longest a move waits in the queue, in seconds. This is the durability knob,
+                          a crash loses at most about this many seconds of moves.
+        :param max_batch: The queue is saved as soon as it holds this many moves.
+        :param max_pending: save_move waits for the writer when this many moves are queued, 16 * max_batch if None.
+        """
+        self.database = database
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.max_pending = max_pending if max_pending is not None else 16 * max_batch
+
+        self.pending = []
+        self.oldest = None
+        # Moves queued and moves saved since the start, flush waits for the second to catch up with the first
+        self.queued = 0
+        self.written = 0
+        self.batches = 0
+        self.flushing = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+        self.thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def start_game(self, game_id, gamestate) -> None:
+        self._queue(snapshot(game_id, gamestate), True)
+
+    def save_move(self, game_id, gamestate) -> None:
+        self._queue(snapshot(game_id, gamestate), False)
+
+    def load_gamestate(self, game_id):
+        self.flush()
+        return self.database.load_gamestate(game_id)
+
+    def load_game_history(self, game_id) -> list:
+        self.flush()
+        return self.database.load_game_history(game_id)
+
+    def flush(self) -> None:
+        """
+        Waits until every move queued so far is saved.
+        """
+        with self.condition:
+            target = self.queued
+            self.flushing += 1
+            self.condition.notify_all()
+            try:
+                while self.written < target:
+                    if not self.thread.is_alive():
+                        raise RuntimeError("The write-behind thread has stopped")
+                    self.condition.wait(RETRY_DELAY)
+            finally:
+                self.flushing -= 1
+
+    def close(self) -> None:
+        """
+        Saves the queue and stops the writer. Moves saved after this go straight to the database.
+        """
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+        atexit.unregister(self.close)
+
+    def stats(self) -> dict:
+        with self.condition:
+            return {
+                'pending': len(self.pending),
+                'queued': self.queued,
+                'written': self.written,
+                'batches': self.batches,
+            }
+
+    def _queue(self, row, new_game) -> None:
+        with self.condition:
+            if self.closed:
+                self.database.write([(row, new_game)])
+                return
+            # A writer that died (e.g. from an error other than sqlite3.Error) would never empty the queue
+            if not self.thread.is_alive():
+                raise RuntimeError("The write-behind thread has stopped")
+            while len(self.pending) >= self.max_pending:
+                self.condition.notify_all()
+                self.condition.wait(RETRY_DELAY)
+                if not self.thread.is_alive():
+                    raise RuntimeError("The write-behind thread has stopped")
+            if not self.pending:
+                self.oldest = time.monotonic()
+            self.pending.append((row, new_game))
+            self.queued += 1
+            if len(self.pending) >= self.max_batch:
+                self.condition.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                # Wait for a full batch, unless the oldest move has waited long enough or someone is waiting for it
+                while len(self.pending) < self.max_batch and not (self.closed or self.flushing):
+                    remaining = self.oldest + self.max_delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if not self.pending:
+                    return
+                batch = self.pending
+                self.pending = []
+
+            try:
+                self.database.write(batch)
+            except sqlite3.Error as error:
+                if self.closed:
+                    with self.condition:
+                        lost = len(batch) + len(self.pending)
+                    print(f"Saving {lost} moves at shutdown failed, they are lost: {error}", file=sys.stderr)
+                    return
+                print(f"Saving {len(batch)} moves failed, trying again: {error}", file=sys.stderr)
+                with self.condition:
+                    self.pending[:0] = batch
+                    self.oldest = time.monotonic()
+                time.sleep(RETRY_DELAY)
+                continue
+
+            with self.condition:
+                self.written += len(batch)
+                self.batches += 1
+                self.condition.notify_all()
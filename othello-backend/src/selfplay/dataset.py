@@ -0,0 +1,124 @@
+"""
+Fixed-width self-play records stored in memory-mapped .npy shards.
+
+Every shard is a plain .npy file holding a 1-d array of RECORD_DTYPE, so it can be opened
+with np.load(path, mmap_mode='r') and read without loading it whole. Shards are written through
+a memory map as well, so memory use does not grow with the size of the dataset.
+"""
+import glob
+import os
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+RECORD_DTYPE = np.dtype([
+    ('black', '<u8'),   # bitboard of black
+    ('white', '<u8'),   # bitboard of white
+    ('side', 'u1'),     # 0 black to move, 1 white to move
+    ('move', 'u1'),     # square index of the move played (row * 8 + col)
+    ('score', '<f4'),   # search value for the player to move (exact disc difference once the endgame solver takes over)
+    ('final', 'i1'),    # final disc difference of the game, for the player to move
+])
+
+DEFAULT_SHARD_SIZE = 1 << 20
+SHARD_PATTERN = 'shard_{:05d}.npy'
+
+
+def shard_paths(directory) -> list:
+    """
+    :return: The paths of the shards in directory, in the order they were written.
+    """
+    return sorted(glob.glob(os.path.join(directory, SHARD_PATTERN.replace('{:05d}', '[0-9]' * 5))))
+
+
+class ShardWriter:
+    """
+    Appends records to shards of shard_size records each, starting a new shard when one is full.
+    New shards are added after the ones already in the directory, so a dataset can be extended.
+
+    A shard is created at full size and filled in place. When the writer is closed, the last shard
+    is cut down to the records it holds. A shard left behind by a crash keeps its unused
+    all-zero records, which iter_records skips (a real position always has pieces).
+    """
+
+    def __init__(self, directory, shard_size=DEFAULT_SHARD_SIZE):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.shard_size = shard_size
+        self.shard_index = len(shard_paths(directory))
+        self.shard = None
+        self.length = 0
+        self.records_written = 0
+
+    def append(self, records) -> None:
+        """
+        :param records: An array of RECORD_DTYPE.
+        """
+        offset = 0
+        while offset < len(records):
+            if self.shard is None:
+                self._open_shard()
+            count = min(self.shard_size - self.length, len(records) - offset)
+            self.shard[self.length:self.length + count] = records[offset:offset + count]
+            self.length += count
+            offset += count
+            if self.length == self.shard_size:
+                self._close_shard()
+        self.records_written += len(records)
+
+    def _path(self) -> str:
+        return os.path.join(self.directory, SHARD_PATTERN.format(self.shard_index))
+
+    def _open_shard(self) -> None:
+        self.shard = open_memmap(self._path(), mode='w+', dtype=RECORD_DTYPE, shape=(self.shard_size,))
+        self.length = 0
+
+    def _close_shard(self) -> None:
+        path = self._path()
+        self.shard.flush()
+        if self.length < self.shard_size:
+            temporary_path = path + '.tmp'
+            trimmed = open_memmap(temporary_path, mode='w+', dtype=RECORD_DTYPE, shape=(self.length,))
+            trimmed[:] = self.shard[:self.length]
+            trimmed.flush()
+            del trimmed
+            # Release the full size map before replacing its file
+            self.shard = None
+            os.replace(temporary_path, path)
+        self.shard = None
+        self.length = 0
+        self.shard_index += 1
+
+    def close(self) -> None:
+        if self.shard is not None:
+            self._close_shard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def iter_records(directory, chunk_size=65536):
+    """
+    Streams the records of all shards in chunks. Every shard is memory mapped and only
+    the chunk being handed out is read from disk.
+
+    :param chunk_size: The maximum number of records per chunk.
+
+    :return: A generator of RECORD_DTYPE arrays.
+    """
+    for path in shard_paths(directory):
+        shard = np.load(path, mmap_mode='r')
+        for start in range(0, len(shard), chunk_size):
+            chunk = shard[start:start + chunk_size]
+            yield chunk[(chunk['black'] | chunk['white']) != 0]
+
+
+def count_records(directory) -> int:
+    """
+    The number of records in all shards, from the .npy headers only.
+    Shards left behind by a crash are counted at full size.
+    """
+    return sum(len(np.load(path, mmap_mode='r')) for path in shard_paths(directory))
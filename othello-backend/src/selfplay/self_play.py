@@ -0,0 +1,106 @@
+"""
+Self-play data generation for a learned evaluation.
+
+The MinMaxAgent plays both sides of a GameState, after a few random opening moves so that
+games differ. Every move it makes is recorded with the position, the search value and, once the
+game is over, the final disc difference (see selfplay/dataset.py for the record layout).
+Games are played in worker processes and appended to memory-mapped shards by this process.
+
+Run from the src folder: python -m selfplay.self_play <games> <output directory> [depth] [workers] [--evaluation-cache]
+"""
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from AI_opponent.MinMaxAgent import MinMaxAgent
+from evaluation_function.EvaluationCache import EvaluationCache
+from evaluation_function.fused_eval import fused_eval
+from othello.GameState import GameState
+from othello.bitboard import squares
+from .dataset import RECORD_DTYPE, DEFAULT_SHARD_SIZE, ShardWriter
+
+# Number of random moves played before the agent takes over, chosen per game
+OPENING_MOVES = (2, 8)
+
+
+def play_game(seed, depth=4, beta_features=True, use_evaluation_cache=False) -> np.ndarray:
+    """
+    Plays one self-play game.
+
+    :param seed: Seeds the random opening (and the agent's random tie breaks).
+    :param depth: The search depth of the agent.
+    :param use_evaluation_cache: Wraps fused_eval in an EvaluationCache.
+
+    :return: The records of all moves the agent made, as a RECORD_DTYPE array.
+    """
+    random.seed(seed)
+    game = GameState()
+    agent = MinMaxAgent()
+    evaluation = EvaluationCache(fused_eval) if use_evaluation_cache else fused_eval
+
+    for _ in range(random.randint(*OPENING_MOVES)):
+        valid_moves = game.get_valid_moves(game.current_player)
+        if valid_moves == 0:
+            game.skip_turn()
+        else:
+            game.make_move(random.choice(squares(valid_moves)))
+        if game.game_over:
+            break
+
+    positions = []
+    while not game.game_over:
+        if game.get_valid_moves(game.current_player) == 0:
+            game.skip_turn()
+            continue
+        score, move = agent.get_best_move(game.to_position(), evaluation, depth, beta_features=beta_features)
+        positions.append((game.board.get_board('black'), game.board.get_board('white'), game.current_player == 'white', move, score))
+        game.make_move(move)
+
+    difference = game.board.get_board('black').bit_count() - game.board.get_board('white').bit_count()
+    records = np.zeros(len(positions), dtype=RECORD_DTYPE)
+    for index, (black, white, side, move, score) in enumerate(positions):
+        records[index] = (black, white, side, move, score, -difference if side else difference)
+    return records
+
+
+def run_self_play(games, output_directory, depth=4, workers=None, shard_size=DEFAULT_SHARD_SIZE, seed=0, use_evaluation_cache=False) -> int:
+    """
+    Plays games over worker processes and appends their records to the shards in output_directory.
+    Results are written in game order, so the same seed gives the same dataset.
+
+    :param games: The number of games to play.
+    :param workers: The number of worker processes, all cores if None.
+    :param use_evaluation_cache: Wraps fused_eval in an EvaluationCache in every game.
+
+    :return: The number of records written.
+    """
+    start = time.perf_counter()
+    workers = workers if workers is not None else os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as pool, ShardWriter(output_directory, shard_size) as writer:
+        # Bounded number of games in flight, so a long run does not queue every game up front
+        in_flight = 2 * workers
+        pending = deque()
+        next_game = 0
+        for finished in range(1, games + 1):
+            while next_game < games and len(pending) < in_flight:
+                pending.append(pool.submit(play_game, seed + next_game, depth, True, use_evaluation_cache))
+                next_game += 1
+            writer.append(pending.popleft().result())
+            if finished % 100 == 0 or finished == games:
+                print(f"{finished}/{games} games, {writer.records_written} records, {time.perf_counter() - start:.0f}s")
+        return writer.records_written
+
+
+if __name__ == "__main__":
+    use_evaluation_cache = '--evaluation-cache' in sys.argv
+    arguments = [argument for argument in sys.argv[1:] if argument != '--evaluation-cache']
+    number_of_games = int(arguments[0])
+    output_directory = arguments[1]
+    depth = int(arguments[2]) if len(arguments) > 2 else 4
+    workers = int(arguments[3]) if len(arguments) > 3 else None
+    run_self_play(number_of_games, output_directory, depth, workers, use_evaluation_cache=use_evaluation_cache)
@@ -0,0 +1,85 @@
+"""
+Statistics for engine-vs-engine matches: the Elo difference with its error margin,
+and a sequential probability ratio test (SPRT) to stop a match as soon as the result is clear.
+All results are counted from the point of view of the engine being tested.
+"""
+import math
+
+# z-score of a two-sided 95% confidence interval
+Z_95 = 1.959963984540054
+
+
+def elo_from_score(score: float) -> float:
+    """
+    :param score: The expected score, between 0 and 1 (a draw counts as half a win).
+
+    :return: The Elo difference that gives that expected score, +-inf for 1 and 0.
+    """
+    if score <= 0:
+        return float('-inf')
+    if score >= 1:
+        return float('inf')
+    return -400 * math.log10(1 / score - 1)
+
+
+def score_from_elo(elo: float) -> float:
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def _score_and_variance(wins: int, draws: int, losses: int):
+    games = wins + draws + losses
+    score = (wins + 0.5 * draws) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    return score, variance
+
+
+def elo_difference(wins: int, draws: int, losses: int):
+    """
+    The Elo difference with a 95% confidence interval, using the normal approximation of the mean score.
+
+    :return: (elo, margin), so the difference is elo +- margin. (0, inf) without any games.
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, float('inf')
+    score, variance = _score_and_variance(wins, draws, losses)
+    deviation = math.sqrt(variance / games)
+    lower = elo_from_score(score - Z_95 * deviation)
+    upper = elo_from_score(score + Z_95 * deviation)
+    if math.isinf(lower) or math.isinf(upper):
+        return elo_from_score(score), float('inf')
+    return elo_from_score(score), (upper - lower) / 2
+
+
+def sprt(wins: int, draws: int, losses: int, elo0: float = 0, elo1: float = 10, alpha: float = 0.05, beta: float = 0.05):
+    """
+    Sequential probability ratio test of H0: the difference is elo0, against H1: the difference is elo1.
+    The log likelihood ratio uses the normal approximation of the score (as in the generalized SPRT).
+    The test can be repeated after every game, and stops once the ratio leaves the bounds.
+
+    :param elo0: The Elo difference of the null hypothesis.
+    :param elo1: The Elo difference of the alternative hypothesis.
+    :param alpha: The maximum probability of accepting H1 when H0 is true.
+    :param beta: The maximum probability of accepting H0 when H1 is true.
+
+    :return: (decision, llr, (lower, upper)), decision is 'H1' (the engine is better), 'H0' or None to continue.
+    """
+    lower = math.log(beta / (1 - alpha))
+    upper = math.log((1 - beta) / alpha)
+    games = wins + draws + losses
+    if games == 0:
+        return None, 0.0, (lower, upper)
+
+    score, variance = _score_and_variance(wins, draws, losses)
+    if variance == 0:
+        # All results the same so far, no information about the spread yet
+        return None, 0.0, (lower, upper)
+    score0 = score_from_elo(elo0)
+    score1 = score_from_elo(elo1)
+    llr = games * ((score - score0) ** 2 - (score - score1) ** 2) / (2 * variance)
+
+    if llr >= upper:
+        return 'H1', llr, (lower, upper)
+    if llr <= lower:
+        return 'H0', llr, (lower, upper)
+    return None, llr, (lower, upper)
@@ -0,0 +1,234 @@
+"""
+Engine-vs-engine tournaments between the new (beta_features=True) and old (beta_features=False)
+evaluation features, replacing compare_ai.
+
+Every opening is played twice, once with the new features as black and once as white,
+and the games are spread over worker processes. Each finished game is appended to the
+output file right away (JSONL, or CSV if the file name ends in .csv), and a tournament that
+was interrupted continues where it stopped when it is started again with the same file.
+
+Run from the src folder: python -m tournament.runner --openings 100 --output results.jsonl
+See python -m tournament.runner --help for the other options, such as --sprt.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from AI_opponent.MinMaxAgent import MinMaxAgent
+from AI_opponent.NegamaxAgent import NegamaxAgent
+from evaluation_function.EvaluationCache import EvaluationCache
+from evaluation_function.fused_eval import fused_eval
+from gamestates.generate_gamestates import generate_gamestates
+from othello.Position import Position
+from othello.bitboard import PASS
+from .elo import elo_difference, sprt
+
+FIELDS = ['opening', 'new_color', 'black', 'white', 'side', 'result', 'new_discs', 'old_discs', 'moves', 'seconds']
+INTEGER_FIELDS = ('opening', 'black', 'white', 'new_discs', 'old_discs', 'moves')
+
+AGENTS = {
+    'minmax': MinMaxAgent,
+    'negamax': NegamaxAgent,
+}
+
+
+def play_game(opening_index, opening, new_color, depth, agent_class, seed, use_evaluation_cache=False) -> dict:
+    """
+    Plays one game from an opening. A single agent plays both sides,
+    its transposition table keeps the results of the two feature sets apart.
+
+    :param opening_index: The index of the opening, stored with the result.
+    :param opening: (black, white, side to move).
+    :param new_color: The colour played with the new features.
+    :param seed: Seeds the random tie breaks of the agent, so a game can be replayed.
+    :param use_evaluation_cache: Wraps fused_eval in an EvaluationCache.
+
+    :return: The result as a dict with the keys in FIELDS, result is 'win', 'draw' or 'loss' for the new features.
+    """
+    random.seed(seed)
+    start = time.perf_counter()
+    black, white, side = opening
+    position = Position.from_boards(black, white, side)
+    agent = agent_class()
+    evaluation = EvaluationCache(fused_eval) if use_evaluation_cache else fused_eval
+    moves = 0
+
+    while not position.is_terminal():
+        beta_features = position.side == new_color
+        _, move = agent.get_best_move(position, evaluation, depth, beta_features=beta_features)
+        position = position.pass_turn() if move == PASS else position.apply(move)
+        moves += 1
+
+    new_discs = position.get_board(new_color).bit_count()
+    old_discs = position.get_board('white' if new_color == 'black' else 'black').bit_count()
+    result = 'win' if new_discs > old_discs else 'loss' if new_discs < old_discs else 'draw'
+    return {
+        'opening': opening_index,
+        'new_color': new_color,
+        'black': black,
+        'white': white,
+        'side': side,
+        'result': result,
+        'new_discs': new_discs,
+        'old_discs': old_discs,
+        'moves': moves,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def load_results(output_path) -> list:
+    """
+    Reads the games already played from an output file, an empty list if it does not exist.
+    """
+    if output_path is None or not os.path.exists(output_path):
+        return []
+    with open(output_path, newline='') as file:
+        if output_path.endswith('.csv'):
+            results = []
+            for row in csv.DictReader(file):
+                for field in INTEGER_FIELDS:
+                    row[field] = int(row[field])
+                row['seconds'] = float(row['seconds'])
+                results.append(row)
+            return results
+        return [json.loads(line) for line in file if line.strip()]
+
+
+class ResultWriter:
+    """
+    Appends results to a JSONL or CSV file, flushing after every game
+    so nothing is lost if the tournament is interrupted.
+    """
+
+    def __init__(self, output_path):
+        self.file = None
+        self.csv_writer = None
+        if output_path is None:
+            return
+        is_new = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self.file = open(output_path, 'a', newline='')
+        if output_path.endswith('.csv'):
+            self.csv_writer = csv.DictWriter(self.file, fieldnames=FIELDS)
+            if is_new:
+                self.csv_writer.writeheader()
+
+    def write(self, result) -> None:
+        if self.file is None:
+            return
+        if self.csv_writer is not None:
+            self.csv_writer.writerow(result)
+        else:
+            self.file.write(json.dumps(result) + '\n')
+        self.file.flush()
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+
+
+def summarize(results, sprt_bounds=None) -> dict:
+    """
+    :param results: The game results.
+    :param sprt_bounds: (elo0, elo1) to include the SPRT state, None to leave it out.
+
+    :return: The win/draw/loss counts of the new features, the Elo difference with its 95% error margin
+             and, if sprt_bounds is given, the SPRT decision and log likelihood ratio.
+    """
+    wins = sum(1 for result in results if result['result'] == 'win')
+    draws = sum(1 for result in results if result['result'] == 'draw')
+    losses = sum(1 for result in results if result['result'] == 'loss')
+    elo, margin = elo_difference(wins, draws, losses)
+    summary = {'games': len(results), 'wins': wins, 'draws': draws, 'losses': losses, 'elo': elo, 'elo_margin': margin}
+    if sprt_bounds is not None:
+        decision, llr, bounds = sprt(wins, draws, losses, *sprt_bounds)
+        summary.update({'sprt': decision, 'llr': llr, 'llr_bounds': bounds})
+    return summary
+
+
+def run_tournament(openings, output_path=None, depth=5, workers=None, agent_class=MinMaxAgent, sprt_bounds=None, seed=0,
+                   use_evaluation_cache=False) -> dict:
+    """
+    Plays every opening with both colours, new features against old.
+
+    :param openings: The openings as (black, white, side to move), e.g. from generate_gamestates.
+    :param output_path: The JSONL or CSV file to stream the results to and resume from, None to keep them in memory only.
+    :param depth: The search depth of both sides.
+    :param workers: The number of worker processes, all cores if None.
+    :param agent_class: The agent both sides use.
+    :param sprt_bounds: (elo0, elo1) to stop as soon as the SPRT accepts either hypothesis, None to play all games.
+    :param seed: The base seed of the games.
+    :param use_evaluation_cache: Wraps fused_eval in an EvaluationCache in every game.
+
+    :return: The summary of all games played, including those of earlier runs, see summarize.
+    """
+    results = load_results(output_path)
+    played = set()
+    for result in results:
+        opening = openings[result['opening']] if result['opening'] < len(openings) else None
+        if opening != (result['black'], result['white'], result['side']):
+            raise ValueError(f"{output_path} was played from different openings, use another output file")
+        played.add((result['opening'], result['new_color']))
+
+    games = [(index, new_color) for index in range(len(openings)) for new_color in ('black', 'white')
+             if (index, new_color) not in played]
+    if not games or (sprt_bounds is not None and summarize(results, sprt_bounds)['sprt'] is not None):
+        return summarize(results, sprt_bounds)
+
+    writer = ResultWriter(output_path)
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [pool.submit(play_game, index, openings[index], new_color, depth, agent_class,
+                               seed + 2 * index + (new_color == 'white'), use_evaluation_cache)
+                   for index, new_color in games]
+        for future in as_completed(futures):
+            result = future.result()
+            writer.write(result)
+            results.append(result)
+
+            summary = summarize(results, sprt_bounds)
+            print(f"Game {summary['games']}/{2 * len(openings)}: opening {result['opening']}, new features as {result['new_color']}: {result['result']} "
+                  f"({result['new_discs']}-{result['old_discs']}). "
+                  f"+{summary['wins']} ={summary['draws']} -{summary['losses']}, Elo {summary['elo']:.1f} +- {summary['elo_margin']:.1f}")
+            if sprt_bounds is not None and summary['sprt'] is not None:
+                print(f"SPRT accepted {summary['sprt']}, stopping")
+                break
+    finally:
+        pool.shutdown(cancel_futures=True)
+        writer.close()
+    return summarize(results, sprt_bounds)
+
+
+def print_report(summary) -> None:
+    print("Final results: ")
+    print("New features win: ", summary['wins'])
+    print("Old features win: ", summary['losses'])
+    print("Tie: ", summary['draws'])
+    print(f"Elo difference: {summary['elo']:.1f} +- {summary['elo_margin']:.1f} (95%)")
+    if 'sprt' in summary:
+        lower, upper = summary['llr_bounds']
+        print(f"SPRT: LLR {summary['llr']:.2f} ({lower:.2f}, {upper:.2f}), {summary['sprt'] or 'undecided'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plays the new evaluation features against the old ones.")
+    parser.add_argument('--openings', type=int, default=100, help="Number of openings, every one is played with both colours")
+    parser.add_argument('--depth', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes, all cores by default")
+    parser.add_argument('--agent', choices=sorted(AGENTS), default='minmax')
+    parser.add_argument('--output', default=None, help="JSONL or .csv file to stream results to and resume from")
+    parser.add_argument('--sprt', type=float, nargs=2, metavar=('ELO0', 'ELO1'), default=None,
+                        help="Stop early once the SPRT accepts elo0 or elo1")
+    parser.add_argument('--seed', type=int, default=0, help="Seeds the openings and the games")
+    parser.add_argument('--evaluation-cache', action='store_true', help="Wrap fused_eval in an EvaluationCache")
+    args = parser.parse_args()
+
+    # The same seed gives the same openings, which resuming depends on
+    random.seed(args.seed)
+    openings = generate_gamestates(args.openings)
+    summary = run_tournament(openings, args.output, args.depth, args.workers, AGENTS[args.agent], args.sprt, args.seed,
+                             args.evaluation_cache)
+    print_report(summary)